@@ -22,17 +22,18 @@ export default function DashboardPage() {
     useEffect(() => {
         const fetchData = async () => {
             try {
-                const [userData, sentData, receivedData, friendsData] = await Promise.all([
+                const [userData, giftStats, sentData, receivedData, friendsData] = await Promise.all([
                     auth.me(),
-                    gifts.sent(),
-                    gifts.received(),
+                    gifts.stats(),
+                    gifts.recentSent(),
+                    gifts.recentReceived(),
                     friends.list(),
                 ]);
 
                 setUser(userData);
                 setStats({
-                    sentCount: sentData?.length || 0,
-                    receivedCount: receivedData?.length || 0,
+                    sentCount: giftStats?.sent?.total || 0,
+                    receivedCount: giftStats?.received?.total || 0,
                     friendCount: friendsData?.length || 0,
                 });
 
@@ -42,6 +42,32 @@ export async function apiRequest(endpoint: string, options: RequestOptions = {})
     }
 }
 
+// Follows X-Next-Cursor headers on paginated list endpoints and returns every page
+export async function apiRequestAll(endpoint: string) {
+    const token = typeof window !== 'undefined' ? localStorage.getItem('token') : null;
+    const separator = endpoint.includes('?') ? '&' : '?';
+    const items: any[] = [];
+    let cursor: string | null = null;
+
+    do {
+        const url: string = `${BASE_URL}${endpoint}${cursor ? `${separator}cursor=${encodeURIComponent(cursor)}` : ''}`;
+        const response = await fetch(url, {
+            headers: {
+                'Content-Type': 'application/json',
+                ...(token && { Authorization: `Bearer ${token}` }),
+            },
+        });
+        if (!response.ok) {
+            const errorData = await response.json().catch(() => ({}));
+            throw new Error(errorData.detail || 'Something went wrong');
+        }
+        items.push(...(await response.json()));
+        cursor = response.headers.get('X-Next-Cursor');
+    } while (cursor);
+
+    return items;
+}
+
 export const auth = {
     login: (data: any) => {
         // Login expects form data for OAuth2 in the backend docs, but let's check if it accepts JSON too or if we need to send form data.
@@ -68,15 +94,18 @@ export const auth = {
 
 export const gifts = {
     send: (data: any) => apiRequest('/gifts/', { method: 'POST', body: data }),
-    sent: () => apiRequest('/gifts/sent'),
-    received: () => apiRequest('/gifts/received'),
+    sent: () => apiRequestAll('/gifts/sent'),
+    received: () => apiRequestAll('/gifts/received'),
+    recentSent: (limit: number = 5) => apiRequest(`/gifts/sent?limit=${limit}`),
+    recentReceived: (limit: number = 5) => apiRequest(`/gifts/received?limit=${limit}`),
+    stats: () => apiRequest('/gifts/stats'),
     details: (id: number) => apiRequest(`/gifts/${id}`),
 };
 
 export const friends = {
-    list: () => apiRequest('/friends/'),
+    list: () => apiRequestAll('/friends/'),
     request: (data: any) => apiRequest('/friends/request', { method: 'POST', body: data }),
-    requests: () => apiRequest('/friends/requests/incoming'),
+    requests: () => apiRequestAll('/friends/requests/incoming'),
 };
 
 export const agent = {
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.routes import auth, users, friends, persona, gifts, social, agent
+from app.api.routes import auth, users, friends, persona, gifts, social, agent, internal
 
 api_router = APIRouter()
 
@@ -10,3 +10,4 @@ api_router.include_router(persona.router, prefix="/persona", tags=["Persona"])
 api_router.include_router(gifts.router, prefix="/gifts", tags=["Gifts"])
 api_router.include_router(social.router, prefix="/social", tags=["Social Connections"])
 api_router.include_router(agent.router, prefix="/agent", tags=["Chaos Agent"])
+api_router.include_router(internal.router, prefix="/internal", tags=["Internal"])
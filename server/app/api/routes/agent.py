@@ -4,20 +4,25 @@ Provides endpoints for communicating with the Blinkit Chaos Agent
 """
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
 import json
 import asyncio
 
+from app.core.config import settings
 from app.core.database import get_db
-from app.core.security import get_current_user
-from app.models.user import User
+from app.core.rate_limit import RateLimit, ConcurrencyLimit
+from app.core.security import Principal, get_current_principal
 from app.services.blinkit_chaos_agent import BlinkitChaosAgentService
 
 router = APIRouter()
 
+# Each session start spins up an LLM agent and an MCP subprocess
+session_limit = RateLimit("agent_sessions", settings.RATE_LIMIT_AGENT_SESSIONS)
+session_starts = ConcurrencyLimit("agent_session_starts", settings.AGENT_MAX_CONCURRENT_STARTS)
+
 
 # Request/Response Models
 class ChatMessage(BaseModel):
@@ -53,11 +58,15 @@ class ChatStartRequest(BaseModel):
     recipient_name: Optional[str] = None
 
 
-@router.post("/sessions", response_model=SessionResponse)
+@router.post(
+    "/sessions",
+    response_model=SessionResponse,
+    dependencies=[Depends(session_limit), Depends(session_starts)]
+)
 async def create_agent_session(
     request: Optional[ChatStartRequest] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Create a new Blinkit Chaos Agent session.
@@ -95,8 +104,8 @@ async def create_agent_session(
 
 @router.get("/sessions", response_model=List[SessionResponse])
 async def list_agent_sessions(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all active agent sessions for the current user"""
     sessions = BlinkitChaosAgentService.get_user_sessions(current_user.id)
@@ -115,8 +124,8 @@ async def list_agent_sessions(
 @router.get("/sessions/{session_id}", response_model=SessionHistoryResponse)
 async def get_session_history(
     session_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get chat history for a session"""
     session = BlinkitChaosAgentService.get_session(session_id)
@@ -149,8 +158,8 @@ async def get_session_history(
 @router.delete("/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_session(
     session_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete an agent session"""
     session = BlinkitChaosAgentService.get_session(session_id)
@@ -175,8 +184,8 @@ async def delete_session(
 async def chat_with_agent(
     session_id: str,
     chat: ChatMessage,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Send a message to the chaos agent and get a streaming response.
@@ -225,8 +234,8 @@ async def chat_with_agent(
 async def chat_with_agent_sync(
     session_id: str,
     chat: ChatMessage,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Send a message to the chaos agent and get a complete response.
@@ -264,11 +273,11 @@ async def chat_with_agent_sync(
 
 
 # Quick action endpoints
-@router.post("/chaos-gift")
+@router.post("/chaos-gift", dependencies=[Depends(session_limit), Depends(session_starts)])
 async def quick_chaos_gift(
     request: ChatStartRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Quick endpoint to start a chaos gift flow.
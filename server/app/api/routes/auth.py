@@ -1,26 +1,47 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 from app.core.database import get_db
 from app.core.security import (
-    verify_password,
-    get_password_hash,
+    verify_login_password_async,
+    get_password_hash_async,
+    password_needs_rehash,
     create_access_token,
+    invalidate_principal,
 )
 from app.core.config import settings
+from app.core.rate_limit import RateLimit
 from app.models.user import User
 from app.models.persona import Persona
+from app.services.user_search import user_search_index
 from app.schemas.user import UserCreate, UserResponse, Token
 
 router = APIRouter()
 
+login_limit = RateLimit("login", settings.RATE_LIMIT_LOGIN, by="ip")
+signup_limit = RateLimit("signup", settings.RATE_LIMIT_SIGNUP, by="ip")
 
-@router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def signup(user_data: UserCreate, db: Session = Depends(get_db)):
+
+async def _upgrade_password_hash(user: User, password: str, db: AsyncSession):
+    """Transparently rehash legacy/outdated password hashes after a successful login"""
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = await get_password_hash_async(password)
+        await db.commit()
+        invalidate_principal(user.id)
+
+
+@router.post(
+    "/signup",
+    response_model=UserResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(signup_limit)]
+)
+async def signup(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """Register a new user"""
     # Check if email exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = await db.scalar(select(User).where(User.email == user_data.email))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -28,7 +49,7 @@ async def signup(user_data: UserCreate, db: Session = Depends(get_db)):
         )
 
     # Check if username exists
-    existing_username = db.query(User).filter(User.username == user_data.username).first()
+    existing_username = await db.scalar(select(User).where(User.username == user_data.username))
     if existing_username:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -36,7 +57,7 @@ async def signup(user_data: UserCreate, db: Session = Depends(get_db)):
         )
 
     # Create user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     db_user = User(
         email=user_data.email,
         username=user_data.username,
@@ -45,26 +66,28 @@ async def signup(user_data: UserCreate, db: Session = Depends(get_db)):
         phone=user_data.phone,
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    user_search_index.add(db_user.id, db_user.username, db_user.email)
 
     # Create default persona
     persona = Persona(user_id=db_user.id)
     db.add(persona)
-    db.commit()
+    await db.commit()
 
     return db_user
 
 
-@router.post("/login", response_model=Token)
+@router.post("/login", response_model=Token, dependencies=[Depends(login_limit)])
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Login and get access token"""
-    user = db.query(User).filter(User.email == form_data.username).first()
+    user = await db.scalar(select(User).where(User.email == form_data.username))
 
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    hashed_password = user.hashed_password if user else None
+    if not await verify_login_password_async(form_data.password, hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -77,6 +100,8 @@ async def login(
             detail="Inactive user"
         )
 
+    await _upgrade_password_hash(user, form_data.password, db)
+
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": str(user.id)}, expires_delta=access_token_expires
@@ -85,16 +110,17 @@ async def login(
     return {"access_token": access_token, "token_type": "bearer"}
 
 
-@router.post("/login/json", response_model=Token)
+@router.post("/login/json", response_model=Token, dependencies=[Depends(login_limit)])
 async def login_json(
     email: str,
     password: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Login with JSON body (alternative to form)"""
-    user = db.query(User).filter(User.email == email).first()
+    user = await db.scalar(select(User).where(User.email == email))
 
-    if not user or not verify_password(password, user.hashed_password):
+    hashed_password = user.hashed_password if user else None
+    if not await verify_login_password_async(password, hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -106,6 +132,8 @@ async def login_json(
             detail="Inactive user"
         )
 
+    await _upgrade_password_hash(user, password, db)
+
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": str(user.id)}, expires_delta=access_token_expires
@@ -1,160 +1,180 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from app.core.database import get_db
-from app.core.security import get_current_user
+from app.core.config import settings
+from app.core.database import get_db, get_read_db
+from app.core.http_cache import check_not_modified, last_modified_of, rows_etag
+from app.core.pagination import PageParams
+from app.core.rate_limit import RateLimit
+from app.core.security import Principal, get_current_principal
 from app.models.user import User
 from app.models.friend import FriendRequest, Friendship, FriendRequestStatus
 from app.schemas.friend import (
+    ContactImportRequest,
+    ContactImportResponse,
     FriendRequestCreate,
     FriendRequestResponse,
     FriendshipResponse,
     FriendRequestAction,
+    FriendSuggestionResponse,
     SetNicknameRequest,
 )
+from app.services import friend_requests
+from app.services.contact_import import import_contacts
+from app.services.friend_graph import friend_graph
+from app.services.friend_suggestions import friend_graph_index, suggest_friends
 
 router = APIRouter()
 
+# Each upload can probe thousands of emails/phones for accounts
+contact_import_limit = RateLimit("contact_import", settings.RATE_LIMIT_CONTACT_IMPORT)
+
+
+def _friendships_query(user_id: int):
+    """Friendships of `user_id` joined to the friend's profile columns, one row per friend"""
+    return (
+        select(
+            Friendship.id,
+            Friendship.user_id,
+            Friendship.friend_id,
+            Friendship.nickname,
+            Friendship.created_at,
+            User.username.label("friend_username"),
+            User.full_name.label("friend_full_name"),
+            User.avatar_url.label("friend_avatar_url"),
+        )
+        .outerjoin(User, User.id == Friendship.friend_id)
+        .where(Friendship.user_id == user_id)
+    )
+
+
+def _pending_requests_query(other_party_column, username_label: str):
+    """Pending friend requests joined to the other party's username"""
+    return (
+        select(
+            FriendRequest.id,
+            FriendRequest.sender_id,
+            FriendRequest.receiver_id,
+            FriendRequest.status,
+            FriendRequest.message,
+            FriendRequest.created_at,
+            User.username.label(username_label),
+        )
+        .outerjoin(User, User.id == other_party_column)
+        .where(FriendRequest.status == FriendRequestStatus.PENDING)
+    )
+
 
 @router.post("/request", response_model=FriendRequestResponse, status_code=status.HTTP_201_CREATED)
 async def send_friend_request(
     request_data: FriendRequestCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Send a friend request"""
+    """Send a friend request (accepts instead if they already sent you one)"""
     if request_data.receiver_id == current_user.id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot send friend request to yourself"
         )
 
-    # Check if receiver exists
-    receiver = db.query(User).filter(User.id == request_data.receiver_id).first()
-    if not receiver:
+    request, auto_accepted = await friend_requests.send_request(
+        db, current_user.id, request_data.receiver_id, request_data.message
+    )
+    if request is None:
+        detail = await friend_requests.why_not_sent(db, current_user.id, request_data.receiver_id)
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
+            status_code=status.HTTP_404_NOT_FOUND if detail == "User not found" else status.HTTP_400_BAD_REQUEST,
+            detail=detail
         )
 
-    # Check if already friends
-    existing_friendship = db.query(Friendship).filter(
-        ((Friendship.user_id == current_user.id) & (Friendship.friend_id == request_data.receiver_id)) |
-        ((Friendship.user_id == request_data.receiver_id) & (Friendship.friend_id == current_user.id))
-    ).first()
-
-    if existing_friendship:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Already friends"
-        )
+    receiver_username = request.pop("receiver_username")
+    response = FriendRequestResponse.model_validate(request)
+    if auto_accepted:
+        # The accepted request is the one they sent us
+        friend_graph.invalidate(current_user.id, request_data.receiver_id)
+        friend_graph_index.link(current_user.id, request_data.receiver_id)
+        response.sender_username = receiver_username
+        response.receiver_username = current_user.username
+    else:
+        response.sender_username = current_user.username
+        response.receiver_username = receiver_username
+    return response
 
-    # Check if request already exists
-    existing_request = db.query(FriendRequest).filter(
-        FriendRequest.sender_id == current_user.id,
-        FriendRequest.receiver_id == request_data.receiver_id,
-        FriendRequest.status == FriendRequestStatus.PENDING
-    ).first()
 
-    if existing_request:
+@router.post("/import-contacts", response_model=ContactImportResponse, dependencies=[Depends(contact_import_limit)])
+async def import_contact_list(
+    contacts: ContactImportRequest,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """Find friends from an address book, optionally sending them all friend requests"""
+    if len(contacts.emails) + len(contacts.phones) > settings.CONTACT_IMPORT_MAX:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Friend request already sent"
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.CONTACT_IMPORT_MAX} contacts per upload"
         )
-
-    # Check for reverse request (they sent us one)
-    reverse_request = db.query(FriendRequest).filter(
-        FriendRequest.sender_id == request_data.receiver_id,
-        FriendRequest.receiver_id == current_user.id,
-        FriendRequest.status == FriendRequestStatus.PENDING
-    ).first()
-
-    if reverse_request:
-        # Auto-accept if they already sent us a request
-        reverse_request.status = FriendRequestStatus.ACCEPTED
-        # Create mutual friendship
-        friendship1 = Friendship(user_id=current_user.id, friend_id=request_data.receiver_id)
-        friendship2 = Friendship(user_id=request_data.receiver_id, friend_id=current_user.id)
-        db.add_all([friendship1, friendship2])
-        db.commit()
-        db.refresh(reverse_request)
-
-        response = FriendRequestResponse.model_validate(reverse_request)
-        response.sender_username = receiver.username
-        response.receiver_username = current_user.username
-        return response
-
-    # Create new request
-    friend_request = FriendRequest(
-        sender_id=current_user.id,
-        receiver_id=request_data.receiver_id,
-        message=request_data.message
-    )
-    db.add(friend_request)
-    db.commit()
-    db.refresh(friend_request)
-
-    response = FriendRequestResponse.model_validate(friend_request)
-    response.sender_username = current_user.username
-    response.receiver_username = receiver.username
-    return response
+    return await import_contacts(db, current_user.id, contacts)
 
 
 @router.get("/requests/incoming", response_model=List[FriendRequestResponse])
 async def get_incoming_requests(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get pending friend requests received"""
-    requests = db.query(FriendRequest).filter(
-        FriendRequest.receiver_id == current_user.id,
-        FriendRequest.status == FriendRequestStatus.PENDING
-    ).all()
-
-    result = []
-    for req in requests:
-        sender = db.query(User).filter(User.id == req.sender_id).first()
-        response = FriendRequestResponse.model_validate(req)
-        response.sender_username = sender.username if sender else None
-        result.append(response)
-
-    return result
+    """Get pending friend requests received (newest first, paginated)"""
+    query = page.apply(
+        _pending_requests_query(FriendRequest.sender_id, "sender_username")
+        .where(FriendRequest.receiver_id == current_user.id),
+        FriendRequest.created_at, FriendRequest.id, db.get_bind().dialect.name
+    )
+    rows = page.page((await db.execute(query)).all())
+    not_modified = check_not_modified(
+        page.request, page.response,
+        rows_etag(rows, page.next_cursor), last_modified_of(rows, "created_at")
+    )
+    if not_modified:
+        return not_modified
+    return [FriendRequestResponse.model_validate(row._mapping) for row in rows]
 
 
 @router.get("/requests/outgoing", response_model=List[FriendRequestResponse])
 async def get_outgoing_requests(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get pending friend requests sent"""
-    requests = db.query(FriendRequest).filter(
-        FriendRequest.sender_id == current_user.id,
-        FriendRequest.status == FriendRequestStatus.PENDING
-    ).all()
-
-    result = []
-    for req in requests:
-        receiver = db.query(User).filter(User.id == req.receiver_id).first()
-        response = FriendRequestResponse.model_validate(req)
-        response.receiver_username = receiver.username if receiver else None
-        result.append(response)
-
-    return result
+    """Get pending friend requests sent (newest first, paginated)"""
+    query = page.apply(
+        _pending_requests_query(FriendRequest.receiver_id, "receiver_username")
+        .where(FriendRequest.sender_id == current_user.id),
+        FriendRequest.created_at, FriendRequest.id, db.get_bind().dialect.name
+    )
+    rows = page.page((await db.execute(query)).all())
+    not_modified = check_not_modified(
+        page.request, page.response,
+        rows_etag(rows, page.next_cursor), last_modified_of(rows, "created_at")
+    )
+    if not_modified:
+        return not_modified
+    return [FriendRequestResponse.model_validate(row._mapping) for row in rows]
 
 
 @router.post("/requests/{request_id}/respond", response_model=FriendRequestResponse)
 async def respond_to_request(
     request_id: int,
     action: FriendRequestAction,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Accept or reject a friend request"""
-    friend_request = db.query(FriendRequest).filter(
+    friend_request = await db.scalar(select(FriendRequest).where(
         FriendRequest.id == request_id,
         FriendRequest.receiver_id == current_user.id,
         FriendRequest.status == FriendRequestStatus.PENDING
-    ).first()
+    ))
 
     if not friend_request:
         raise HTTPException(
@@ -164,10 +184,8 @@ async def respond_to_request(
 
     if action.action == "accept":
         friend_request.status = FriendRequestStatus.ACCEPTED
-        # Create mutual friendship
-        friendship1 = Friendship(user_id=current_user.id, friend_id=friend_request.sender_id)
-        friendship2 = Friendship(user_id=friend_request.sender_id, friend_id=current_user.id)
-        db.add_all([friendship1, friendship2])
+        # Create mutual friendship (no-op for rows that already exist)
+        await friend_requests.befriend(db, current_user.id, friend_request.sender_id)
     elif action.action == "reject":
         friend_request.status = FriendRequestStatus.REJECTED
     else:
@@ -176,46 +194,57 @@ async def respond_to_request(
             detail="Invalid action. Use 'accept' or 'reject'"
         )
 
-    db.commit()
-    db.refresh(friend_request)
+    await db.commit()
+    if friend_request.status == FriendRequestStatus.ACCEPTED:
+        friend_graph.invalidate(current_user.id, friend_request.sender_id)
+        friend_graph_index.link(current_user.id, friend_request.sender_id)
+    await db.refresh(friend_request)
     return friend_request
 
 
 @router.get("/", response_model=List[FriendshipResponse])
 async def get_friends(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get all friends"""
-    friendships = db.query(Friendship).filter(
-        Friendship.user_id == current_user.id
-    ).all()
+    """Get friends (most recent first, paginated)"""
+    query = page.apply(
+        _friendships_query(current_user.id),
+        Friendship.created_at, Friendship.id, db.get_bind().dialect.name
+    )
+    rows = page.page((await db.execute(query)).all())
+    not_modified = check_not_modified(
+        page.request, page.response,
+        rows_etag(rows, page.next_cursor), last_modified_of(rows, "created_at")
+    )
+    if not_modified:
+        return not_modified
+    return [FriendshipResponse.model_validate(row._mapping) for row in rows]
 
-    result = []
-    for friendship in friendships:
-        friend = db.query(User).filter(User.id == friendship.friend_id).first()
-        response = FriendshipResponse.model_validate(friendship)
-        if friend:
-            response.friend_username = friend.username
-            response.friend_full_name = friend.full_name
-            response.friend_avatar_url = friend.avatar_url
-        result.append(response)
 
-    return result
+@router.get("/suggestions", response_model=List[FriendSuggestionResponse])
+async def get_friend_suggestions(
+    limit: int = Query(20, ge=1, le=100),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """People you may know - ranked by mutual friends and shared vibe tags"""
+    return await suggest_friends(db, current_user.id, limit=limit)
 
 
 @router.put("/{friend_id}/nickname", response_model=FriendshipResponse)
 async def set_friend_nickname(
     friend_id: int,
     nickname_data: SetNicknameRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Set a nickname for a friend"""
-    friendship = db.query(Friendship).filter(
+    friendship = await db.scalar(select(Friendship).where(
         Friendship.user_id == current_user.id,
         Friendship.friend_id == friend_id
-    ).first()
+    ))
 
     if not friendship:
         raise HTTPException(
@@ -224,31 +253,28 @@ async def set_friend_nickname(
         )
 
     friendship.nickname = nickname_data.nickname
-    db.commit()
-    db.refresh(friendship)
+    await db.commit()
 
-    friend = db.query(User).filter(User.id == friend_id).first()
-    response = FriendshipResponse.model_validate(friendship)
-    if friend:
-        response.friend_username = friend.username
-        response.friend_full_name = friend.full_name
-        response.friend_avatar_url = friend.avatar_url
-
-    return response
+    row = (await db.execute(
+        _friendships_query(current_user.id).where(Friendship.friend_id == friend_id)
+    )).one()
+    return FriendshipResponse.model_validate(row._mapping)
 
 
 @router.delete("/{friend_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def remove_friend(
     friend_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Remove a friend (unfriend)"""
     # Delete both friendship records
-    db.query(Friendship).filter(
+    await db.execute(delete(Friendship).where(
         ((Friendship.user_id == current_user.id) & (Friendship.friend_id == friend_id)) |
         ((Friendship.user_id == friend_id) & (Friendship.friend_id == current_user.id))
-    ).delete(synchronize_session=False)
+    ))
 
-    db.commit()
+    await db.commit()
+    friend_graph.invalidate(current_user.id, friend_id)
+    friend_graph_index.unlink(current_user.id, friend_id)
     return None
@@ -1,49 +1,87 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from datetime import datetime
-from app.core.database import get_db
-from app.core.security import get_current_user
+from app.core.database import get_db, get_read_db
+from app.core.http_cache import check_not_modified, last_modified_of, rows_etag, weak_etag
+from app.core.idempotency import IdempotentRequest, idempotent
+from app.core.pagination import PageParams
+from app.core.security import Principal, get_current_principal
 from app.models.user import User
-from app.models.friend import Friendship
 from app.models.persona import Persona
 from app.models.gift import Gift, GiftSubscription, GiftStatus
 from app.schemas.gift import (
+    GiftBulkCreate,
+    GiftBulkResponse,
+    GiftBulkResult,
     GiftCreate,
     GiftResponse,
+    GiftStatsResponse,
+    GiftSummaryResponse,
     GiftApproval,
     GiftReaction,
     GiftSubscriptionCreate,
     GiftSubscriptionResponse,
     GiftSubscriptionUpdate,
 )
-from app.services.gift_agent import GiftAgentService
+from app.services.friend_graph import friend_graph
+from app.services.gift_events import event_stream
+from app.services.gift_stats import get_gift_stats
+from app.services.job_queue import enqueue
 
 router = APIRouter()
 
+Sender = aliased(User)
+Recipient = aliased(User)
+
+# Long free-text columns only the detail view returns
+DETAIL_ONLY_COLUMNS = {"gift_description", "agent_reasoning"}
+
+# Timestamps a gift list's Last-Modified is taken from
+GIFT_TIMESTAMPS = ("created_at", "ordered_at", "delivered_at")
+
+
+def _gifts_query(detail: bool = False):
+    """Gift columns plus both usernames in one join (no per-gift user lookups)"""
+    columns = [
+        column for column in Gift.__table__.c
+        if detail or column.name not in DETAIL_ONLY_COLUMNS
+    ]
+    return (
+        select(
+            *columns,
+            Sender.username.label("sender_username"),
+            Recipient.username.label("recipient_username"),
+        )
+        .outerjoin(Sender, Sender.id == Gift.sender_id)
+        .outerjoin(Recipient, Recipient.id == Gift.recipient_id)
+    )
+
 
 @router.post("/", response_model=GiftResponse, status_code=status.HTTP_201_CREATED)
 async def create_gift(
     gift_data: GiftCreate,
-    background_tasks: BackgroundTasks,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    idempotency: IdempotentRequest = Depends(idempotent),
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new gift (send to friend)"""
-    # Verify friendship
-    friendship = db.query(Friendship).filter(
-        Friendship.user_id == current_user.id,
-        Friendship.friend_id == gift_data.recipient_id
-    ).first()
+    replay = await idempotency.begin()
+    if replay:
+        return replay
 
-    if not friendship:
+    # Verify friendship
+    if not await friend_graph.are_friends(db, current_user.id, gift_data.recipient_id, confirm=True):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You can only send gifts to your friends"
         )
 
     # Get recipient's persona for delivery address if not provided
-    recipient_persona = db.query(Persona).filter(Persona.user_id == gift_data.recipient_id).first()
+    recipient_persona = await db.scalar(select(Persona).where(Persona.user_id == gift_data.recipient_id))
     delivery_address = gift_data.delivery_address
     if not delivery_address and recipient_persona:
         delivery_address = recipient_persona.default_address
@@ -61,80 +99,167 @@ async def create_gift(
         status=GiftStatus.AGENT_PICKING
     )
     db.add(gift)
-    db.commit()
-    db.refresh(gift)
-
-    # Trigger agent to pick gift in background
-    background_tasks.add_task(
-        GiftAgentService.pick_gift,
-        gift_id=gift.id,
-        db_url=str(db.get_bind().url)
-    )
+    await db.flush()
 
-    recipient = db.query(User).filter(User.id == gift_data.recipient_id).first()
+    # Queue the agent's pick in the same transaction as the gift
+    enqueue(db, "pick_gift", gift_id=gift.id)
+    await db.refresh(gift)
+
+    recipient = await db.scalar(select(User).where(User.id == gift_data.recipient_id))
     response = GiftResponse.model_validate(gift)
     response.sender_username = current_user.username
     response.recipient_username = recipient.username if recipient else None
 
+    # Stored response, gift and job commit together
+    await idempotency.save(db, response, status_code=status.HTTP_201_CREATED)
+    await db.commit()
     return response
 
 
-@router.get("/sent", response_model=List[GiftResponse])
+@router.post("/bulk", response_model=GiftBulkResponse)
+async def create_gifts_bulk(
+    gift_data: GiftBulkCreate,
+    current_user: Principal = Depends(get_current_principal),
+    idempotency: IdempotentRequest = Depends(idempotent),
+    db: AsyncSession = Depends(get_db)
+):
+    """Send the same gift brief to many friends - one transaction, one agent job"""
+    replay = await idempotency.begin()
+    if replay:
+        return replay
+
+    recipient_ids = list(dict.fromkeys(gift_data.recipient_ids))
+    friends = await friend_graph.friends_among(db, current_user.id, recipient_ids, confirm=True)
+    addresses = dict((await db.execute(
+        select(Persona.user_id, Persona.default_address).where(Persona.user_id.in_(friends))
+    )).all()) if friends else {}
+
+    errors = {}
+    gifts = []
+    for recipient_id in recipient_ids:
+        if recipient_id not in friends:
+            errors[recipient_id] = "You can only send gifts to your friends"
+        elif gift_data.is_surprise and not addresses.get(recipient_id):
+            errors[recipient_id] = "Friend has no delivery address set"
+        else:
+            gifts.append(Gift(
+                sender_id=current_user.id,
+                recipient_id=recipient_id,
+                vibe_prompt=gift_data.vibe_prompt,
+                budget_min=gift_data.budget_min,
+                budget_max=gift_data.budget_max,
+                is_surprise=gift_data.is_surprise,
+                sender_message=gift_data.sender_message,
+                delivery_address=addresses.get(recipient_id),
+                status=GiftStatus.AGENT_PICKING
+            ))
+
+    created = {}
+    if gifts:
+        db.add_all(gifts)
+        await db.flush()
+        gift_ids = [gift.id for gift in gifts]
+        enqueue(db, "pick_gifts", gift_ids=gift_ids)
+        rows = await db.execute(_gifts_query(detail=True).where(Gift.id.in_(gift_ids)))
+        created = {row.recipient_id: GiftResponse.model_validate(row._mapping) for row in rows}
+
+    response = GiftBulkResponse(
+        created=len(created),
+        results=[
+            GiftBulkResult(recipient_id=recipient_id, gift=created.get(recipient_id), error=errors.get(recipient_id))
+            for recipient_id in recipient_ids
+        ],
+    )
+    await idempotency.save(db, response)
+    await db.commit()
+    return response
+
+
+@router.get("/sent", response_model=List[GiftSummaryResponse])
 async def get_sent_gifts(
     status_filter: GiftStatus = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get all gifts sent by current user"""
-    query = db.query(Gift).filter(Gift.sender_id == current_user.id)
+    """Get gifts sent by current user (newest first, paginated)"""
+    query = _gifts_query().where(Gift.sender_id == current_user.id)
     if status_filter:
-        query = query.filter(Gift.status == status_filter)
-
-    gifts = query.order_by(Gift.created_at.desc()).all()
+        query = query.where(Gift.status == status_filter)
 
-    result = []
-    for gift in gifts:
-        recipient = db.query(User).filter(User.id == gift.recipient_id).first()
-        response = GiftResponse.model_validate(gift)
-        response.sender_username = current_user.username
-        response.recipient_username = recipient.username if recipient else None
-        result.append(response)
-
-    return result
+    query = page.apply(query, Gift.created_at, Gift.id, db.get_bind().dialect.name)
+    rows = page.page((await db.execute(query)).all())
+    not_modified = check_not_modified(
+        page.request, page.response,
+        rows_etag(rows, page.next_cursor), last_modified_of(rows, *GIFT_TIMESTAMPS)
+    )
+    if not_modified:
+        return not_modified
+    return [GiftSummaryResponse.model_validate(row._mapping) for row in rows]
 
 
-@router.get("/received", response_model=List[GiftResponse])
+@router.get("/received", response_model=List[GiftSummaryResponse])
 async def get_received_gifts(
     status_filter: GiftStatus = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get all gifts received by current user"""
-    query = db.query(Gift).filter(Gift.recipient_id == current_user.id)
+    """Get gifts received by current user (newest first, paginated)"""
+    query = _gifts_query().where(Gift.recipient_id == current_user.id)
     if status_filter:
-        query = query.filter(Gift.status == status_filter)
+        query = query.where(Gift.status == status_filter)
 
-    gifts = query.order_by(Gift.created_at.desc()).all()
+    query = page.apply(query, Gift.created_at, Gift.id, db.get_bind().dialect.name)
+    rows = page.page((await db.execute(query)).all())
+    not_modified = check_not_modified(
+        page.request, page.response,
+        rows_etag(rows, page.next_cursor), last_modified_of(rows, *GIFT_TIMESTAMPS)
+    )
+    if not_modified:
+        return not_modified
+    return [GiftSummaryResponse.model_validate(row._mapping) for row in rows]
 
-    result = []
-    for gift in gifts:
-        sender = db.query(User).filter(User.id == gift.sender_id).first()
-        response = GiftResponse.model_validate(gift)
-        response.sender_username = sender.username if sender else None
-        response.recipient_username = current_user.username
-        result.append(response)
 
-    return result
+@router.get("/stats", response_model=GiftStatsResponse)
+async def gift_stats(
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Gift counts by status, spend per friend and this month's spend"""
+    return await get_gift_stats(db, current_user.id)
 
 
-@router.get("/{gift_id}", response_model=GiftResponse)
-async def get_gift(
-    gift_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+@router.get("/events")
+async def gift_events(
+    request: Request,
+    last_event_id: Optional[int] = Query(None, description="Resume after this event (same as the Last-Event-ID header)"),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get gift details"""
-    gift = db.query(Gift).filter(Gift.id == gift_id).first()
+    """Server-sent events for status changes of gifts you sent or received"""
+    header = request.headers.get("last-event-id")
+    if header is not None:
+        try:
+            last_event_id = int(header)
+        except ValueError:
+            last_event_id = None
+
+    # The stream outlives this request - don't keep the auth session's
+    # connection checked out for it
+    await db.close()
+    return StreamingResponse(
+        event_stream(current_user.id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _gift_etag(gift_id: int, version: int) -> str:
+    return weak_etag("gift", gift_id, version)
+
+
+def _check_can_view(gift, user_id: int):
     if not gift:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -142,36 +267,57 @@ async def get_gift(
         )
 
     # Only sender or recipient can view
-    if gift.sender_id != current_user.id and gift.recipient_id != current_user.id:
+    if gift.sender_id != user_id and gift.recipient_id != user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to view this gift"
         )
 
-    sender = db.query(User).filter(User.id == gift.sender_id).first()
-    recipient = db.query(User).filter(User.id == gift.recipient_id).first()
-
-    response = GiftResponse.model_validate(gift)
-    response.sender_username = sender.username if sender else None
-    response.recipient_username = recipient.username if recipient else None
 
-    return response
+@router.get("/{gift_id:int}", response_model=GiftResponse)
+async def get_gift(
+    gift_id: int,
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get gift details (conditional - the client polls this while the agent is picking)"""
+    if "if-none-match" in request.headers:
+        # Revalidation only needs the version, not the joined detail row
+        current = (await db.execute(
+            select(Gift.sender_id, Gift.recipient_id, Gift.version).where(Gift.id == gift_id)
+        )).first()
+        _check_can_view(current, current_user.id)
+        not_modified = check_not_modified(request, response, _gift_etag(gift_id, current.version))
+        if not_modified:
+            return not_modified
+
+    gift = (await db.execute(_gifts_query(detail=True).where(Gift.id == gift_id))).first()
+    _check_can_view(gift, current_user.id)
+    check_not_modified(request, response, _gift_etag(gift_id, gift.version))
+    return GiftResponse.model_validate(gift._mapping)
 
 
 @router.post("/{gift_id}/approve", response_model=GiftResponse)
 async def approve_gift(
     gift_id: int,
     approval: GiftApproval,
-    background_tasks: BackgroundTasks,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    idempotency: IdempotentRequest = Depends(idempotent),
+    db: AsyncSession = Depends(get_db)
 ):
     """Approve or reject agent's gift selection (sender only)"""
-    gift = db.query(Gift).filter(
+    # A retried approve must not place a second order
+    replay = await idempotency.begin()
+    if replay:
+        return replay
+
+    gift = await db.scalar(select(Gift).where(
         Gift.id == gift_id,
         Gift.sender_id == current_user.id,
         Gift.status == GiftStatus.AWAITING_APPROVAL
-    ).first()
+    ))
 
     if not gift:
         raise HTTPException(
@@ -182,32 +328,31 @@ async def approve_gift(
     if approval.approved:
         gift.status = GiftStatus.ORDERED
         gift.ordered_at = datetime.utcnow()
-        # Trigger order in background
-        background_tasks.add_task(
-            GiftAgentService.place_order,
-            gift_id=gift.id,
-            db_url=str(db.get_bind().url)
-        )
+        # Queue the order - committed together with the status change
+        enqueue(db, "place_order", gift_id=gift.id)
     else:
         gift.status = GiftStatus.CANCELLED
 
-    db.commit()
-    db.refresh(gift)
-    return gift
+    await db.flush()
+    await db.refresh(gift)
+    response = GiftResponse.model_validate(gift)
+    await idempotency.save(db, response)
+    await db.commit()
+    return response
 
 
 @router.post("/{gift_id}/reaction", response_model=GiftResponse)
 async def add_reaction(
     gift_id: int,
     reaction: GiftReaction,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Add recipient's reaction to gift"""
-    gift = db.query(Gift).filter(
+    gift = await db.scalar(select(Gift).where(
         Gift.id == gift_id,
         Gift.recipient_id == current_user.id
-    ).first()
+    ))
 
     if not gift:
         raise HTTPException(
@@ -216,8 +361,8 @@ async def add_reaction(
         )
 
     gift.recipient_reaction = reaction.reaction
-    db.commit()
-    db.refresh(gift)
+    await db.commit()
+    await db.refresh(gift)
     return gift
 
 
@@ -225,27 +370,26 @@ async def add_reaction(
 async def surprise_friend(
     friend_id: int,
     budget_max: float,
-    background_tasks: BackgroundTasks,
     vibe_prompt: str = "something chaotic and fun",
     budget_min: float = 0,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    idempotency: IdempotentRequest = Depends(idempotent),
+    db: AsyncSession = Depends(get_db)
 ):
     """Quick surprise gift - YOLO mode (no approval needed)"""
-    # Verify friendship
-    friendship = db.query(Friendship).filter(
-        Friendship.user_id == current_user.id,
-        Friendship.friend_id == friend_id
-    ).first()
+    replay = await idempotency.begin()
+    if replay:
+        return replay
 
-    if not friendship:
+    # Verify friendship
+    if not await friend_graph.are_friends(db, current_user.id, friend_id, confirm=True):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You can only surprise your friends"
         )
 
     # Get recipient's persona for delivery
-    recipient_persona = db.query(Persona).filter(Persona.user_id == friend_id).first()
+    recipient_persona = await db.scalar(select(Persona).where(Persona.user_id == friend_id))
     delivery_address = recipient_persona.default_address if recipient_persona else None
 
     if not delivery_address:
@@ -266,17 +410,16 @@ async def surprise_friend(
         status=GiftStatus.AGENT_PICKING
     )
     db.add(gift)
-    db.commit()
-    db.refresh(gift)
-
-    # Trigger agent
-    background_tasks.add_task(
-        GiftAgentService.pick_and_order_gift,
-        gift_id=gift.id,
-        db_url=str(db.get_bind().url)
-    )
+    await db.flush()
 
-    return gift
+    # Queue the agent
+    enqueue(db, "pick_and_order_gift", gift_id=gift.id)
+    await db.refresh(gift)
+
+    response = GiftResponse.model_validate(gift)
+    await idempotency.save(db, response)
+    await db.commit()
+    return response
 
 
 # ==================== SUBSCRIPTIONS ====================
@@ -284,17 +427,12 @@ async def surprise_friend(
 @router.post("/subscriptions", response_model=GiftSubscriptionResponse, status_code=status.HTTP_201_CREATED)
 async def create_subscription(
     sub_data: GiftSubscriptionCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Create automated recurring gift subscription"""
     # Verify friendship
-    friendship = db.query(Friendship).filter(
-        Friendship.user_id == current_user.id,
-        Friendship.friend_id == sub_data.recipient_id
-    ).first()
-
-    if not friendship:
+    if not await friend_graph.are_friends(db, current_user.id, sub_data.recipient_id, confirm=True):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You can only subscribe to gift your friends"
@@ -312,10 +450,10 @@ async def create_subscription(
         budget_max=sub_data.budget_max,
     )
     db.add(subscription)
-    db.commit()
-    db.refresh(subscription)
+    await db.commit()
+    await db.refresh(subscription)
 
-    recipient = db.query(User).filter(User.id == sub_data.recipient_id).first()
+    recipient = await db.scalar(select(User).where(User.id == sub_data.recipient_id))
     response = GiftSubscriptionResponse.model_validate(subscription)
     response.recipient_username = recipient.username if recipient else None
 
@@ -324,19 +462,26 @@ async def create_subscription(
 
 @router.get("/subscriptions", response_model=List[GiftSubscriptionResponse])
 async def get_subscriptions(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get all gift subscriptions"""
-    subscriptions = db.query(GiftSubscription).filter(
-        GiftSubscription.sender_id == current_user.id
-    ).all()
+    """Get gift subscriptions (newest first, paginated)"""
+    query = page.apply(
+        select(GiftSubscription, User.username)
+        .outerjoin(User, User.id == GiftSubscription.recipient_id)
+        .where(GiftSubscription.sender_id == current_user.id),
+        GiftSubscription.created_at, GiftSubscription.id, db.get_bind().dialect.name
+    )
+    rows = page.page(
+        (await db.execute(query)).all(),
+        key=lambda row: (row.GiftSubscription.created_at, row.GiftSubscription.id)
+    )
 
     result = []
-    for sub in subscriptions:
-        recipient = db.query(User).filter(User.id == sub.recipient_id).first()
+    for sub, recipient_username in rows:
         response = GiftSubscriptionResponse.model_validate(sub)
-        response.recipient_username = recipient.username if recipient else None
+        response.recipient_username = recipient_username
         result.append(response)
 
     return result
@@ -346,14 +491,14 @@ async def get_subscriptions(
 async def update_subscription(
     subscription_id: int,
     sub_data: GiftSubscriptionUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Update gift subscription"""
-    subscription = db.query(GiftSubscription).filter(
+    subscription = await db.scalar(select(GiftSubscription).where(
         GiftSubscription.id == subscription_id,
         GiftSubscription.sender_id == current_user.id
-    ).first()
+    ))
 
     if not subscription:
         raise HTTPException(
@@ -365,22 +510,22 @@ async def update_subscription(
     for key, value in update_data.items():
         setattr(subscription, key, value)
 
-    db.commit()
-    db.refresh(subscription)
+    await db.commit()
+    await db.refresh(subscription)
     return subscription
 
 
 @router.delete("/subscriptions/{subscription_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def cancel_subscription(
     subscription_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Cancel gift subscription"""
-    subscription = db.query(GiftSubscription).filter(
+    subscription = await db.scalar(select(GiftSubscription).where(
         GiftSubscription.id == subscription_id,
         GiftSubscription.sender_id == current_user.id
-    ).first()
+    ))
 
     if not subscription:
         raise HTTPException(
@@ -388,6 +533,6 @@ async def cancel_subscription(
             detail="Subscription not found"
         )
 
-    db.delete(subscription)
-    db.commit()
+    await db.delete(subscription)
+    await db.commit()
     return None
@@ -0,0 +1,25 @@
+"""
+Internal API Routes
+Operational stats for monitoring - not part of the public client API.
+Every route requires the X-Internal-Token header (settings.INTERNAL_API_TOKEN).
+"""
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db
+from app.core.metrics import job_stats, pool_stats
+from app.core.security import require_internal_token
+from app.services.job_queue import queue_stats
+
+router = APIRouter(dependencies=[Depends(require_internal_token)])
+
+
+@router.get("/stats/db-pool")
+async def get_db_pool_stats():
+    """Connection-pool occupancy, overflow usage and checkout wait times"""
+    return {"pools": pool_stats()}
+
+
+@router.get("/stats/jobs")
+async def get_job_stats(db: AsyncSession = Depends(get_db)):
+    """Queue depth per job type (all workers) and this process's run counters"""
+    return {"queue": await queue_stats(db), "processed": job_stats()}
@@ -1,40 +1,53 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from app.core.database import get_db
-from app.core.security import get_current_user
-from app.models.user import User
+from app.core.database import get_db, get_read_db
+from app.core.http_cache import check_not_modified, weak_etag
+from app.core.security import Principal, get_current_principal
 from app.models.persona import Persona, VibeTags
-from app.models.friend import Friendship
 from app.schemas.persona import PersonaCreate, PersonaUpdate, PersonaResponse, VibeTagResponse
+from app.services.friend_graph import friend_graph
 
 router = APIRouter()
 
 
+def _check_persona_cache(request: Request, response: Response, persona: Persona):
+    """Validators for a persona (its version is bumped on every update)"""
+    return check_not_modified(
+        request, response,
+        weak_etag("persona", persona.id, persona.version),
+        persona.updated_at or persona.created_at,
+    )
+
+
 @router.get("/me", response_model=PersonaResponse)
 async def get_my_persona(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_principal),
+    read_db: AsyncSession = Depends(get_read_db),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get current user's persona"""
-    persona = db.query(Persona).filter(Persona.user_id == current_user.id).first()
+    persona = await read_db.scalar(select(Persona).where(Persona.user_id == current_user.id))
     if not persona:
-        # Create default persona if doesn't exist
+        # Create default persona if doesn't exist (writes always go to the primary)
         persona = Persona(user_id=current_user.id)
         db.add(persona)
-        db.commit()
-        db.refresh(persona)
-    return persona
+        await db.commit()
+        await db.refresh(persona)
+    return _check_persona_cache(request, response, persona) or persona
 
 
 @router.put("/me", response_model=PersonaResponse)
 async def update_my_persona(
     persona_data: PersonaUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Update current user's persona"""
-    persona = db.query(Persona).filter(Persona.user_id == current_user.id).first()
+    persona = await db.scalar(select(Persona).where(Persona.user_id == current_user.id))
     if not persona:
         persona = Persona(user_id=current_user.id)
         db.add(persona)
@@ -43,50 +56,48 @@ async def update_my_persona(
     for key, value in update_data.items():
         setattr(persona, key, value)
 
-    db.commit()
-    db.refresh(persona)
+    await db.commit()
+    await db.refresh(persona)
     return persona
 
 
 @router.get("/friend/{friend_id}", response_model=PersonaResponse)
 async def get_friend_persona(
     friend_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get a friend's persona (must be friends)"""
     # Verify friendship
-    friendship = db.query(Friendship).filter(
-        Friendship.user_id == current_user.id,
-        Friendship.friend_id == friend_id
-    ).first()
-
-    if not friendship:
+    if not await friend_graph.are_friends(db, current_user.id, friend_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You can only view personas of your friends"
         )
 
-    persona = db.query(Persona).filter(Persona.user_id == friend_id).first()
+    persona = await db.scalar(select(Persona).where(Persona.user_id == friend_id))
     if not persona:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Persona not found"
         )
 
-    return persona
+    return _check_persona_cache(request, response, persona) or persona
 
 
 @router.get("/vibe-tags", response_model=List[VibeTagResponse])
 async def get_vibe_tags(
     category: str = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all available vibe tags"""
-    query = db.query(VibeTags)
+    query = select(VibeTags)
     if category:
-        query = query.filter(VibeTags.category == category)
-    return query.all()
+        query = query.where(VibeTags.category == category)
+    tags = await db.scalars(query)
+    return tags.all()
 
 
 @router.post("/vibe-tags", response_model=VibeTagResponse, status_code=status.HTTP_201_CREATED)
@@ -94,10 +105,10 @@ async def create_vibe_tag(
     name: str,
     category: str = None,
     description: str = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new vibe tag (admin)"""
-    existing = db.query(VibeTags).filter(VibeTags.name == name).first()
+    existing = await db.scalar(select(VibeTags).where(VibeTags.name == name))
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -106,19 +117,19 @@ async def create_vibe_tag(
 
     tag = VibeTags(name=name, category=category, description=description)
     db.add(tag)
-    db.commit()
-    db.refresh(tag)
+    await db.commit()
+    await db.refresh(tag)
     return tag
 
 
 @router.post("/me/vibe-tags/{tag_name}")
 async def add_vibe_tag_to_persona(
     tag_name: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Add a vibe tag to current user's persona"""
-    persona = db.query(Persona).filter(Persona.user_id == current_user.id).first()
+    persona = await db.scalar(select(Persona).where(Persona.user_id == current_user.id))
     if not persona:
         persona = Persona(user_id=current_user.id, vibe_tags=[])
         db.add(persona)
@@ -129,18 +140,18 @@ async def add_vibe_tag_to_persona(
     if tag_name not in persona.vibe_tags:
         persona.vibe_tags = persona.vibe_tags + [tag_name]
 
-    db.commit()
+    await db.commit()
     return {"message": f"Added '{tag_name}' to your vibe tags"}
 
 
 @router.delete("/me/vibe-tags/{tag_name}")
 async def remove_vibe_tag_from_persona(
     tag_name: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Remove a vibe tag from current user's persona"""
-    persona = db.query(Persona).filter(Persona.user_id == current_user.id).first()
+    persona = await db.scalar(select(Persona).where(Persona.user_id == current_user.id))
     if not persona or not persona.vibe_tags:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -150,6 +161,6 @@ async def remove_vibe_tag_from_persona(
     if tag_name in persona.vibe_tags:
         new_tags = [t for t in persona.vibe_tags if t != tag_name]
         persona.vibe_tags = new_tags
-        db.commit()
+        await db.commit()
 
     return {"message": f"Removed '{tag_name}' from your vibe tags"}
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy.orm import Session
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from app.core.database import get_db
-from app.core.security import get_current_user
-from app.models.user import User
+from app.core.pagination import PageParams
+from app.core.security import Principal, get_current_principal
 from app.models.social import SocialConnection, SocialPlatform
 from app.models.persona import Persona
 from app.services.instagram_service import InstagramService
@@ -46,35 +47,37 @@ class InstagramProfileResponse(BaseModel):
 
 @router.get("/connections", response_model=List[SocialConnectionResponse])
 async def get_social_connections(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get all social connections for current user"""
-    connections = db.query(SocialConnection).filter(
-        SocialConnection.user_id == current_user.id
-    ).all()
-    return connections
+    """Get social connections for current user (newest first, paginated)"""
+    query = page.apply(
+        select(SocialConnection).where(SocialConnection.user_id == current_user.id),
+        SocialConnection.created_at, SocialConnection.id, db.get_bind().dialect.name
+    )
+    return page.page((await db.scalars(query)).all())
 
 
 @router.post("/instagram/connect", response_model=SocialConnectionResponse)
 async def connect_instagram(
     request: InstagramConnectRequest,
     background_tasks: BackgroundTasks,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Connect Instagram account by username (public profile fetch)"""
     # Check if already connected
-    existing = db.query(SocialConnection).filter(
+    existing = await db.scalar(select(SocialConnection).where(
         SocialConnection.user_id == current_user.id,
         SocialConnection.platform == SocialPlatform.INSTAGRAM
-    ).first()
+    ))
 
     if existing:
         # Update username
         existing.platform_username = request.username
         existing.last_synced_at = None  # Will be updated after sync
-        db.commit()
+        await db.commit()
         connection = existing
     else:
         # Create new connection
@@ -84,14 +87,13 @@ async def connect_instagram(
             platform_username=request.username
         )
         db.add(connection)
-        db.commit()
-        db.refresh(connection)
+        await db.commit()
+        await db.refresh(connection)
 
     # Trigger background sync
     background_tasks.add_task(
         InstagramService.sync_profile,
-        connection_id=connection.id,
-        db_url=str(db.get_bind().url)
+        connection_id=connection.id
     )
 
     return connection
@@ -100,14 +102,14 @@ async def connect_instagram(
 @router.post("/instagram/sync")
 async def sync_instagram(
     background_tasks: BackgroundTasks,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Manually trigger Instagram profile sync"""
-    connection = db.query(SocialConnection).filter(
+    connection = await db.scalar(select(SocialConnection).where(
         SocialConnection.user_id == current_user.id,
         SocialConnection.platform == SocialPlatform.INSTAGRAM
-    ).first()
+    ))
 
     if not connection:
         raise HTTPException(
@@ -117,8 +119,7 @@ async def sync_instagram(
 
     background_tasks.add_task(
         InstagramService.sync_profile,
-        connection_id=connection.id,
-        db_url=str(db.get_bind().url)
+        connection_id=connection.id
     )
 
     return {"message": "Sync started"}
@@ -127,7 +128,7 @@ async def sync_instagram(
 @router.get("/instagram/profile/{username}", response_model=InstagramProfileResponse)
 async def get_instagram_profile(
     username: str,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
 ):
     """Fetch public Instagram profile data"""
     profile = await InstagramService.fetch_profile(username)
@@ -141,23 +142,23 @@ async def get_instagram_profile(
 
 @router.delete("/instagram", status_code=status.HTTP_204_NO_CONTENT)
 async def disconnect_instagram(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Disconnect Instagram account"""
-    db.query(SocialConnection).filter(
+    await db.execute(delete(SocialConnection).where(
         SocialConnection.user_id == current_user.id,
         SocialConnection.platform == SocialPlatform.INSTAGRAM
-    ).delete()
-    db.commit()
+    ))
+    await db.commit()
     return None
 
 
 @router.post("/instagram/analyze-for-gifts")
 async def analyze_instagram_for_gifts(
     username: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Analyze Instagram profile to suggest gift ideas"""
     analysis = await InstagramService.analyze_for_gifts(username)
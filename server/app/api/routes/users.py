@@ -1,13 +1,84 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
-from app.core.security import get_current_user
+import hashlib
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Iterable, List
+from app.core.config import settings
+from app.core.database import get_db, get_read_db
+from app.core.rate_limit import RateLimit
+from app.core.security import Principal, get_current_principal, get_current_user, invalidate_principal
 from app.models.user import User
-from app.schemas.user import UserResponse, UserUpdate
+from app.schemas.user import UserBatchRequest, UserResponse, UserSummary, UserUpdate
+from app.services.user_search import search_users as run_user_search
 
 router = APIRouter()
 
+search_limit = RateLimit("user_search", settings.RATE_LIMIT_USER_SEARCH)
+
+MAX_BATCH_IDS_GET = 100
+
+# Batch lookups are user-scoped; let the client reuse them briefly
+BATCH_CACHE_CONTROL = "private, max-age=60"
+
+
+async def _user_summaries(db: AsyncSession, ids: Iterable[int]) -> List[UserSummary]:
+    """One IN query for a set of users, returned in the order requested"""
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return []
+    rows = await db.execute(
+        select(User.id, User.username, User.full_name, User.avatar_url, User.updated_at)
+        .where(User.id.in_(ids))
+    )
+    summaries = {}
+    for user_id, username, full_name, avatar_url, updated_at in rows.all():
+        digest = hashlib.sha1(f"{user_id}|{username}|{full_name}|{avatar_url}|{updated_at}".encode()).hexdigest()
+        summaries[user_id] = UserSummary(
+            id=user_id,
+            username=username,
+            full_name=full_name,
+            avatar_url=avatar_url,
+            etag=f'W/"{digest[:16]}"',
+        )
+    return [summaries[i] for i in ids if i in summaries]
+
+
+@router.get("", response_model=List[UserSummary])
+async def get_users_batch(
+    response: Response,
+    ids: str = Query(..., description="Comma-separated user ids, e.g. 1,2,3"),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Look up several users at once; unknown ids are left out"""
+    try:
+        user_ids = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="ids must be a comma-separated list of integers"
+        )
+    if len(user_ids) > MAX_BATCH_IDS_GET:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"At most {MAX_BATCH_IDS_GET} ids per GET - use POST /users/batch for larger sets"
+        )
+
+    response.headers["Cache-Control"] = BATCH_CACHE_CONTROL
+    return await _user_summaries(db, user_ids)
+
+
+@router.post("/batch", response_model=List[UserSummary])
+async def post_users_batch(
+    batch: UserBatchRequest,
+    response: Response,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Look up a large set of users at once; unknown ids are left out"""
+    response.headers["Cache-Control"] = BATCH_CACHE_CONTROL
+    return await _user_summaries(db, batch.ids)
+
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_profile(current_user: User = Depends(get_current_user)):
@@ -19,40 +90,37 @@ async def get_current_user_profile(current_user: User = Depends(get_current_user
 async def update_profile(
     user_data: UserUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update current user's profile"""
     update_data = user_data.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(current_user, key, value)
 
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
+    invalidate_principal(current_user.id)
     return current_user
 
 
-@router.get("/search", response_model=List[UserResponse])
+@router.get("/search", response_model=List[UserResponse], dependencies=[Depends(search_limit)])
 async def search_users(
     q: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Search users by username or email"""
-    users = db.query(User).filter(
-        User.id != current_user.id,
-        (User.username.ilike(f"%{q}%") | User.email.ilike(f"%{q}%"))
-    ).limit(20).all()
-    return users
+    """Search users by username or email (exact, then prefix, then substring matches; friends excluded)"""
+    return await run_user_search(db, q, current_user.id, limit=20)
 
 
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get user by ID"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).where(User.id == user_id))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -0,0 +1,45 @@
+"""
+Contact normalization
+Canonical forms + hashes for emails/phone numbers so address-book imports
+can be matched against users without comparing raw values.
+"""
+import hashlib
+import re
+from typing import Optional
+from app.core.config import settings
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    if not email:
+        return None
+    email = email.strip().lower()
+    return email if "@" in email else None
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """
+    Digits only, trimmed to the trailing CONTACT_PHONE_MATCH_DIGITS so
+    "+91 98765 43210", "098765-43210" and "9876543210" all match.
+    """
+    if not phone:
+        return None
+    digits = _NON_DIGITS.sub("", phone)
+    if len(digits) < settings.CONTACT_PHONE_MATCH_DIGITS:
+        return None
+    return digits[-settings.CONTACT_PHONE_MATCH_DIGITS:]
+
+
+def contact_hash(normalized: Optional[str]) -> Optional[str]:
+    if normalized is None:
+        return None
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def email_hash(email: Optional[str]) -> Optional[str]:
+    return contact_hash(normalize_email(email))
+
+
+def phone_hash(phone: Optional[str]) -> Optional[str]:
+    return contact_hash(normalize_phone(phone))
@@ -1,17 +1,175 @@
+import os
+import threading
+from typing import Dict, Optional
+from fastapi import Request
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool, instrument_engine
 
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ALEMBIC_INI = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../alembic.ini"))
+
+# Clients send this header right after a write to read their own writes
+READ_PRIMARY_HEADER = "X-Read-Primary"
+
+# Async drivers used for the request path, keyed by backend name
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
+
+
+def to_async_url(database_url: str) -> str:
+    """Swap the sync DBAPI driver in a database URL for its asyncio counterpart"""
+    url = make_url(database_url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        return database_url
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+
+
+def _engine_name(database_url: str, is_async: bool = False) -> str:
+    """Label used for an engine's pool in logs and pool stats"""
+    if database_url == settings.DATABASE_URL:
+        name = "primary"
+    elif database_url == settings.READ_DATABASE_URL:
+        name = "replica"
+    else:
+        name = make_url(database_url).render_as_string(hide_password=True)
+    return f"{name}_async" if is_async else name
+
+
+def _pool_kwargs(database_url: str, is_async: bool = False) -> dict:
+    """Pool sizing for a URL (SQLite picks its own pool class, so leave it alone)"""
+    kwargs = {"pool_logging_name": _engine_name(database_url, is_async)}
+    if make_url(database_url).get_backend_name() == "sqlite":
+        return kwargs
+    kwargs.update({
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    })
+    return kwargs
+
+
+# Process-wide engine registry - background tasks and the scheduler share
+# these instead of building (and leaking) a new pool per call
+_engines: Dict[str, Engine] = {}
+_session_factories: Dict[str, sessionmaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_engine(database_url: Optional[str] = None) -> Engine:
+    """Get or create the shared sync engine for a database URL"""
+    database_url = database_url or settings.DATABASE_URL
+    with _registry_lock:
+        engine = _engines.get(database_url)
+        if engine is None:
+            engine = create_engine(database_url, **_pool_kwargs(database_url))
+            instrument_engine(engine, _engine_name(database_url))
+            _engines[database_url] = engine
+        return engine
+
+
+def get_session_factory(database_url: Optional[str] = None) -> sessionmaker:
+    """Get or create the shared sessionmaker bound to get_engine(database_url)"""
+    database_url = database_url or settings.DATABASE_URL
+    engine = get_engine(database_url)
+    with _registry_lock:
+        factory = _session_factories.get(database_url)
+        if factory is None:
+            factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            _session_factories[database_url] = factory
+        return factory
+
+
+def dispose_engines():
+    """Close every pooled connection held by the shared sync engines"""
+    with _registry_lock:
+        for engine in _engines.values():
+            engine.dispose()
+
+
+# Sync engine - used by the scheduler and background tasks
+engine = get_engine()
+SessionLocal = get_session_factory()
+
+# Async engine - used by all API routes so DB waits don't block the event loop
+async_engine = create_async_engine(
+    to_async_url(settings.DATABASE_URL),
+    **_pool_kwargs(settings.DATABASE_URL, is_async=True)
+)
+instrument_engine(async_engine.sync_engine, _engine_name(settings.DATABASE_URL, is_async=True))
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+# Optional read replica - without one, reads go to the primary
+read_async_engine = None
+AsyncReadSessionLocal = AsyncSessionLocal
+if settings.READ_DATABASE_URL:
+    read_async_engine = create_async_engine(
+        to_async_url(settings.READ_DATABASE_URL),
+        **_pool_kwargs(settings.READ_DATABASE_URL, is_async=True)
+    )
+    instrument_engine(read_async_engine.sync_engine, _engine_name(settings.READ_DATABASE_URL, is_async=True))
+    AsyncReadSessionLocal = async_sessionmaker(
+        bind=read_async_engine,
+        class_=AsyncSession,
+        autoflush=False,
+        expire_on_commit=False,
+    )
 
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_read_db(request: Request):
+    """Session for read-only handlers - uses the replica unless the client forces the primary"""
+    factory = AsyncReadSessionLocal
+    if request.headers.get(READ_PRIMARY_HEADER, "").lower() in ("1", "true", "yes"):
+        factory = AsyncSessionLocal
+    async with factory() as db:
         yield db
-    finally:
-        db.close()
+
+
+def _schema_revisions(connection) -> tuple:
+    """(revision the database is stamped with, latest revision in migrations/)"""
+    from alembic.config import Config
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    head = ScriptDirectory.from_config(Config(ALEMBIC_INI)).get_current_head()
+    current = MigrationContext.configure(connection).get_current_revision()
+    return current, head
+
+
+async def verify_schema_revision():
+    """Fail fast at startup if the database hasn't been migrated to head"""
+    async with async_engine.connect() as conn:
+        current, head = await conn.run_sync(_schema_revisions)
+    if current != head:
+        raise RuntimeError(
+            f"Database schema is at revision {current}, expected {head}. "
+            "Run `alembic upgrade head` from the server directory."
+        )
+
+
+async def dispose_async_engines():
+    """Close the pooled connections held by the async engines"""
+    await async_engine.dispose()
+    if read_async_engine is not None:
+        await read_async_engine.dispose()
@@ -0,0 +1,77 @@
+"""
+HTTP caching
+Weak ETags / Last-Modified for GET endpoints, so polling clients get a 304
+instead of a freshly serialized body when nothing changed.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Iterable, Optional
+from fastapi import Request, Response, status
+
+# Clients may keep a copy but must revalidate it on every use
+CACHE_CONTROL = "private, no-cache"
+
+
+def weak_etag(*parts) -> str:
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def rows_etag(rows: Iterable, *extra) -> str:
+    """ETag for a list response, from the rows it is built from"""
+    return weak_etag(*(tuple(row) for row in rows), *extra)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison against If-None-Match (which may list several tags or be *)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def _http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def set_cache_headers(response: Response, etag: str, last_modified: Optional[datetime] = None):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    if last_modified is not None:
+        response.headers["Last-Modified"] = _http_date(last_modified)
+
+
+def check_not_modified(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[datetime] = None,
+) -> Optional[Response]:
+    """
+    Set the validators on `response`; if the client's copy is current return a
+    bare 304 for the route to send instead of building the body.
+    """
+    set_cache_headers(response, etag, last_modified)
+    if not etag_matches(request, etag):
+        return None
+    headers = {
+        name: response.headers[name]
+        for name in ("ETag", "Cache-Control", "Last-Modified")
+        if name in response.headers
+    }
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+
+def last_modified_of(rows: Iterable, *fields: str) -> Optional[datetime]:
+    """Newest of the given timestamp fields across `rows`"""
+    values = [
+        value for row in rows for field in fields
+        if (value := getattr(row, field, None)) is not None
+    ]
+    return max(values) if values else None
@@ -0,0 +1,198 @@
+"""
+Idempotency Keys
+Lets clients safely retry non-idempotent POSTs (gift create, surprise,
+approve) by sending an Idempotency-Key header.
+
+The first request with a key claims it (a committed row, unique per user),
+runs, and writes its response onto the claim in the same transaction as its
+side effects - so a key either has a stored response and the gift/order, or
+neither. Retries with the same key and payload get that response back
+without re-running side effects. A duplicate arriving while the first is
+still running waits for it to finish, so concurrent retries are serialized
+across workers. A claim left unanswered by a request that died before
+committing is taken over once it is IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS old.
+Reusing a key for a different request is a 422.
+"""
+import asyncio
+import hashlib
+from datetime import datetime, timedelta
+from typing import Any, Optional
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, get_db
+from app.core.security import Principal, get_current_principal
+from app.models.idempotency import IdempotencyKey
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+POLL_SECONDS = 0.1
+
+
+class IdempotentRequest:
+    """
+    Per-request handle. Routes call begin() first and return its response if
+    there is one (a replay), then pass their result through save() on their
+    own session before committing.
+    """
+
+    def __init__(self, request: Request, user_id: int, key: Optional[str]):
+        self.request = request
+        self.user_id = user_id
+        self.key = key
+        self.claim_id: Optional[int] = None
+
+    @property
+    def claimed(self) -> bool:
+        return self.claim_id is not None
+
+    async def _fingerprint(self) -> str:
+        digest = hashlib.sha256()
+        for part in (self.request.method, self.request.url.path, self.request.url.query):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        digest.update(await self.request.body())
+        return digest.hexdigest()
+
+    async def _try_claim(self, session, request_hash: str) -> bool:
+        claim = IdempotencyKey(
+            user_id=self.user_id,
+            key=self.key,
+            request_hash=request_hash,
+            expires_at=datetime.utcnow() + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS),
+        )
+        session.add(claim)
+        try:
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+            return False
+        self.claim_id = claim.id
+        return True
+
+    @staticmethod
+    def _abandoned(existing: IdempotencyKey) -> bool:
+        """An unanswered claim too old to belong to a request that is still running"""
+        if existing.response_status is not None or existing.created_at is None:
+            return False
+        age = datetime.utcnow() - existing.created_at.replace(tzinfo=None)
+        return age >= timedelta(seconds=settings.IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS)
+
+    async def begin(self) -> Optional[JSONResponse]:
+        """Claim the key, or return the stored response of an earlier request with it"""
+        if self.key is None:
+            return None
+
+        request_hash = await self._fingerprint()
+        deadline = asyncio.get_running_loop().time() + settings.IDEMPOTENCY_WAIT_SECONDS
+        async with AsyncSessionLocal() as session:
+            while True:
+                existing = await session.scalar(select(IdempotencyKey).where(
+                    IdempotencyKey.user_id == self.user_id,
+                    IdempotencyKey.key == self.key,
+                ))
+                if existing is not None and existing.expires_at.replace(tzinfo=None) <= datetime.utcnow():
+                    await session.delete(existing)
+                    await session.commit()
+                    existing = None
+
+                if existing is not None and existing.request_hash == request_hash and self._abandoned(existing):
+                    # Its request died before committing; save() fences it out if it is somehow still alive
+                    await session.execute(delete(IdempotencyKey).where(
+                        IdempotencyKey.id == existing.id,
+                        IdempotencyKey.response_status.is_(None),
+                    ))
+                    await session.commit()
+                    session.expunge_all()
+                    continue
+
+                if existing is None:
+                    if await self._try_claim(session, request_hash):
+                        return None
+                    continue  # lost the race to a concurrent duplicate
+
+                if existing.request_hash != request_hash:
+                    raise HTTPException(
+                        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        detail=f"{IDEMPOTENCY_KEY_HEADER} was already used for a different request"
+                    )
+                if existing.response_status is not None:
+                    return JSONResponse(
+                        content=existing.response_body,
+                        status_code=existing.response_status,
+                        headers={REPLAYED_HEADER: "true"},
+                    )
+                if asyncio.get_running_loop().time() >= deadline:
+                    raise HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail=f"A request with this {IDEMPOTENCY_KEY_HEADER} is still in progress",
+                        headers={"Retry-After": "1"},
+                    )
+
+                # The original is still running - wait for its response
+                await session.rollback()
+                session.expunge_all()
+                await asyncio.sleep(POLL_SECONDS)
+
+    async def save(self, db: AsyncSession, content: Any, status_code: int = status.HTTP_200_OK) -> Any:
+        """
+        Write the response for replays through the route's session, so it is
+        committed (or rolled back) together with the route's side effects.
+        Call before the route's commit; returns `content` unchanged.
+        """
+        if not self.claimed:
+            return content
+        result = await db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.id == self.claim_id, IdempotencyKey.response_status.is_(None))
+            .values(response_status=status_code, response_body=jsonable_encoder(content))
+        )
+        if result.rowcount != 1:
+            # Our claim was taken over as abandoned - the retry owns the key now
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"A retry with this {IDEMPOTENCY_KEY_HEADER} took over the request",
+            )
+        return content
+
+    async def release(self, db: AsyncSession):
+        """
+        Drop the claim unless a response was committed for it, so the client's
+        retry runs the request again. Rolls back whatever the route left
+        uncommitted first - its side effects and the response go together.
+        """
+        await db.rollback()
+        await db.execute(delete(IdempotencyKey).where(
+            IdempotencyKey.id == self.claim_id,
+            IdempotencyKey.response_status.is_(None),
+        ))
+        await db.commit()
+
+
+async def idempotent(
+    request: Request,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    """Dependency for endpoints that honour Idempotency-Key"""
+    key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+    if key is not None and not 0 < len(key) <= MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{IDEMPOTENCY_KEY_HEADER} must be 1-{MAX_KEY_LENGTH} characters"
+        )
+
+    # `db` is the route's own session (dependencies are cached per request)
+    handle = IdempotentRequest(request, current_user.id, key)
+    try:
+        yield handle
+    finally:
+        # Failed, or returned without committing a response - let a retry
+        # through instead of making it wait out the in-progress claim
+        if handle.claimed:
+            await handle.release(db)
@@ -0,0 +1,256 @@
+"""
+Database Metrics
+Connection-pool instrumentation for the shared engines,
+per-request SQL statement counting and background job counters
+"""
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+
+class PoolMetrics:
+    """Running checkout counters for one named connection pool"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.engine: Optional[Engine] = None
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.overflow_checkouts = 0  # checkouts served beyond pool_size
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.timed_checkouts = 0
+        self.peak_checked_out = 0
+        self.peak_overflow = 0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        """Record how long a caller waited for a connection"""
+        with self._lock:
+            self.timed_checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def record_checkout(self, pool: Pool):
+        """Record a checkout and sample the pool's current occupancy"""
+        checked_out = pool.checkedout() if hasattr(pool, "checkedout") else 0
+        overflow = pool.overflow() if hasattr(pool, "overflow") else 0
+        with self._lock:
+            self.checkouts += 1
+            if overflow > 0:
+                self.overflow_checkouts += 1
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+            self.peak_overflow = max(self.peak_overflow, overflow)
+
+    def snapshot(self) -> dict:
+        """Current pool state plus counters since process start"""
+        pool = self.engine.pool if self.engine is not None else None
+        with self._lock:
+            data = {
+                "name": self.name,
+                "pool_class": type(pool).__name__ if pool is not None else None,
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "overflow_checkouts": self.overflow_checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait / self.timed_checkouts * 1000, 3) if self.timed_checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "peak_checked_out": self.peak_checked_out,
+                "peak_overflow": self.peak_overflow,
+            }
+        if isinstance(pool, QueuePool):
+            data.update({
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+            })
+        return data
+
+
+_pool_metrics: Dict[str, PoolMetrics] = {}
+_metrics_lock = threading.Lock()
+
+
+def get_pool_metrics(name: str) -> PoolMetrics:
+    """Get or create the metrics bucket for a pool name"""
+    with _metrics_lock:
+        metrics = _pool_metrics.get(name)
+        if metrics is None:
+            metrics = PoolMetrics(name)
+            _pool_metrics[name] = metrics
+        return metrics
+
+
+def pool_stats() -> list:
+    """Snapshots for every instrumented pool"""
+    with _metrics_lock:
+        metrics = list(_pool_metrics.values())
+    return [m.snapshot() for m in metrics]
+
+
+class _TimedCheckoutMixin:
+    """Times Pool.connect() so checkout waits show up in the pool's metrics"""
+
+    def connect(self):
+        metrics = get_pool_metrics(self.logging_name or type(self).__name__)
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_engine(engine: Engine, name: str) -> PoolMetrics:
+    """Attach pool event listeners that feed the named metrics bucket"""
+    metrics = get_pool_metrics(name)
+    metrics.engine = engine
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        metrics.record_connect()
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.record_checkout(engine.pool)
+
+    return metrics
+
+
+class QueryStats:
+    """Statements executed while handling a single request"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.total_time += seconds
+        self.statements[statement] += 1
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        """Statement shapes run at least `threshold` times - probable N+1 queries"""
+        return {stmt: n for stmt, n in self.statements.items() if n >= threshold}
+
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def start_query_stats():
+    """Begin collecting statements for the current request; returns a reset token"""
+    return _query_stats.set(QueryStats())
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _query_stats.get()
+
+
+def stop_query_stats(token):
+    _query_stats.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _query_stats.get() is not None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _query_stats.get()
+    start_times = conn.info.get("query_start_time")
+    if stats is None or not start_times:
+        return
+    stats.record(statement, time.perf_counter() - start_times.pop())
+
+
+def instrument_queries():
+    """Count statements and DB time for every engine (sync and async) in the process"""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class JobMetrics:
+    """Running counters for one job type in this process"""
+
+    def __init__(self, job_type: str):
+        self.job_type = job_type
+        self._lock = threading.Lock()
+        self.started = 0
+        self.succeeded = 0
+        self.retried = 0
+        self.failed = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.total_queue_delay = 0.0  # run_at -> claimed
+
+    def record_start(self, queue_delay: float):
+        with self._lock:
+            self.started += 1
+            self.total_queue_delay += max(queue_delay, 0.0)
+
+    def record_finish(self, seconds: float, outcome: str):
+        """Record a finished run - `outcome` is succeeded, retried or failed"""
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            self.total_time += seconds
+            self.max_time = max(self.max_time, seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            finished = self.succeeded + self.retried + self.failed
+            return {
+                "job_type": self.job_type,
+                "started": self.started,
+                "succeeded": self.succeeded,
+                "retried": self.retried,
+                "failed": self.failed,
+                "avg_run_ms": round(self.total_time / finished * 1000, 3) if finished else 0.0,
+                "max_run_ms": round(self.max_time * 1000, 3),
+                "avg_queue_delay_ms": round(self.total_queue_delay / self.started * 1000, 3) if self.started else 0.0,
+            }
+
+
+_job_metrics: Dict[str, JobMetrics] = {}
+
+
+def get_job_metrics(job_type: str) -> JobMetrics:
+    """Get or create the metrics bucket for a job type"""
+    with _metrics_lock:
+        metrics = _job_metrics.get(job_type)
+        if metrics is None:
+            metrics = JobMetrics(job_type)
+            _job_metrics[job_type] = metrics
+        return metrics
+
+
+def job_stats() -> list:
+    """Snapshots for every job type this process has run"""
+    with _metrics_lock:
+        metrics = list(_job_metrics.values())
+    return [m.snapshot() for m in metrics]
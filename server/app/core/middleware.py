@@ -0,0 +1,72 @@
+"""
+Request Middleware
+Per-request SQL statement counting and N+1 detection
+"""
+import json
+import logging
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+from app.core.metrics import start_query_stats, stop_query_stats, current_query_stats
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStatsMiddleware:
+    """
+    Counts statements and DB time per request.
+    Debug mode adds X-DB-Queries/X-DB-Time headers; every request that touches
+    the DB gets a structured log line, and repeated statement shapes are flagged
+    as probable N+1 queries.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = start_query_stats()
+        stats = current_query_stats()
+        status_code = 500
+
+        async def send_with_stats(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.DEBUG:
+                    headers = MutableHeaders(scope=message)
+                    headers["X-DB-Queries"] = str(stats.count)
+                    headers["X-DB-Time"] = f"{stats.total_time * 1000:.2f}ms"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            stop_query_stats(token)
+            self._log(scope, status_code, stats)
+
+    @staticmethod
+    def _log(scope: Scope, status_code: int, stats):
+        if stats.count == 0:
+            return
+
+        repeated = stats.repeated(settings.DB_N_PLUS_ONE_THRESHOLD)
+        entry = {
+            "event": "db_queries",
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status_code,
+            "queries": stats.count,
+            "db_time_ms": round(stats.total_time * 1000, 2),
+        }
+        if repeated:
+            entry["n_plus_one"] = [
+                {"statement": " ".join(stmt.split())[:200], "count": n}
+                for stmt, n in sorted(repeated.items(), key=lambda item: -item[1])
+            ]
+            logger.warning(json.dumps(entry))
+        else:
+            logger.info(json.dumps(entry))
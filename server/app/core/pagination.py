@@ -0,0 +1,84 @@
+"""
+Keyset pagination
+Newest-first pages over (created_at, id) with opaque cursors.
+
+List endpoints keep returning a plain JSON array; the cursor for the next
+page is sent in the X-Next-Cursor header (plus a Link: rel="next" header)
+and is absent on the last page.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+from fastapi import HTTPException, Query, Request, Response, status
+from sqlalchemy import String, or_, and_, type_coerce
+from sqlalchemy.sql import Select
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(sep=" "), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        datetime.fromisoformat(created_at)
+        return created_at, int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+class PageParams:
+    """Dependency carrying ?cursor=&limit= for a keyset-paginated list"""
+
+    def __init__(
+        self,
+        request: Request,
+        response: Response,
+        cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    ):
+        self.request = request
+        self.response = response
+        self.cursor = cursor
+        self.limit = limit
+        self.next_cursor: Optional[str] = None
+
+    def apply(self, query: Select, created_at_column, id_column, dialect: str) -> Select:
+        """Order newest-first, seek past the cursor and fetch one extra row to detect a next page"""
+        query = query.order_by(created_at_column.desc(), id_column.desc()).limit(self.limit + 1)
+        if self.cursor is None:
+            return query
+
+        created_at, row_id = decode_cursor(self.cursor)
+        if dialect == "sqlite":
+            # SQLite stores CURRENT_TIMESTAMP text without microseconds; compare
+            # as text in the same format instead of a re-rendered datetime
+            created_at = type_coerce(created_at, String)
+        else:
+            created_at = datetime.fromisoformat(created_at)
+        return query.where(or_(
+            created_at_column < created_at,
+            and_(created_at_column == created_at, id_column < row_id),
+        ))
+
+    def page(self, rows: Sequence[Any], key: Callable[[Any], Tuple[datetime, int]] = None) -> List[Any]:
+        """Trim the look-ahead row and publish the next cursor, if any"""
+        key = key or (lambda row: (row.created_at, row.id))
+        rows = list(rows)
+        if len(rows) > self.limit:
+            rows = rows[:self.limit]
+            cursor = self.next_cursor = encode_cursor(*key(rows[-1]))
+            next_url = self.request.url.include_query_params(cursor=cursor, limit=self.limit)
+            self.response.headers[NEXT_CURSOR_HEADER] = cursor
+            self.response.headers["Link"] = f'<{next_url}>; rel="next"'
+        return rows
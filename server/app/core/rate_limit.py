@@ -0,0 +1,132 @@
+"""
+Rate Limiting
+Token-bucket limits per user / per IP and concurrency-based load shedding
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from fastapi import HTTPException, Request, status
+from app.core.config import settings
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_rate(rate: str) -> Tuple[int, float]:
+    """Parse a budget like "10/minute" into (capacity, period seconds)"""
+    count, _, period = rate.partition("/")
+    return int(count), PERIODS[period.strip().rstrip("s")]
+
+
+class RateLimitBackend:
+    """
+    Token-bucket storage. Subclass and pass to set_rate_limit_backend() to
+    share buckets between workers (e.g. Redis); the default is in-process.
+    """
+
+    async def take(self, key: str, capacity: int, period: float) -> float:
+        """Consume one token; return 0 if allowed, else seconds until one is available"""
+        raise NotImplementedError
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Per-process buckets, LRU-bounded so idle keys don't accumulate"""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, capacity: int, period: float) -> float:
+        refill_rate = capacity / period
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (float(capacity), now))
+            tokens = min(float(capacity), tokens + (now - updated_at) * refill_rate)
+            if tokens >= 1:
+                retry_after = 0.0
+                tokens -= 1
+            else:
+                retry_after = (1 - tokens) / refill_rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+
+_backend: RateLimitBackend = InMemoryRateLimitBackend()
+
+
+def set_rate_limit_backend(backend: RateLimitBackend):
+    global _backend
+    _backend = backend
+
+
+def _client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def _user_key(request: Request) -> Optional[str]:
+    """User id from the bearer token, without touching the database"""
+    from app.core.security import decode_token
+
+    auth = request.headers.get("authorization", "")
+    if not auth.lower().startswith("bearer "):
+        return None
+    payload = decode_token(auth[7:])
+    if not payload or payload.get("sub") is None:
+        return None
+    return f"user:{payload['sub']}"
+
+
+class RateLimit:
+    """
+    Dependency enforcing a token-bucket budget on a route.
+    by="ip" keys on the client address; by="user" keys on the authenticated
+    user, falling back to the address for anonymous callers.
+    """
+
+    def __init__(self, name: str, rate: str, by: str = "user"):
+        self.name = name
+        self.capacity, self.period = parse_rate(rate)
+        self.by = by
+
+    async def __call__(self, request: Request):
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+
+        key = _user_key(request) if self.by == "user" else None
+        key = key or f"ip:{_client_ip(request)}"
+
+        retry_after = await _backend.take(f"{self.name}:{key}", self.capacity, self.period)
+        if retry_after > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, slow down",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+
+
+class ConcurrencyLimit:
+    """Dependency that sheds load (503) once `max_in_flight` requests are running"""
+
+    def __init__(self, name: str, max_in_flight: int, retry_after: int = 5):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.retry_after = retry_after
+        self.in_flight = 0
+
+    async def __call__(self):
+        if self.in_flight >= self.max_in_flight:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server busy, try again shortly",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
@@ -1,9 +1,17 @@
+import asyncio
+import base64
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import TTLCache
 from app.core.config import settings
 from app.core.database import get_db
 import hashlib
@@ -11,14 +19,91 @@ import hashlib
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
 
+# Tagged hash format: scrypt$<n>$<r>$<p>$<salt>$<hash> (base64 salt/hash).
+# Untagged 64-char hex strings are legacy SHA-256 hashes, upgraded on login.
+SCRYPT_TAG = "scrypt"
+
+# Dedicated pool so KDF work never runs on (or starves) the event loop
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        password.encode(), salt=salt, n=n, r=r, p=p,
+        maxmem=256 * n * r * p, dklen=32
+    )
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Simple hash verification for prototype"""
-    return get_password_hash(plain_password) == hashed_password
+    """Check a password against a tagged scrypt hash or a legacy SHA-256 hash"""
+    if hashed_password.startswith(f"{SCRYPT_TAG}$"):
+        try:
+            _, n, r, p, salt, expected = hashed_password.split("$")
+            digest = _scrypt(plain_password, base64.b64decode(salt), int(n), int(r), int(p))
+        except (ValueError, TypeError):
+            return False
+        return hmac.compare_digest(digest, base64.b64decode(expected))
+
+    legacy = hashlib.sha256(plain_password.encode()).hexdigest()
+    return hmac.compare_digest(legacy, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    """Simple SHA256 hash for prototype - use bcrypt in production!"""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """scrypt hash with the currently configured cost factors"""
+    n, r, p = settings.PASSWORD_SCRYPT_N, settings.PASSWORD_SCRYPT_R, settings.PASSWORD_SCRYPT_P
+    salt = os.urandom(16)
+    digest = _scrypt(password, salt, n, r, p)
+    return "$".join([
+        SCRYPT_TAG, str(n), str(r), str(p),
+        base64.b64encode(salt).decode(), base64.b64encode(digest).decode(),
+    ])
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True for legacy SHA-256 hashes and scrypt hashes with outdated cost factors"""
+    if not hashed_password.startswith(f"{SCRYPT_TAG}$"):
+        return True
+    try:
+        _, n, r, p, _, _ = hashed_password.split("$")
+    except ValueError:
+        return True
+    current = (settings.PASSWORD_SCRYPT_N, settings.PASSWORD_SCRYPT_R, settings.PASSWORD_SCRYPT_P)
+    return (int(n), int(r), int(p)) != current
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the password-hash executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, verify_password, plain_password, hashed_password)
+
+
+# Hash checked when a login names no account, so unknown emails cost the same
+# scrypt work as wrong passwords (built lazily with the configured cost factors)
+_dummy_password_hash: Optional[str] = None
+
+
+async def verify_login_password_async(plain_password: str, hashed_password: Optional[str]) -> bool:
+    """verify_password_async that also burns a verify when there's no account (hashed_password None)"""
+    global _dummy_password_hash
+    if hashed_password is None:
+        if _dummy_password_hash is None:
+            _dummy_password_hash = await get_password_hash_async(base64.b64encode(os.urandom(12)).decode())
+        await verify_password_async(plain_password, _dummy_password_hash)
+        return False
+    return await verify_password_async(plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash on the password-hash executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, get_password_hash, password)
+
+
+def shutdown_password_executor():
+    _password_executor.shutdown(wait=False)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -40,10 +125,43 @@ def decode_token(token: str) -> Optional[dict]:
         return None
 
 
-async def get_current_user(
+def require_internal_token(x_internal_token: Optional[str] = Header(None)):
+    """Gate for /api/internal/* - the caller must present INTERNAL_API_TOKEN"""
+    if not settings.INTERNAL_API_TOKEN:
+        # Not configured: behave as if the routes don't exist
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not x_internal_token or not hmac.compare_digest(x_internal_token, settings.INTERNAL_API_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid internal token"
+        )
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated caller - just enough of the User row to authorize requests"""
+    id: int
+    username: str
+    is_active: bool
+    profile_version: Optional[datetime] = None  # users.updated_at
+
+
+# Resolved principals keyed by user id, so cheap endpoints skip the users lookup
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+
+def invalidate_principal(user_id: int):
+    """Drop a cached principal - call whenever a user's profile or is_active changes"""
+    principal_cache.invalidate(user_id)
+
+
+async def get_current_principal(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-):
+    db: AsyncSession = Depends(get_db)
+) -> Principal:
     from app.models.user import User
 
     credentials_exception = HTTPException(
@@ -60,8 +178,44 @@ async def get_current_user(
     if user_id is None:
         raise credentials_exception
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    principal = principal_cache.get(int(user_id))
+    if principal is None:
+        row = (await db.execute(
+            select(User.id, User.username, User.is_active, User.updated_at).where(User.id == int(user_id))
+        )).first()
+        if row is None:
+            raise credentials_exception
+        principal = Principal(
+            id=row.id,
+            username=row.username,
+            is_active=bool(row.is_active),
+            profile_version=row.updated_at,
+        )
+        principal_cache.set(principal.id, principal)
+
+    if not principal.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Inactive user"
+        )
+
+    return principal
+
+
+async def get_current_user(
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """Full ORM User for handlers that read or modify the profile itself"""
+    from app.models.user import User
+
+    user = await db.get(User, principal.id)
     if user is None:
-        raise credentials_exception
+        invalidate_principal(principal.id)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
 
     return user
@@ -2,7 +2,11 @@ from app.models.user import User
 from app.models.friend import FriendRequest, Friendship
 from app.models.persona import Persona, VibeTags
 from app.models.gift import Gift, GiftSubscription, GiftStatus
+from app.models.gift_event import GiftEventRecord
+from app.models.gift_stats import GiftStats, GiftMonthlySpend
 from app.models.social import SocialConnection
+from app.models.idempotency import IdempotencyKey
+from app.models.job import Job, JobStatus
 
 __all__ = [
     "User",
@@ -13,5 +17,11 @@ __all__ = [
     "Gift",
     "GiftSubscription",
     "GiftStatus",
+    "GiftEventRecord",
+    "GiftStats",
+    "GiftMonthlySpend",
     "SocialConnection",
+    "IdempotencyKey",
+    "Job",
+    "JobStatus",
 ]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum as SQLEnum, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -13,6 +13,19 @@ class FriendRequestStatus(str, enum.Enum):
 
 class FriendRequest(Base):
     __tablename__ = "friend_requests"
+    __table_args__ = (
+        Index("ix_friend_requests_receiver_id_status", "receiver_id", "status"),
+        Index("ix_friend_requests_sender_id_status", "sender_id", "status"),
+        # At most one pending request per direction
+        Index(
+            "uq_friend_requests_pending_pair",
+            "sender_id",
+            "receiver_id",
+            unique=True,
+            postgresql_where=text("status = 'PENDING'"),
+            sqlite_where=text("status = 'PENDING'"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     sender_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -28,6 +41,10 @@ class FriendRequest(Base):
 
 class Friendship(Base):
     __tablename__ = "friendships"
+    __table_args__ = (
+        Index("uq_friendships_user_id_friend_id", "user_id", "friend_id", unique=True),
+        Index("ix_friendships_user_id_created_at", "user_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float, Boolean, Enum as SQLEnum, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float, Boolean, Enum as SQLEnum, JSON, Index, text
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
 from app.core.database import Base
 import enum
@@ -15,6 +15,27 @@ class GiftStatus(str, enum.Enum):
     CANCELLED = "cancelled"
 
 
+# Allowed status changes - enforced on every assignment to Gift.status
+GIFT_TRANSITIONS = {
+    GiftStatus.PENDING: {GiftStatus.AGENT_PICKING, GiftStatus.CANCELLED},
+    GiftStatus.AGENT_PICKING: {GiftStatus.AWAITING_APPROVAL, GiftStatus.ORDERED, GiftStatus.CANCELLED},
+    GiftStatus.AWAITING_APPROVAL: {GiftStatus.ORDERED, GiftStatus.CANCELLED},
+    GiftStatus.ORDERED: {GiftStatus.SHIPPED, GiftStatus.CANCELLED},
+    GiftStatus.SHIPPED: {GiftStatus.DELIVERED},
+    GiftStatus.DELIVERED: set(),
+    GiftStatus.CANCELLED: set(),
+}
+
+
+class InvalidGiftTransition(ValueError):
+    """A gift status change not allowed by GIFT_TRANSITIONS"""
+
+    def __init__(self, current: "GiftStatus", requested: "GiftStatus"):
+        self.current = current
+        self.requested = requested
+        super().__init__(f"Gift cannot move from {current.value} to {requested.value}")
+
+
 class DeliveryPlatform(str, enum.Enum):
     BLINKIT = "blinkit"
     ZEPTO = "zepto"
@@ -25,6 +46,10 @@ class DeliveryPlatform(str, enum.Enum):
 
 class Gift(Base):
     __tablename__ = "gifts"
+    __table_args__ = (
+        Index("ix_gifts_sender_id_created_at", "sender_id", "created_at"),
+        Index("ix_gifts_recipient_id_created_at", "recipient_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     sender_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -64,13 +89,32 @@ class Gift(Base):
     ordered_at = Column(DateTime(timezone=True))
     delivered_at = Column(DateTime(timezone=True))
 
+    # Compare-and-set: every ORM update runs as UPDATE ... WHERE id = ? AND
+    # version = ? and bumps it, so a writer holding a stale copy gets a
+    # StaleDataError instead of overwriting (also used for ETags)
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
+
     sender = relationship("User", foreign_keys=[sender_id], back_populates="sent_gifts")
     recipient = relationship("User", foreign_keys=[recipient_id], back_populates="received_gifts")
 
+    __mapper_args__ = {"version_id_col": version}
+
+    @validates("status")
+    def _check_transition(self, key, value):
+        current = self.status
+        if current is not None and value != current and value not in GIFT_TRANSITIONS[current]:
+            raise InvalidGiftTransition(current, value)
+        return value
+
 
 class GiftSubscription(Base):
     """For automated recurring gifts"""
     __tablename__ = "gift_subscriptions"
+    __table_args__ = (
+        # Partial index - the scheduler only ever scans active subscriptions
+        Index("ix_gift_subscriptions_is_active", "is_active", postgresql_where=text("is_active")),
+        Index("ix_gift_subscriptions_sender_id_created_at", "sender_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     sender_id = Column(Integer, ForeignKey("users.id"), nullable=False)
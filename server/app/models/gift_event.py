@@ -0,0 +1,64 @@
+"""
+Gift event outbox
+One row per gift creation / status change, written by a flush listener in
+the same transaction as the change itself - so events from every process
+(API, job workers, scheduler) land in one place. API processes tail the
+table for GET /gifts/events (app/services/gift_events.py); the row id is
+the SSE event id.
+"""
+from sqlalchemy import Column, Integer, String, DateTime, Index, event, insert, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+from app.core.database import Base
+from app.models.gift import Gift
+
+
+class GiftEventRecord(Base):
+    __tablename__ = "gift_events"
+    __table_args__ = (
+        Index("ix_gift_events_sender_id_id", "sender_id", "id"),
+        Index("ix_gift_events_recipient_id_id", "recipient_id", "id"),
+        Index("ix_gift_events_created_at", "created_at"),
+        # Never reuse ids after a purge - tailing readers rely on them increasing
+        {"sqlite_autoincrement": True},
+    )
+
+    id = Column(Integer, primary_key=True)
+    gift_id = Column(Integer, nullable=False)
+    sender_id = Column(Integer, nullable=False)
+    recipient_id = Column(Integer, nullable=False)
+    status = Column(String(20))  # GiftStatus value
+    version = Column(Integer)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def to_data(self) -> dict:
+        return {
+            "gift_id": self.gift_id,
+            "status": self.status,
+            "version": self.version,
+            "sender_id": self.sender_id,
+            "recipient_id": self.recipient_id,
+        }
+
+
+def _snapshot(gift: Gift) -> dict:
+    status = gift.status
+    return {
+        "gift_id": gift.id,
+        "status": status.value if status is not None else None,
+        "version": gift.version,
+        "sender_id": gift.sender_id,
+        "recipient_id": gift.recipient_id,
+    }
+
+
+@event.listens_for(Session, "after_flush")
+def _record_gift_events(session: Session, flush_context):
+    """Append an event for each gift created or moved to a new status in this flush"""
+    rows = [
+        _snapshot(obj) for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, Gift)
+        and (obj in session.new or inspect(obj).attrs.status.history.has_changes())
+    ]
+    if rows:
+        session.connection().execute(insert(GiftEventRecord), rows)
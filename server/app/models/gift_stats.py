@@ -0,0 +1,140 @@
+"""
+Gift statistics aggregates
+Per-user counters kept in step with the gifts table, so GET /gifts/stats
+reads a handful of rows instead of scanning a user's gift history.
+
+Every flush that inserts a gift, changes its status/price or deletes it
+applies the difference to these tables in the same transaction (an upsert
+that adds to the counters, so concurrent writers commute). The rebuild in
+app/services/gift_stats.py recomputes both tables from scratch.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, event, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.core.database import Base
+from app.models.gift import Gift, GiftStatus
+
+SENT = "sent"
+RECEIVED = "received"
+
+# Statuses whose gift_price counts as money spent
+SPENT_STATUSES = {GiftStatus.ORDERED, GiftStatus.SHIPPED, GiftStatus.DELIVERED}
+
+
+class GiftStats(Base):
+    """Gift count / value per (user, direction, other party, status)"""
+    __tablename__ = "gift_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    direction = Column(String(8), primary_key=True)  # "sent" or "received"
+    friend_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    status = Column(String(20), primary_key=True)  # GiftStatus value
+    gift_count = Column(Integer, nullable=False, default=0)
+    spend = Column(Float, nullable=False, default=0)  # sum of gift_price
+
+
+class GiftMonthlySpend(Base):
+    """Money a sender spent per calendar month (by the month a gift was ordered)"""
+    __tablename__ = "gift_monthly_spend"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    month = Column(String(7), primary_key=True)  # YYYY-MM
+    gift_count = Column(Integer, nullable=False, default=0)
+    spend = Column(Float, nullable=False, default=0)
+
+
+# (sender_id, recipient_id, status, gift_price, ordered_at, created_at)
+GiftState = Tuple[int, int, Optional[GiftStatus], Optional[float], Optional[datetime], Optional[datetime]]
+Deltas = Dict[tuple, List[float]]
+
+
+def month_key(value: Optional[datetime]) -> str:
+    return (value or datetime.utcnow()).strftime("%Y-%m")
+
+
+def accumulate(stats: Deltas, monthly: Deltas, state: GiftState, sign: int = 1):
+    """Add (sign=1) or remove (sign=-1) one gift's contribution to the counters"""
+    sender_id, recipient_id, status, price, ordered_at, created_at = state
+    if status is None:
+        return
+    status = GiftStatus(status)
+    price = price or 0.0
+    for key in ((sender_id, SENT, recipient_id, status.value), (recipient_id, RECEIVED, sender_id, status.value)):
+        entry = stats.setdefault(key, [0, 0.0])
+        entry[0] += sign
+        entry[1] += sign * price
+    if status in SPENT_STATUSES:
+        entry = monthly.setdefault((sender_id, month_key(ordered_at or created_at)), [0, 0.0])
+        entry[0] += sign
+        entry[1] += sign * price
+
+
+def _dialect_insert(connection):
+    if connection.dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
+
+
+def _upsert_rows(connection, table, key_columns, deltas: Deltas):
+    # Sorted so concurrent transactions lock rows in the same order
+    rows = [
+        {**dict(zip(key_columns, key)), "gift_count": count, "spend": spend}
+        for key, (count, spend) in sorted(deltas.items())
+        if count or spend
+    ]
+    if not rows:
+        return
+    statement = _dialect_insert(connection)(table).values(rows)
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=key_columns,
+        set_={
+            "gift_count": table.c.gift_count + statement.excluded.gift_count,
+            "spend": table.c.spend + statement.excluded.spend,
+        },
+    ))
+
+
+def apply_deltas(connection, stats: Deltas, monthly: Deltas):
+    _upsert_rows(connection, GiftStats.__table__, ["user_id", "direction", "friend_id", "status"], stats)
+    _upsert_rows(connection, GiftMonthlySpend.__table__, ["user_id", "month"], monthly)
+
+
+def _state(gift: Gift, previous: bool = False) -> GiftState:
+    """A gift's counted fields - as loaded before this flush if `previous`"""
+    state = inspect(gift)
+
+    def value(name):
+        # state.dict, not getattr: expired columns must not trigger a load mid-flush
+        if previous:
+            history = state.attrs[name].history
+            if history.deleted:
+                return history.deleted[0]
+            if history.added:
+                return None
+        return state.dict.get(name)
+
+    return tuple(value(name) for name in (
+        "sender_id", "recipient_id", "status", "gift_price", "ordered_at", "created_at"
+    ))
+
+
+@event.listens_for(Session, "after_flush")
+def _update_gift_stats(session: Session, flush_context):
+    stats: Deltas = {}
+    monthly: Deltas = {}
+    for obj in session.new:
+        if isinstance(obj, Gift):
+            accumulate(stats, monthly, _state(obj))
+    for obj in session.dirty:
+        if isinstance(obj, Gift) and session.is_modified(obj):
+            before, after = _state(obj, previous=True), _state(obj)
+            if before != after:
+                accumulate(stats, monthly, before, sign=-1)
+                accumulate(stats, monthly, after)
+    for obj in session.deleted:
+        if isinstance(obj, Gift):
+            accumulate(stats, monthly, _state(obj, previous=True), sign=-1)
+    if stats or monthly:
+        apply_deltas(session.connection(), stats, monthly)
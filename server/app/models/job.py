@@ -0,0 +1,36 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Enum as SQLEnum, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+import enum
+
+
+class JobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class Job(Base):
+    """A unit of background work (gift picking / ordering) run by the job worker"""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    job_type = Column(String(64), nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(SQLEnum(JobStatus), nullable=False, default=JobStatus.QUEUED)
+
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    run_at = Column(DateTime(timezone=True), nullable=False)  # not claimed before this (retry backoff)
+
+    # Set while a worker holds the job; another worker may reclaim it once locked_until passes
+    locked_by = Column(String(255))
+    locked_until = Column(DateTime(timezone=True))
+    last_error = Column(Text)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True))
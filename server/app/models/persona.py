@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -45,4 +45,9 @@ class Persona(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # Bumped by the ORM on every update - used for ETags
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
+
     user = relationship("User", back_populates="persona")
+
+    __mapper_args__ = {"version_id_col": version}
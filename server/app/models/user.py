@@ -1,11 +1,14 @@
 from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
+from app.core.contacts import email_hash, phone_hash
 from app.core.database import Base
 
 
 class User(Base):
     __tablename__ = "users"
+    # Search indexes (pg_trgm GIN on username/email, lower(username) pattern
+    # index) are Postgres-only and live in migration 0003
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String(255), unique=True, index=True, nullable=False)
@@ -20,9 +23,23 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # sha256 of the normalized email/phone - used to match imported contacts
+    email_hash = Column(String(64), index=True)
+    phone_hash = Column(String(64), index=True)
+
     # Relationships
     persona = relationship("Persona", back_populates="user", uselist=False)
     social_connections = relationship("SocialConnection", back_populates="user")
     sent_gifts = relationship("Gift", foreign_keys="Gift.sender_id", back_populates="sender")
     received_gifts = relationship("Gift", foreign_keys="Gift.recipient_id", back_populates="recipient")
     gift_subscriptions = relationship("GiftSubscription", foreign_keys="GiftSubscription.sender_id", back_populates="sender")
+
+    @validates("email")
+    def _set_email_hash(self, key, value):
+        self.email_hash = email_hash(value)
+        return value
+
+    @validates("phone")
+    def _set_phone_hash(self, key, value):
+        self.phone_hash = phone_hash(value)
+        return value
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime
 from app.models.friend import FriendRequestStatus
 
@@ -41,5 +41,36 @@ class FriendshipResponse(BaseModel):
         from_attributes = True
 
 
+class FriendSuggestionResponse(BaseModel):
+    user_id: int
+    username: str
+    full_name: Optional[str] = None
+    avatar_url: Optional[str] = None
+    mutual_friends: int
+    shared_vibe_tags: List[str] = []
+    score: float
+
+
+class ContactImportRequest(BaseModel):
+    emails: List[str] = Field(default_factory=list)
+    phones: List[str] = Field(default_factory=list)
+    send_requests: bool = False  # send a friend request to every new match
+    message: Optional[str] = Field(None, max_length=255)
+
+
+class ContactMatch(BaseModel):
+    contact: str  # the email/phone from the upload that matched
+    user_id: int
+    username: str
+    full_name: Optional[str] = None
+    avatar_url: Optional[str] = None
+    relationship: str  # "friend", "request_sent", "request_received" or "none"
+
+
+class ContactImportResponse(BaseModel):
+    matches: List[ContactMatch]
+    requests_sent: int = 0
+
+
 class SetNicknameRequest(BaseModel):
     nickname: str
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 from datetime import datetime
 from app.models.gift import GiftStatus, DeliveryPlatform
 
@@ -14,7 +14,17 @@ class GiftCreate(BaseModel):
     delivery_address: Optional[str] = None
 
 
-class GiftResponse(BaseModel):
+class GiftBulkCreate(BaseModel):
+    recipient_ids: List[int] = Field(..., min_length=1, max_length=50)
+    vibe_prompt: str
+    budget_min: float = 0
+    budget_max: float
+    is_surprise: bool = False  # YOLO mode - needs each friend's default address
+    sender_message: Optional[str] = None
+
+
+class GiftSummaryResponse(BaseModel):
+    """Gift as shown in lists - without the long agent text"""
     id: int
     sender_id: int
     recipient_id: int
@@ -22,11 +32,9 @@ class GiftResponse(BaseModel):
     budget_min: float
     budget_max: float
     gift_name: Optional[str]
-    gift_description: Optional[str]
     gift_image_url: Optional[str]
     gift_price: Optional[float]
     gift_url: Optional[str]
-    agent_reasoning: Optional[str]
     platform: Optional[DeliveryPlatform]
     order_id: Optional[str]
     tracking_url: Optional[str]
@@ -45,6 +53,44 @@ class GiftResponse(BaseModel):
         from_attributes = True
 
 
+class GiftResponse(GiftSummaryResponse):
+    gift_description: Optional[str]
+    agent_reasoning: Optional[str]
+
+
+class GiftBulkResult(BaseModel):
+    recipient_id: int
+    gift: Optional[GiftResponse] = None
+    error: Optional[str] = None  # set instead of `gift` when this recipient was skipped
+
+
+class GiftBulkResponse(BaseModel):
+    created: int
+    results: List[GiftBulkResult]
+
+
+class GiftDirectionStats(BaseModel):
+    total: int = 0
+    by_status: Dict[GiftStatus, int] = Field(default_factory=dict)
+    spend: float = 0  # gift_price of ordered/shipped/delivered gifts
+
+
+class GiftFriendSpend(BaseModel):
+    friend_id: int
+    username: Optional[str] = None
+    gifts: int
+    spend: float
+
+
+class GiftStatsResponse(BaseModel):
+    sent: GiftDirectionStats
+    received: GiftDirectionStats
+    month: str  # YYYY-MM (UTC) the *_this_month fields cover
+    gifts_this_month: int = 0
+    spend_this_month: float = 0
+    spend_by_friend: List[GiftFriendSpend]  # highest spend first
+
+
 class GiftApproval(BaseModel):
     approved: bool
 
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -32,6 +32,19 @@ class UserResponse(BaseModel):
         from_attributes = True
 
 
+class UserSummary(BaseModel):
+    """Compact projection used to render user lists"""
+    id: int
+    username: str
+    full_name: Optional[str]
+    avatar_url: Optional[str]
+    etag: str  # changes whenever any of the fields above change
+
+
+class UserBatchRequest(BaseModel):
+    ids: List[int] = Field(..., max_length=1000)
+
+
 class UserUpdate(BaseModel):
     full_name: Optional[str] = None
     phone: Optional[str] = None
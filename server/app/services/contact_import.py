@@ -0,0 +1,116 @@
+"""
+Contact Import
+Matches an uploaded address book against users in one set-based query and
+optionally sends friend requests to the new matches in bulk inserts.
+"""
+from typing import Dict, List, Sequence
+from sqlalchemy import String, any_, bindparam, or_, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.contacts import email_hash, phone_hash
+from app.models.user import User
+from app.models.friend import FriendRequest, FriendRequestStatus
+from app.schemas.friend import ContactImportRequest, ContactImportResponse, ContactMatch
+from app.services.friend_graph import friend_graph
+from app.services.friend_requests import dialect_insert, skip_duplicate_pending
+
+# Friend requests per multi-row INSERT (keeps SQLite under its bound-parameter limit)
+INSERT_BATCH_SIZE = 1000
+
+
+def _matches_any(column, name: str, values: Sequence[str], dialect: str):
+    """
+    column = ANY(:array) on Postgres - one bound array instead of thousands of
+    IN parameters; other backends get a plain IN
+    """
+    if dialect == "postgresql":
+        return column == any_(bindparam(name, list(values), type_=ARRAY(String(64))))
+    return column.in_(values)
+
+
+async def import_contacts(
+    db: AsyncSession,
+    user_id: int,
+    contacts: ContactImportRequest,
+) -> ContactImportResponse:
+    # hash -> contact as uploaded (first spelling wins for duplicates)
+    by_email: Dict[str, str] = {}
+    for contact in contacts.emails:
+        digest = email_hash(contact)
+        if digest:
+            by_email.setdefault(digest, contact)
+    by_phone: Dict[str, str] = {}
+    for contact in contacts.phones:
+        digest = phone_hash(contact)
+        if digest:
+            by_phone.setdefault(digest, contact)
+    if not by_email and not by_phone:
+        return ContactImportResponse(matches=[])
+
+    dialect = db.get_bind().dialect.name
+    conditions = []
+    if by_email:
+        conditions.append(_matches_any(User.email_hash, "email_hashes", list(by_email), dialect))
+    if by_phone:
+        conditions.append(_matches_any(User.phone_hash, "phone_hashes", list(by_phone), dialect))
+    rows = (await db.execute(
+        select(User.id, User.username, User.full_name, User.avatar_url, User.email_hash, User.phone_hash)
+        .where(or_(*conditions), User.id != user_id, User.is_active.is_not(False))
+        .order_by(User.username)
+    )).all()
+    if not rows:
+        return ContactImportResponse(matches=[])
+
+    friends = await friend_graph.friend_ids(db, user_id)
+    pending = (await db.execute(
+        select(FriendRequest.sender_id, FriendRequest.receiver_id).where(
+            or_(FriendRequest.sender_id == user_id, FriendRequest.receiver_id == user_id),
+            FriendRequest.status == FriendRequestStatus.PENDING
+        )
+    )).all()
+    sent = {receiver_id for sender_id, receiver_id in pending if sender_id == user_id}
+    received = {sender_id for sender_id, receiver_id in pending if receiver_id == user_id}
+
+    matches: List[ContactMatch] = []
+    new_request_ids = []
+    for row in rows:
+        if row.id in friends:
+            relationship = "friend"
+        elif row.id in sent:
+            relationship = "request_sent"
+        elif row.id in received:
+            relationship = "request_received"
+        elif contacts.send_requests:
+            relationship = "request_sent"
+            new_request_ids.append(row.id)
+        else:
+            relationship = "none"
+        matches.append(ContactMatch(
+            contact=by_email.get(row.email_hash) or by_phone.get(row.phone_hash),
+            user_id=row.id,
+            username=row.username,
+            full_name=row.full_name,
+            avatar_url=row.avatar_url,
+            relationship=relationship,
+        ))
+
+    requests_sent = 0
+    for start in range(0, len(new_request_ids), INSERT_BATCH_SIZE):
+        # RETURNING only yields rows actually inserted - ON CONFLICT no-ops
+        # (a request that raced in since the lookup above) aren't counted
+        inserted = await db.execute(
+            skip_duplicate_pending(dialect_insert(db)(FriendRequest).values([
+                {
+                    "sender_id": user_id,
+                    "receiver_id": receiver_id,
+                    "status": FriendRequestStatus.PENDING,
+                    "message": contacts.message,
+                }
+                for receiver_id in new_request_ids[start:start + INSERT_BATCH_SIZE]
+            ])).returning(FriendRequest.id)
+        )
+        requests_sent += len(inserted.all())
+    if new_request_ids:
+        await db.commit()
+
+    return ContactImportResponse(matches=matches, requests_sent=requests_sent)
@@ -0,0 +1,84 @@
+"""
+Friend Graph
+Per-process adjacency cache so friendship guards on gift/persona routes
+don't pay a database round trip on every request.
+
+The cache is per process, so an unfriend through another worker only shows
+up here after the TTL. Reads can live with that; routes that create gifts
+pass confirm=True so a cached "yes" is re-checked with an indexed lookup.
+"""
+from typing import FrozenSet, Iterable, Set
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.friend import Friendship
+
+
+class FriendGraph:
+    """
+    user_id -> frozenset of friend ids, loaded lazily and LRU/TTL bounded.
+    Local accepts/removals invalidate immediately; changes made by other
+    workers are picked up on a negative check (DB fallback), a confirmed
+    positive one, or after the TTL.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._adjacency = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def friend_ids(self, db: AsyncSession, user_id: int) -> FrozenSet[int]:
+        friends = self._adjacency.get(user_id)
+        if friends is None:
+            friends = frozenset((await db.scalars(
+                select(Friendship.friend_id).where(Friendship.user_id == user_id)
+            )).all())
+            self._adjacency.set(user_id, friends)
+        return friends
+
+    async def are_friends(self, db: AsyncSession, user_id: int, friend_id: int, confirm: bool = False) -> bool:
+        """True if `friend_id` is in `user_id`'s friend list (`confirm` re-checks a cached yes)"""
+        friends = self._adjacency.get(user_id)
+        if friends is not None and friend_id in friends:
+            if not confirm:
+                return True
+            return bool(await self._confirmed(db, user_id, {friend_id}))
+
+        # Miss or cached "no" - confirm against the database and refresh
+        self._adjacency.invalidate(user_id)
+        return friend_id in await self.friend_ids(db, user_id)
+
+    async def friends_among(
+        self, db: AsyncSession, user_id: int, candidate_ids: Iterable[int], confirm: bool = False
+    ) -> Set[int]:
+        """The subset of `candidate_ids` that are friends of `user_id` (at most one query)"""
+        candidates = set(candidate_ids)
+        friends = self._adjacency.get(user_id)
+        if friends is not None and candidates <= friends:
+            if not confirm:
+                return candidates
+            return await self._confirmed(db, user_id, candidates)
+
+        self._adjacency.invalidate(user_id)
+        return candidates & await self.friend_ids(db, user_id)
+
+    async def _confirmed(self, db: AsyncSession, user_id: int, friend_ids: Set[int]) -> Set[int]:
+        """Which of the cached friends `friend_ids` are still friends, dropping a stale entry"""
+        confirmed = set((await db.scalars(
+            select(Friendship.friend_id).where(
+                Friendship.user_id == user_id,
+                Friendship.friend_id.in_(friend_ids),
+            )
+        )).all())
+        if confirmed != friend_ids:
+            self._adjacency.invalidate(user_id)
+        return confirmed
+
+    def invalidate(self, *user_ids: int):
+        for user_id in user_ids:
+            self._adjacency.invalidate(user_id)
+
+
+friend_graph = FriendGraph(
+    maxsize=settings.FRIEND_GRAPH_CACHE_SIZE,
+    ttl=settings.FRIEND_GRAPH_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,169 @@
+"""
+Friend Requests
+Race-free friend request / accept writes built on the unique constraints
+from migration 0005:
+
+- friendships (user_id, friend_id) is unique, so creating a friendship is an
+  idempotent INSERT ... ON CONFLICT DO NOTHING
+- only one PENDING request may exist per (sender_id, receiver_id), so a
+  duplicate send is a no-op insert instead of a check-then-insert race
+
+On Postgres, sending a request is a single statement: data-modifying CTEs
+accept a reverse pending request (and create both friendship rows) or else
+insert the new request. Other backends run the same statements one after
+another inside the request's transaction.
+"""
+from typing import Optional, Tuple
+from sqlalchemy import exists, literal, select, text, union_all, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.friend import FriendRequest, FriendRequestStatus, Friendship
+from app.models.user import User
+
+RESPONSE_COLUMNS = ("id", "sender_id", "receiver_id", "status", "message", "created_at")
+
+
+def dialect_insert(db: AsyncSession):
+    """Dialect insert() so ON CONFLICT is available"""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
+
+
+def _status(value: FriendRequestStatus):
+    return literal(value, type_=FriendRequest.__table__.c.status.type)
+
+
+def _returning(table_or_cte):
+    return [table_or_cte.c[name] for name in RESPONSE_COLUMNS]
+
+
+def _accept_reverse(sender_id: int, receiver_id: int):
+    """Accept receiver -> sender's pending request, if there is one"""
+    return (
+        update(FriendRequest)
+        .where(
+            FriendRequest.sender_id == receiver_id,
+            FriendRequest.receiver_id == sender_id,
+            FriendRequest.status == FriendRequestStatus.PENDING,
+        )
+        .values(status=FriendRequestStatus.ACCEPTED)
+        .returning(*_returning(FriendRequest.__table__))
+    )
+
+
+def befriend_statement(insert, pairs):
+    """Insert friendship rows for a (user_id, friend_id) select, skipping existing ones"""
+    return (
+        insert(Friendship)
+        .from_select(["user_id", "friend_id"], pairs)
+        .on_conflict_do_nothing(index_elements=["user_id", "friend_id"])
+    )
+
+
+def _both_directions(user_id, friend_id):
+    return union_all(
+        select(user_id.label("user_id"), friend_id.label("friend_id")),
+        select(friend_id, user_id),
+    )
+
+
+def skip_duplicate_pending(statement):
+    """ON CONFLICT DO NOTHING against the one-pending-request-per-pair index"""
+    return statement.on_conflict_do_nothing(
+        index_elements=["sender_id", "receiver_id"],
+        index_where=text("status = 'PENDING'"),
+    )
+
+
+def _new_request(insert, sender_id: int, receiver_id: int, message: Optional[str], *conditions):
+    """Insert a pending request if the receiver exists and they aren't friends yet"""
+    row = select(
+        literal(sender_id),
+        literal(receiver_id),
+        _status(FriendRequestStatus.PENDING),
+        literal(message, type_=FriendRequest.__table__.c.message.type),
+    ).where(
+        exists().where(User.id == receiver_id),
+        ~exists().where(Friendship.user_id == sender_id, Friendship.friend_id == receiver_id),
+        *conditions,
+    )
+    return skip_duplicate_pending(
+        insert(FriendRequest).from_select(["sender_id", "receiver_id", "status", "message"], row)
+    ).returning(*_returning(FriendRequest.__table__))
+
+
+async def _send_single_statement(db: AsyncSession, sender_id: int, receiver_id: int, message: Optional[str]):
+    insert = postgresql.insert
+    accepted = _accept_reverse(sender_id, receiver_id).cte("accepted")
+    befriended = befriend_statement(
+        insert,
+        union_all(
+            select(accepted.c.receiver_id, accepted.c.sender_id),
+            select(accepted.c.sender_id, accepted.c.receiver_id),
+        ),
+    ).cte("befriended")
+    requested = _new_request(
+        insert, sender_id, receiver_id, message, ~exists(select(accepted.c.id))
+    ).cte("requested")
+
+    receiver_username = select(User.username).where(User.id == receiver_id).scalar_subquery()
+    statement = union_all(
+        select(*_returning(accepted), receiver_username, literal(True).label("auto_accepted")),
+        select(*_returning(requested), receiver_username, literal(False)),
+    ).add_cte(befriended)
+    return (await db.execute(statement)).first()
+
+
+async def _send_statements(db: AsyncSession, sender_id: int, receiver_id: int, message: Optional[str]):
+    insert = dialect_insert(db)
+    accepted = (await db.execute(_accept_reverse(sender_id, receiver_id))).first()
+    if accepted is not None:
+        await db.execute(befriend_statement(insert, _both_directions(literal(sender_id), literal(receiver_id))))
+        row, auto_accepted = accepted, True
+    else:
+        row = (await db.execute(_new_request(insert, sender_id, receiver_id, message))).first()
+        auto_accepted = False
+    if row is None:
+        return None
+    receiver_username = await db.scalar(select(User.username).where(User.id == receiver_id))
+    return (*row, receiver_username, auto_accepted)
+
+
+async def send_request(
+    db: AsyncSession,
+    sender_id: int,
+    receiver_id: int,
+    message: Optional[str] = None,
+) -> Tuple[Optional[dict], bool]:
+    """
+    Send a friend request, auto-accepting if the receiver already sent one.
+    Returns (request fields + receiver_username, auto_accepted); the fields
+    are None when nothing was written - see why_not_sent().
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        result = await _send_single_statement(db, sender_id, receiver_id, message)
+    else:
+        result = await _send_statements(db, sender_id, receiver_id, message)
+    await db.commit()
+    if result is None:
+        return None, False
+    return dict(zip(RESPONSE_COLUMNS + ("receiver_username",), result[:-1])), result[-1]
+
+
+async def why_not_sent(db: AsyncSession, sender_id: int, receiver_id: int) -> str:
+    """Explain a send_request() no-op (only runs on that rare path)"""
+    receiver_exists, already_friends = (await db.execute(select(
+        exists().where(User.id == receiver_id),
+        exists().where(Friendship.user_id == sender_id, Friendship.friend_id == receiver_id),
+    ))).one()
+    if not receiver_exists:
+        return "User not found"
+    if already_friends:
+        return "Already friends"
+    return "Friend request already sent"
+
+
+async def befriend(db: AsyncSession, user_id: int, friend_id: int):
+    """Create the mutual friendship rows (idempotent)"""
+    await db.execute(befriend_statement(dialect_insert(db), _both_directions(literal(user_id), literal(friend_id))))
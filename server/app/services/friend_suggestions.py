@@ -0,0 +1,256 @@
+"""
+Friend Suggestions
+Friend-of-friend ranking served from a compact in-process graph index.
+
+The friendship graph is held in CSR form - an offsets array indexed by
+user id and one flat array of friend ids - so counting mutual friends is a
+walk over a few contiguous slices instead of a self-join per request.
+Friendships accepted/removed in this process are applied as deltas on top
+of the snapshot; the snapshot itself is rebuilt periodically (and when the
+deltas grow) so changes from other workers are picked up.
+
+Rebuilds run as a background task that streams the friendships table into
+a worker thread; requests keep using the previous snapshot meanwhile, and
+fall back to a per-user SQL count until the first snapshot exists.
+"""
+import asyncio
+import logging
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from app.core.config import settings
+from app.core.database import get_engine
+from app.models.friend import FriendRequest, FriendRequestStatus, Friendship
+from app.models.persona import Persona
+from app.models.user import User
+from app.schemas.friend import FriendSuggestionResponse
+
+# Only the strongest mutual-friend candidates are scored on vibe tags
+CANDIDATES_PER_SUGGESTION = 5
+SHARED_TAG_WEIGHT = 0.5
+# Friendship rows fetched per round trip while rebuilding the index
+REBUILD_BATCH_SIZE = 50_000
+
+logger = logging.getLogger(__name__)
+
+
+class FriendGraphIndex:
+    """CSR snapshot of the friendship graph plus per-user add/remove deltas"""
+
+    def __init__(self, refresh_seconds: float, max_delta: int = 10_000):
+        self.refresh_seconds = refresh_seconds
+        self.max_delta = max_delta
+        self._offsets = array("l", [0])
+        self._targets = array("l")
+        self._added: Dict[int, Set[int]] = defaultdict(set)
+        self._removed: Dict[int, Set[int]] = defaultdict(set)
+        self._delta_size = 0
+        self._built_at: Optional[float] = None
+        # Links/unlinks seen while a rebuild is reading the table - replayed
+        # onto the new snapshot, which may or may not include them
+        self._rebuilding = False
+        self._journal: List[Tuple[int, int, bool]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def is_built(self) -> bool:
+        return self._built_at is not None
+
+    @property
+    def needs_rebuild(self) -> bool:
+        return (
+            self._built_at is None
+            or time.monotonic() - self._built_at > self.refresh_seconds
+            or self._delta_size > self.max_delta
+        )
+
+    def rebuild(self, edges: Iterable[Tuple[int, int]]):
+        """Build a fresh snapshot from (user_id, friend_id) rows sorted by user_id"""
+        with self._lock:
+            self._rebuilding = True
+            self._journal = []
+        try:
+            offsets = array("l", [0])
+            targets = array("l")
+            for user_id, friend_id in edges:
+                while len(offsets) <= user_id:
+                    offsets.append(len(targets))
+                targets.append(friend_id)
+            offsets.append(len(targets))
+        except BaseException:
+            with self._lock:
+                self._rebuilding = False
+                self._journal = []
+            raise
+        with self._lock:
+            self._offsets, self._targets = offsets, targets
+            self._added.clear()
+            self._removed.clear()
+            self._delta_size = 0
+            journal, self._journal = self._journal, []
+            self._rebuilding = False
+            for user_id, friend_id, linked in journal:
+                self._apply(user_id, friend_id, linked)
+            self._built_at = time.monotonic()
+
+    def _base(self, user_id: int):
+        if user_id + 1 >= len(self._offsets):
+            return self._targets[0:0]
+        return self._targets[self._offsets[user_id]:self._offsets[user_id + 1]]
+
+    def _neighbors(self, user_id: int) -> Iterable[int]:
+        base = self._base(user_id)
+        if user_id not in self._added and user_id not in self._removed:
+            return base
+        return (set(base) | self._added.get(user_id, set())) - self._removed.get(user_id, set())
+
+    def neighbors(self, user_id: int) -> Set[int]:
+        with self._lock:
+            return set(self._neighbors(user_id))
+
+    def _apply(self, user_id: int, friend_id: int, linked: bool):
+        added, removed = (self._added, self._removed) if linked else (self._removed, self._added)
+        for a, b in ((user_id, friend_id), (friend_id, user_id)):
+            removed[a].discard(b)
+            added[a].add(b)
+        self._delta_size += 2
+        if self._rebuilding:
+            self._journal.append((user_id, friend_id, linked))
+
+    def link(self, user_id: int, friend_id: int):
+        """Record a new friendship (both directions) until the next rebuild"""
+        with self._lock:
+            self._apply(user_id, friend_id, linked=True)
+
+    def unlink(self, user_id: int, friend_id: int):
+        """Record a removed friendship (both directions) until the next rebuild"""
+        with self._lock:
+            self._apply(user_id, friend_id, linked=False)
+
+    def mutual_counts(self, user_id: int) -> Counter:
+        """Non-friends of `user_id` keyed to how many friends they share"""
+        counts = Counter()
+        with self._lock:
+            friends = set(self._neighbors(user_id))
+            for friend_id in friends:
+                counts.update(self._neighbors(friend_id))
+        counts.pop(user_id, None)
+        for friend_id in friends:
+            counts.pop(friend_id, None)
+        return counts
+
+
+friend_graph_index = FriendGraphIndex(refresh_seconds=settings.FRIEND_SUGGESTIONS_REFRESH_SECONDS)
+
+
+_rebuild_task: Optional[asyncio.Task] = None
+
+
+def _stream_edges() -> Iterator[Tuple[int, int]]:
+    """Friendship rows sorted by user_id, fetched REBUILD_BATCH_SIZE at a time"""
+    with get_engine(settings.READ_DATABASE_URL).connect() as conn:
+        result = conn.execution_options(yield_per=REBUILD_BATCH_SIZE).execute(
+            select(Friendship.user_id, Friendship.friend_id)
+            .order_by(Friendship.user_id, Friendship.friend_id)
+        )
+        for partition in result.partitions():
+            yield from partition
+
+
+async def _rebuild_index():
+    started = time.monotonic()
+    try:
+        # Reading and packing a large graph takes seconds - all of it off the event loop
+        await asyncio.to_thread(friend_graph_index.rebuild, _stream_edges())
+    except Exception:
+        logger.exception("Friend suggestions index rebuild failed")
+        return
+    logger.info(f"Friend suggestions index rebuilt in {time.monotonic() - started:.1f}s")
+
+
+def schedule_index_rebuild():
+    """Start a background index rebuild unless one is already running"""
+    global _rebuild_task
+    if _rebuild_task is None or _rebuild_task.done():
+        _rebuild_task = asyncio.create_task(_rebuild_index())
+
+
+async def _mutual_counts_sql(db: AsyncSession, user_id: int, limit: int) -> Counter:
+    """Fallback until the first snapshot is built: friend-of-friend self-join for one user"""
+    friend_of_friend = aliased(Friendship)
+    my_friends = select(Friendship.friend_id).where(Friendship.user_id == user_id)
+    mutual = func.count()
+    rows = await db.execute(
+        select(friend_of_friend.friend_id, mutual)
+        .select_from(Friendship)
+        .join(friend_of_friend, friend_of_friend.user_id == Friendship.friend_id)
+        .where(
+            Friendship.user_id == user_id,
+            friend_of_friend.friend_id != user_id,
+            friend_of_friend.friend_id.not_in(my_friends),
+        )
+        .group_by(friend_of_friend.friend_id)
+        .order_by(mutual.desc())
+        .limit(limit)
+    )
+    return Counter(dict(rows.all()))
+
+
+async def _mutual_counts(db: AsyncSession, user_id: int, limit: int) -> Counter:
+    if friend_graph_index.needs_rebuild:
+        schedule_index_rebuild()
+    if friend_graph_index.is_built:
+        return friend_graph_index.mutual_counts(user_id)
+    return await _mutual_counts_sql(db, user_id, limit)
+
+
+async def suggest_friends(db: AsyncSession, user_id: int, limit: int = 20) -> List[FriendSuggestionResponse]:
+    """Non-friends ranked by mutual friends, then by vibe tags shared with `user_id`"""
+    counts = await _mutual_counts(db, user_id, limit * CANDIDATES_PER_SUGGESTION)
+    candidates = [candidate for candidate, _ in counts.most_common(limit * CANDIDATES_PER_SUGGESTION)]
+    if not candidates:
+        return []
+
+    # Profiles + tags for the candidates and the caller in one query, skipping
+    # anyone with a pending request either way
+    pending_sent = select(FriendRequest.receiver_id).where(
+        FriendRequest.sender_id == user_id,
+        FriendRequest.status == FriendRequestStatus.PENDING
+    )
+    pending_received = select(FriendRequest.sender_id).where(
+        FriendRequest.receiver_id == user_id,
+        FriendRequest.status == FriendRequestStatus.PENDING
+    )
+    rows = await db.execute(
+        select(User.id, User.username, User.full_name, User.avatar_url, Persona.vibe_tags)
+        .outerjoin(Persona, Persona.user_id == User.id)
+        .where(
+            User.id.in_(candidates + [user_id]),
+            User.is_active.is_not(False),
+            User.id.not_in(pending_sent),
+            User.id.not_in(pending_received),
+        )
+    )
+    rows = {row.id: row for row in rows}
+    my_row = rows.pop(user_id, None)
+    my_tags = set(my_row.vibe_tags or []) if my_row else set()
+
+    suggestions = []
+    for candidate_id, row in rows.items():
+        shared = sorted(my_tags & set(row.vibe_tags or []))
+        suggestions.append(FriendSuggestionResponse(
+            user_id=candidate_id,
+            username=row.username,
+            full_name=row.full_name,
+            avatar_url=row.avatar_url,
+            mutual_friends=counts[candidate_id],
+            shared_vibe_tags=shared,
+            score=counts[candidate_id] + SHARED_TAG_WEIGHT * len(shared),
+        ))
+    suggestions.sort(key=lambda s: (-s.score, -s.mutual_friends, s.username))
+    return suggestions[:limit]
@@ -1,12 +1,25 @@
 """
 Gift Agent Service
 Handles AI-powered gift selection based on persona and vibe prompts
+
+The job handlers are coroutines, but their database work uses sync sessions,
+so it runs in a thread (asyncio.to_thread) - otherwise a worker's concurrent
+jobs, its lease renewals and (with JOB_WORKER_EMBEDDED) the API itself would
+all wait behind each blocking query.
 """
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+import asyncio
+import logging
 import random
+from sqlalchemy.orm.exc import StaleDataError
+from app.core.database import get_session_factory
+from app.services.job_queue import PermanentJobError
+
+logger = logging.getLogger(__name__)
+
+# Reload-and-reapply rounds for recording a placed order before giving up
+ORDER_RECORD_ATTEMPTS = 3
 
 
 class GiftAgentService:
@@ -95,109 +108,235 @@ class GiftAgentService:
         }
         return reasons.get(vibe, reasons["default"])
 
+    @staticmethod
+    def _commit(db, gift_id: int) -> bool:
+        """
+        Commit a gift update. Gift writes are compare-and-set on its version,
+        so if another writer (an approval, another worker) got there first
+        this one is dropped rather than overwriting it.
+        """
+        try:
+            db.commit()
+            return True
+        except StaleDataError:
+            db.rollback()
+            logger.info(f"Gift {gift_id} changed concurrently - leaving it to the other writer")
+            return False
+
+    @classmethod
+    def _apply_pick(cls, gift, persona):
+        """Select a gift for `gift` (given the recipient's persona) and move it on"""
+        from app.models.gift import GiftStatus
+
+        persona_data = None
+        if persona:
+            persona_data = {
+                "vibe_tags": persona.vibe_tags or [],
+                "interests": persona.interests or [],
+                "gift_style": persona.gift_style
+            }
+
+        # Detect vibe from prompt
+        vibe = cls._detect_vibe(gift.vibe_prompt or "")
+
+        # If persona has preferences, factor them in
+        if persona_data and persona_data.get("gift_style"):
+            vibe = persona_data["gift_style"]
+
+        # Select gift
+        selected = cls._select_gift(vibe, gift.budget_min, gift.budget_max)
+
+        if selected:
+            gift.gift_name = selected["name"]
+            gift.gift_description = selected["description"]
+            gift.gift_image_url = selected["image_url"]
+            gift.gift_price = selected["price"]
+            gift.agent_reasoning = cls._generate_reasoning(vibe, selected, persona_data)
+
+            if gift.is_surprise:
+                gift.status = GiftStatus.ORDERED
+                gift.ordered_at = datetime.utcnow()
+            else:
+                gift.status = GiftStatus.AWAITING_APPROVAL
+        else:
+            gift.status = GiftStatus.CANCELLED
+            gift.agent_reasoning = "Could not find a suitable gift within the budget range."
+
+    @classmethod
+    async def pick_gift(cls, gift_id: int, db_url: Optional[str] = None):
+        """Background job to pick a gift (no-op once picked, so retries are safe)"""
+        await asyncio.to_thread(cls._pick_gift, gift_id, db_url)
+
     @classmethod
-    async def pick_gift(cls, gift_id: int, db_url: str):
-        """Background task to pick a gift"""
+    def _pick_gift(cls, gift_id: int, db_url: Optional[str]):
         from app.models.gift import Gift, GiftStatus
         from app.models.persona import Persona
 
-        engine = create_engine(db_url)
-        Session = sessionmaker(bind=engine)
-        db = Session()
+        db = get_session_factory(db_url)()
 
         try:
             gift = db.query(Gift).filter(Gift.id == gift_id).first()
-            if not gift:
+            if not gift or gift.status != GiftStatus.AGENT_PICKING:
                 return
 
             # Get recipient persona
             persona = db.query(Persona).filter(Persona.user_id == gift.recipient_id).first()
-            persona_data = None
-            if persona:
-                persona_data = {
-                    "vibe_tags": persona.vibe_tags or [],
-                    "interests": persona.interests or [],
-                    "gift_style": persona.gift_style
-                }
-
-            # Detect vibe from prompt
-            vibe = cls._detect_vibe(gift.vibe_prompt or "")
-
-            # If persona has preferences, factor them in
-            if persona_data and persona_data.get("gift_style"):
-                vibe = persona_data["gift_style"]
-
-            # Select gift
-            selected = cls._select_gift(vibe, gift.budget_min, gift.budget_max)
-
-            if selected:
-                gift.gift_name = selected["name"]
-                gift.gift_description = selected["description"]
-                gift.gift_image_url = selected["image_url"]
-                gift.gift_price = selected["price"]
-                gift.agent_reasoning = cls._generate_reasoning(vibe, selected, persona_data)
-
-                if gift.is_surprise:
-                    gift.status = GiftStatus.ORDERED
-                    gift.ordered_at = datetime.utcnow()
-                else:
-                    gift.status = GiftStatus.AWAITING_APPROVAL
-            else:
-                gift.status = GiftStatus.CANCELLED
-                gift.agent_reasoning = "Could not find a suitable gift within the budget range."
+            cls._apply_pick(gift, persona)
+            cls._commit(db, gift_id)
+        finally:
+            db.close()
+
+    @classmethod
+    async def pick_gifts(cls, gift_ids: List[int], db_url: Optional[str] = None):
+        """
+        Background job for a batch of gifts (POST /gifts/bulk): one query for
+        the gifts, one for the recipients' personas and a single commit, then
+        orders for the surprise gifts that got a pick
+        """
+        to_order = await asyncio.to_thread(cls._pick_gifts, gift_ids, db_url)
+        for gift_id in to_order:
+            await cls.place_order(gift_id, db_url)
+
+    @classmethod
+    def _pick_gifts(cls, gift_ids: List[int], db_url: Optional[str]) -> List[int]:
+        """Pick the batch; returns the ids of surprise gifts now ready to order"""
+        from app.models.gift import Gift, GiftStatus
+        from app.models.persona import Persona
 
+        db = get_session_factory(db_url)()
+
+        try:
+            gifts = db.query(Gift).filter(Gift.id.in_(gift_ids)).all()
+            if not gifts:
+                return []
+
+            # On a retry, gifts picked by the earlier attempt are skipped but
+            # their orders still go out
+            to_pick = [gift for gift in gifts if gift.status == GiftStatus.AGENT_PICKING]
+            personas = {
+                persona.user_id: persona
+                for persona in db.query(Persona).filter(
+                    Persona.user_id.in_({gift.recipient_id for gift in to_pick})
+                )
+            } if to_pick else {}
+            for gift in to_pick:
+                cls._apply_pick(gift, personas.get(gift.recipient_id))
+            # A conflict on any gift fails the job; the retry skips gifts that moved on
             db.commit()
+            return [gift.id for gift in gifts if gift.is_surprise and gift.status == GiftStatus.ORDERED]
         finally:
             db.close()
 
     @classmethod
-    async def place_order(cls, gift_id: int, db_url: str):
-        """Background task to place order with delivery platform"""
-        from app.models.gift import Gift, GiftStatus, DeliveryPlatform
+    async def place_order(cls, gift_id: int, db_url: Optional[str] = None):
+        """Background job to place order with delivery platform (only for gifts still ORDERED)"""
+        from app.models.gift import DeliveryPlatform
         from app.agents.blinkit import BlinkitAgent
         from app.agents.zepto import ZeptoAgent
 
-        engine = create_engine(db_url)
-        Session = sessionmaker(bind=engine)
-        db = Session()
+        order = await asyncio.to_thread(cls._load_order, gift_id, db_url)
+        if order is None:
+            return
+
+        # Try Blinkit first, then Zepto
+        platform = DeliveryPlatform.BLINKIT
+        order_result = await BlinkitAgent.place_order(**order)
+
+        if not order_result.get("success"):
+            platform = DeliveryPlatform.ZEPTO
+            order_result = await ZeptoAgent.place_order(**order)
+
+        await asyncio.to_thread(cls._record_order, gift_id, platform, order_result, db_url)
 
+    @staticmethod
+    def _load_order(gift_id: int, db_url: Optional[str]) -> Optional[Dict[str, Any]]:
+        """What to order for a gift, or None unless it is ORDERED"""
+        from app.models.gift import Gift, GiftStatus
+
+        db = get_session_factory(db_url)()
         try:
             gift = db.query(Gift).filter(Gift.id == gift_id).first()
-            if not gift:
-                return
+            if not gift or gift.status != GiftStatus.ORDERED:
+                return None
+            return {
+                "product_name": gift.gift_name,
+                "delivery_address": gift.delivery_address,
+                "price": gift.gift_price,
+            }
+        finally:
+            db.close()
+
+    @staticmethod
+    def _apply_order_result(gift, platform, order_result: Dict[str, Any]):
+        from app.models.gift import GiftStatus
 
-            # Try Blinkit first, then Zepto
-            order_result = await BlinkitAgent.place_order(
-                product_name=gift.gift_name,
-                delivery_address=gift.delivery_address,
-                price=gift.gift_price
-            )
+        if order_result.get("success"):
+            gift.platform = platform
+            gift.order_id = order_result.get("order_id")
+            gift.tracking_url = order_result.get("tracking_url")
+            gift.status = GiftStatus.SHIPPED
+        else:
+            gift.status = GiftStatus.CANCELLED
+            gift.agent_reasoning = (gift.agent_reasoning or "") + f"\n\nOrder failed: {order_result.get('error', 'Unknown error')}"
 
+    @classmethod
+    def _record_order(cls, gift_id: int, platform, order_result: Dict[str, Any], db_url: Optional[str]):
+        """
+        Save the outcome of an order attempt. A placed order is an external
+        side effect, so once one exists any failure to record it (a version
+        conflict we can't resolve, a lost connection, a failed commit) fails
+        the job without a retry - running it again would place a second
+        order while the gift still says ORDERED.
+        """
+        try:
+            db = get_session_factory(db_url)()
+            try:
+                cls._save_order_result(db, gift_id, platform, order_result)
+            finally:
+                db.close()
+        except PermanentJobError:
+            raise
+        except Exception as e:
             if not order_result.get("success"):
-                order_result = await ZeptoAgent.place_order(
-                    product_name=gift.gift_name,
-                    delivery_address=gift.delivery_address,
-                    price=gift.gift_price
-                )
-                if order_result.get("success"):
-                    gift.platform = DeliveryPlatform.ZEPTO
-            else:
-                gift.platform = DeliveryPlatform.BLINKIT
+                raise  # nothing was ordered - a retry is safe
+            raise PermanentJobError(
+                f"Could not record {platform.value} order {order_result.get('order_id')} for gift {gift_id} "
+                f"({type(e).__name__}: {e}) - reconcile manually"
+            ) from e
 
-            if order_result.get("success"):
-                gift.order_id = order_result.get("order_id")
-                gift.tracking_url = order_result.get("tracking_url")
-                gift.status = GiftStatus.SHIPPED
-            else:
-                gift.status = GiftStatus.CANCELLED
-                gift.agent_reasoning += f"\n\nOrder failed: {order_result.get('error', 'Unknown error')}"
+    @classmethod
+    def _save_order_result(cls, db, gift_id: int, platform, order_result: Dict[str, Any]):
+        """
+        Unlike _commit(), a version conflict (say a reaction landing meanwhile)
+        can't just drop the write: reload the gift and re-apply while it is
+        still ORDERED. If it has moved on, fail the job without a retry.
+        """
+        from app.models.gift import Gift, GiftStatus
 
-            db.commit()
-        finally:
-            db.close()
+        placed = bool(order_result.get("success"))
+        for _ in range(ORDER_RECORD_ATTEMPTS):
+            gift = db.query(Gift).filter(Gift.id == gift_id).populate_existing().first()
+            if gift is None or gift.status != GiftStatus.ORDERED:
+                if not placed:
+                    return  # nothing was ordered, nothing to reconcile
+                raise PermanentJobError(
+                    f"Gift {gift_id} is no longer ORDERED but {platform.value} order "
+                    f"{order_result.get('order_id')} was placed for it - reconcile manually"
+                )
+            cls._apply_order_result(gift, platform, order_result)
+            try:
+                db.commit()
+                return
+            except StaleDataError:
+                db.rollback()
+                logger.info(f"Gift {gift_id} changed while recording its order - reloading")
+        raise PermanentJobError(
+            f"Could not record {platform.value} order {order_result.get('order_id')} for gift {gift_id} "
+            f"after {ORDER_RECORD_ATTEMPTS} version conflicts - reconcile manually"
+        )
 
     @classmethod
-    async def pick_and_order_gift(cls, gift_id: int, db_url: str):
+    async def pick_and_order_gift(cls, gift_id: int, db_url: Optional[str] = None):
         """Combined pick and order for YOLO/surprise mode"""
         await cls.pick_gift(gift_id, db_url)
         await cls.place_order(gift_id, db_url)
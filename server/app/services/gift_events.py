@@ -0,0 +1,267 @@
+"""
+Gift Events
+Pub/sub for gift status changes, streamed to clients over SSE
+(GET /api/gifts/events) instead of having them poll each pending gift.
+
+Every gift creation and status change - whether made by a route, a job
+worker or the scheduler, in any process - is written to the gift_events
+outbox table in the same transaction (app/models/gift_event.py). Each API
+process runs one relay task that tails that table by id and fans new rows
+out to its open streams, so the row id doubles as the SSE event id and a
+reconnecting client's Last-Event-ID is replayed from the table.
+
+Ids are allocated at insert but become visible at commit, so a lower id can
+show up after a higher one. The relay delivers rows as they appear and only
+moves its cursor past a missing id once it has stayed missing for
+GAP_TIMEOUT_SECONDS (a rolled-back insert).
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.gift_event import GiftEventRecord
+
+logger = logging.getLogger(__name__)
+
+# Undelivered events a slow subscriber may queue before it is told to resync
+SUBSCRIBER_QUEUE_SIZE = 100
+# Rows read from the outbox per poll
+POLL_BATCH_SIZE = 500
+# How long a missing id may hold the cursor back before it's treated as rolled back
+GAP_TIMEOUT_SECONDS = 5
+
+
+@dataclass(frozen=True)
+class GiftEvent:
+    id: int
+    user_ids: Tuple[int, ...]
+    data: dict
+
+    @classmethod
+    def from_record(cls, record: GiftEventRecord) -> "GiftEvent":
+        return cls(record.id, tuple(sorted({record.sender_id, record.recipient_id})), record.to_data())
+
+    def encode(self) -> str:
+        return f"id: {self.id}\nevent: gift\ndata: {json.dumps(self.data)}\n\n"
+
+
+class Subscription:
+    """One open stream - events are handed over on the loop that opened it"""
+
+    def __init__(self, user_id: int, loop: asyncio.AbstractEventLoop):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.lagged = False
+
+    def _put(self, gift_event: GiftEvent):
+        try:
+            self.queue.put_nowait(gift_event)
+        except asyncio.QueueFull:
+            self.lagged = True
+
+    def deliver(self, gift_event: GiftEvent):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self._put(gift_event)
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._put, gift_event)
+
+
+class GiftEventHub:
+    """Per-user fan-out of the gift_events outbox, tailed by one relay task per process"""
+
+    def __init__(self, replay_limit: int, poll_seconds: float):
+        self.replay_limit = replay_limit
+        self.poll_seconds = poll_seconds
+        self._subscribers: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._cursor: Optional[int] = None  # every id <= cursor has been handled
+        self._ahead: Set[int] = set()  # delivered ids above the cursor (waiting on a gap)
+        self._gap_since: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+
+    def _fan_out(self, gift_event: GiftEvent):
+        with self._lock:
+            # Marked delivered under the same lock subscribe() snapshots it
+            # with, so a new stream gets each event either replayed or live
+            self._ahead.add(gift_event.id)
+            targets = [sub for user_id in gift_event.user_ids for sub in self._subscribers.get(user_id, ())]
+        for subscription in targets:
+            subscription.deliver(gift_event)
+
+    def _advance(self, now: float):
+        """Move the cursor over delivered ids, skipping gaps older than GAP_TIMEOUT_SECONDS"""
+        while self._ahead:
+            if self._cursor + 1 in self._ahead:
+                self._ahead.remove(self._cursor + 1)
+                self._cursor += 1
+                self._gap_since = None
+                continue
+            if self._gap_since is None:
+                self._gap_since = now
+            if now - self._gap_since < GAP_TIMEOUT_SECONDS:
+                return
+            self._cursor = min(self._ahead) - 1
+            self._gap_since = None
+
+    async def poll(self, db: AsyncSession):
+        """Deliver outbox rows committed since the last poll"""
+        if self._cursor is None:
+            # Start from the tail - older events are only served as replays
+            self._cursor = await db.scalar(select(func.coalesce(func.max(GiftEventRecord.id), 0)))
+            return
+        records = (await db.scalars(
+            select(GiftEventRecord)
+            .where(GiftEventRecord.id > self._cursor)
+            .order_by(GiftEventRecord.id)
+            .limit(POLL_BATCH_SIZE)
+        )).all()
+        for record in records:
+            if record.id in self._ahead:
+                continue
+            self._fan_out(GiftEvent.from_record(record))
+        with self._lock:
+            self._advance(time.monotonic())
+
+    async def run(self):
+        """Relay loop - tail the outbox until cancelled"""
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    await self.poll(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Gift event relay poll failed")
+            await asyncio.sleep(self.poll_seconds)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _replay(
+        self, db: AsyncSession, user_id: int, last_event_id: int, cursor: int, ahead: Set[int]
+    ) -> Optional[List[GiftEvent]]:
+        """
+        Events for `user_id` after `last_event_id` that this process already
+        relayed, or None if some were purged (or the id is unknown)
+        """
+        newest = max(ahead, default=cursor)
+        if last_event_id > newest:
+            return None  # not an id this table has handed out yet
+        oldest = await db.scalar(select(func.min(GiftEventRecord.id)))
+        if oldest is not None and oldest > last_event_id + 1:
+            return None
+        relayed = GiftEventRecord.id <= cursor
+        if ahead:
+            relayed = or_(relayed, GiftEventRecord.id.in_(ahead))
+        records = (await db.scalars(
+            select(GiftEventRecord)
+            .where(
+                GiftEventRecord.id > last_event_id,
+                relayed,
+                or_(GiftEventRecord.sender_id == user_id, GiftEventRecord.recipient_id == user_id),
+            )
+            .order_by(GiftEventRecord.id)
+            .limit(self.replay_limit + 1)
+        )).all()
+        if len(records) > self.replay_limit:
+            return None
+        return [GiftEvent.from_record(record) for record in records]
+
+    async def subscribe(
+        self, user_id: int, last_event_id: Optional[int] = None
+    ) -> Tuple[Subscription, Optional[List[GiftEvent]]]:
+        """
+        Register a stream; returns it with the events to replay first
+        (None means the gap can't be replayed and the client should resync)
+        """
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self._lock:
+            # Everything up to here is replayed; anything newer arrives live
+            cursor, ahead = self._cursor, set(self._ahead)
+            self._subscribers[user_id].add(subscription)
+        if last_event_id is None:
+            return subscription, []
+        if cursor is None:
+            return subscription, None  # relay not started yet
+        async with AsyncSessionLocal() as db:
+            replay = await self._replay(db, user_id, last_event_id, cursor, ahead)
+        return subscription, replay
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subs) for subs in self._subscribers.values())
+
+
+gift_event_hub = GiftEventHub(
+    replay_limit=settings.GIFT_EVENTS_BUFFER_SIZE,
+    poll_seconds=settings.GIFT_EVENTS_POLL_SECONDS,
+)
+
+
+# Client reconnect delay sent with the stream (ms)
+RETRY_MS = 3000
+RESET = "event: reset\ndata: {}\n\n"
+HEARTBEAT = ": heartbeat\n\n"
+
+
+async def event_stream(user_id: int, last_event_id: Optional[int] = None):
+    """
+    SSE body for one client: replay after `last_event_id`, then live events
+    with a heartbeat comment whenever the stream is otherwise idle
+    """
+    subscription, replay = await gift_event_hub.subscribe(user_id, last_event_id)
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        if replay is None:
+            yield RESET
+        else:
+            for gift_event in replay:
+                yield gift_event.encode()
+
+        while True:
+            try:
+                gift_event = await asyncio.wait_for(
+                    subscription.queue.get(), timeout=settings.GIFT_EVENTS_HEARTBEAT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield HEARTBEAT
+                continue
+            yield gift_event.encode()
+            if subscription.lagged:
+                # Dropped events are still in the outbox - end the stream so
+                # the client reconnects with Last-Event-ID and replays them
+                return
+    finally:
+        gift_event_hub.unsubscribe(subscription)
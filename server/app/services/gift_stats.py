@@ -0,0 +1,118 @@
+"""
+Gift Stats
+Reads and rebuilds for the gift_stats / gift_monthly_spend aggregates.
+
+The tables are kept current by the flush listener in app/models/gift_stats.py,
+so serving GET /gifts/stats costs a couple of primary-key range reads no
+matter how many gifts a user has. Writes that bypass the ORM (bulk Core
+inserts, manual SQL) aren't counted - rebuild() recomputes everything from
+the gifts table in one streaming pass:
+
+    python -m scripts.rebuild_gift_stats
+"""
+from datetime import datetime
+from typing import Dict, Tuple
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.gift import Gift, GiftStatus
+from app.models.gift_stats import (
+    GiftMonthlySpend,
+    GiftStats,
+    RECEIVED,
+    SENT,
+    SPENT_STATUSES,
+    Deltas,
+    accumulate,
+    month_key,
+)
+from app.models.user import User
+from app.schemas.gift import GiftDirectionStats, GiftFriendSpend, GiftStatsResponse
+
+BATCH_SIZE = 5000
+
+
+async def get_gift_stats(db: AsyncSession, user_id: int) -> GiftStatsResponse:
+    """Counts by status, spend per friend and this month's spend for `user_id`"""
+    rows = await db.execute(
+        select(
+            GiftStats.direction,
+            GiftStats.friend_id,
+            GiftStats.status,
+            GiftStats.gift_count,
+            GiftStats.spend,
+            User.username,
+        )
+        .outerjoin(User, User.id == GiftStats.friend_id)
+        .where(GiftStats.user_id == user_id, GiftStats.gift_count > 0)
+    )
+    directions: Dict[str, GiftDirectionStats] = {}
+    friends: Dict[int, GiftFriendSpend] = {}
+    for row in rows:
+        gift_status = GiftStatus(row.status)
+        stats = directions.setdefault(row.direction, GiftDirectionStats())
+        stats.total += row.gift_count
+        stats.by_status[gift_status] = stats.by_status.get(gift_status, 0) + row.gift_count
+        if gift_status in SPENT_STATUSES:
+            stats.spend += row.spend
+            if row.direction == SENT:
+                friend = friends.setdefault(
+                    row.friend_id,
+                    GiftFriendSpend(friend_id=row.friend_id, username=row.username, gifts=0, spend=0),
+                )
+                friend.gifts += row.gift_count
+                friend.spend += row.spend
+
+    month = month_key(datetime.utcnow())
+    this_month = (await db.execute(
+        select(GiftMonthlySpend.gift_count, GiftMonthlySpend.spend)
+        .where(GiftMonthlySpend.user_id == user_id, GiftMonthlySpend.month == month)
+    )).first()
+    return GiftStatsResponse(
+        sent=directions.get(SENT, GiftDirectionStats()),
+        received=directions.get(RECEIVED, GiftDirectionStats()),
+        month=month,
+        gifts_this_month=this_month.gift_count if this_month else 0,
+        spend_this_month=this_month.spend if this_month else 0,
+        spend_by_friend=sorted(friends.values(), key=lambda f: (-f.spend, f.friend_id)),
+    )
+
+
+def _insert_batches(conn: Connection, table, key_columns, totals: Deltas):
+    rows = [
+        {**dict(zip(key_columns, key)), "gift_count": count, "spend": spend}
+        for key, (count, spend) in totals.items()
+        if count
+    ]
+    for start in range(0, len(rows), BATCH_SIZE):
+        conn.execute(insert(table), rows[start:start + BATCH_SIZE])
+
+
+def rebuild(conn: Connection) -> Tuple[int, int]:
+    """
+    Recompute both aggregate tables from the gifts table inside `conn`'s
+    transaction. Returns (gifts scanned, stats rows written).
+    """
+    if conn.dialect.name == "postgresql":
+        # Block gift writes until the new totals commit, so no flush's delta
+        # lands between the scan and the swap
+        conn.execute(text("LOCK TABLE gifts IN SHARE MODE"))
+    conn.execute(delete(GiftStats))
+    conn.execute(delete(GiftMonthlySpend))
+
+    stats: Deltas = {}
+    monthly: Deltas = {}
+    scanned = 0
+    result = conn.execution_options(stream_results=True, yield_per=BATCH_SIZE).execute(
+        select(
+            Gift.sender_id, Gift.recipient_id, Gift.status,
+            Gift.gift_price, Gift.ordered_at, Gift.created_at,
+        )
+    )
+    for row in result:
+        accumulate(stats, monthly, tuple(row))
+        scanned += 1
+
+    _insert_batches(conn, GiftStats.__table__, ["user_id", "direction", "friend_id", "status"], stats)
+    _insert_batches(conn, GiftMonthlySpend.__table__, ["user_id", "month"], monthly)
+    return scanned, len(stats) + len(monthly)
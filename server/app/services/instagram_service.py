@@ -4,10 +4,9 @@ Uses instaloader to fetch public Instagram profile data
 """
 import instaloader
 from typing import Optional, Dict, Any, List
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 from datetime import datetime
 import asyncio
+from app.core.database import get_session_factory
 
 
 class InstagramService:
@@ -90,14 +89,12 @@ class InstagramService:
             return None
 
     @classmethod
-    async def sync_profile(cls, connection_id: int, db_url: str):
+    async def sync_profile(cls, connection_id: int, db_url: Optional[str] = None):
         """Background task to sync Instagram profile data"""
         from app.models.social import SocialConnection
         from app.models.persona import Persona
 
-        engine = create_engine(db_url)
-        Session = sessionmaker(bind=engine)
-        db = Session()
+        db = get_session_factory(db_url)()
 
         try:
             connection = db.query(SocialConnection).filter(
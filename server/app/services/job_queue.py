@@ -0,0 +1,157 @@
+"""
+Job Queue
+Durable background jobs stored in the `jobs` table.
+
+Producers enqueue() a job in the same transaction as the rows it refers to,
+so a committed gift always has its picking/ordering job and a rolled-back
+one never does. Workers (app/services/job_worker.py) claim due jobs with
+SELECT ... FOR UPDATE SKIP LOCKED, so any number of them can poll the table
+without handing the same job to two workers. A claim is a lease: the worker
+renews locked_until while the job runs, and if it dies the job becomes
+claimable again once the lease expires. Failures are retried with
+exponential backoff up to max_attempts.
+"""
+import random
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models.job import Job, JobStatus
+
+# Longest last_error kept on a job row
+MAX_ERROR_LENGTH = 4000
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when a retry can't help (or would do harm) - the job fails at once"""
+
+
+def enqueue(db, job_type: str, run_at: Optional[datetime] = None, max_attempts: Optional[int] = None, **payload) -> Job:
+    """Add a job to `db` (sync or async session) - it is queued when the caller commits"""
+    job = Job(
+        job_type=job_type,
+        payload=payload,
+        status=JobStatus.QUEUED,
+        attempts=0,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        run_at=run_at or datetime.utcnow(),
+    )
+    db.add(job)
+    return job
+
+
+def _lease_until(now: datetime) -> datetime:
+    return now + timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT_SECONDS)
+
+
+def _update(*conditions):
+    return update(Job).where(*conditions).execution_options(synchronize_session=False)
+
+
+async def claim(db: AsyncSession, worker_id: str, limit: int) -> List[Job]:
+    """Lease up to `limit` due jobs (queued, or running with an expired lease) to `worker_id`"""
+    now = datetime.utcnow()
+    due = (
+        select(Job.id)
+        .where(or_(
+            and_(Job.status == JobStatus.QUEUED, Job.run_at <= now),
+            and_(Job.status == JobStatus.RUNNING, Job.locked_until < now, Job.attempts < Job.max_attempts),
+        ))
+        .order_by(Job.run_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    rows = await db.execute(
+        _update(Job.id.in_(due.scalar_subquery()))
+        .values(
+            status=JobStatus.RUNNING,
+            attempts=Job.attempts + 1,
+            locked_by=worker_id,
+            locked_until=_lease_until(now),
+        )
+        .returning(Job.id, Job.job_type, Job.payload, Job.attempts, Job.max_attempts, Job.run_at)
+    )
+    jobs = rows.all()
+    await db.commit()
+    return jobs
+
+
+async def renew(db: AsyncSession, worker_id: str, job_ids: Sequence[int]):
+    """Extend the lease on jobs this worker is still running"""
+    if not job_ids:
+        return
+    await db.execute(
+        _update(Job.id.in_(job_ids), Job.locked_by == worker_id, Job.status == JobStatus.RUNNING)
+        .values(locked_until=_lease_until(datetime.utcnow()))
+    )
+    await db.commit()
+
+
+async def complete(db: AsyncSession, worker_id: str, job_id: int):
+    await db.execute(
+        _update(Job.id == job_id, Job.locked_by == worker_id, Job.status == JobStatus.RUNNING)
+        .values(status=JobStatus.SUCCEEDED, locked_by=None, locked_until=None, finished_at=datetime.utcnow())
+    )
+    await db.commit()
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with +/-20% jitter so failed batches don't retry in lockstep"""
+    delay = min(settings.JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.JOB_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+async def fail(db: AsyncSession, worker_id: str, job_id: int, attempts: int, max_attempts: int, error: str) -> bool:
+    """Schedule a retry, or mark the job failed once attempts run out; returns True if it will retry"""
+    now = datetime.utcnow()
+    will_retry = attempts < max_attempts
+    if will_retry:
+        values = dict(status=JobStatus.QUEUED, run_at=now + timedelta(seconds=retry_delay(attempts)))
+    else:
+        values = dict(status=JobStatus.FAILED, finished_at=now)
+    await db.execute(
+        _update(Job.id == job_id, Job.locked_by == worker_id, Job.status == JobStatus.RUNNING)
+        .values(locked_by=None, locked_until=None, last_error=error[:MAX_ERROR_LENGTH], **values)
+    )
+    await db.commit()
+    return will_retry
+
+
+async def reap_expired(db: AsyncSession) -> int:
+    """Fail jobs whose lease expired on their last allowed attempt (their worker died)"""
+    now = datetime.utcnow()
+    result = await db.execute(
+        _update(
+            Job.status == JobStatus.RUNNING,
+            Job.locked_until < now,
+            Job.attempts >= Job.max_attempts,
+        ).values(
+            status=JobStatus.FAILED,
+            locked_by=None,
+            locked_until=None,
+            finished_at=now,
+            last_error="Lease expired on the final attempt",
+        )
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def queue_stats(db: AsyncSession) -> list:
+    """Job counts per (job_type, status) plus the oldest due queued job's age"""
+    now = datetime.utcnow()
+    rows = await db.execute(
+        select(Job.job_type, Job.status, func.count(), func.min(Job.run_at))
+        .where(Job.status.in_([JobStatus.QUEUED, JobStatus.RUNNING, JobStatus.FAILED]))
+        .group_by(Job.job_type, Job.status)
+    )
+    stats = []
+    for job_type, job_status, count, oldest in rows:
+        if isinstance(oldest, str):  # SQLite hands back text for aggregates
+            oldest = datetime.fromisoformat(oldest)
+        entry = {"job_type": job_type, "status": job_status.value, "count": count}
+        if job_status == JobStatus.QUEUED and oldest is not None:
+            entry["oldest_due_seconds"] = round(max((now - oldest.replace(tzinfo=None)).total_seconds(), 0.0), 3)
+        stats.append(entry)
+    return stats
@@ -0,0 +1,133 @@
+"""
+Job Worker
+Claims jobs from the job queue and runs them with bounded concurrency.
+
+Run standalone with `python -m app.worker` (scale by adding processes), or
+inside the API process when JOB_WORKER_EMBEDDED is set.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+import traceback
+import uuid
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import get_job_metrics, job_stats
+from app.services import job_queue
+from app.services.gift_agent import GiftAgentService
+
+logger = logging.getLogger(__name__)
+
+# job_type -> coroutine called with the job's payload as keyword arguments.
+# Handlers may run more than once (retries, expired leases) and must be
+# safe to repeat.
+JOB_HANDLERS: Dict[str, Callable[..., Awaitable]] = {
+    "pick_gift": GiftAgentService.pick_gift,
+    "pick_gifts": GiftAgentService.pick_gifts,
+    "place_order": GiftAgentService.place_order,
+    "pick_and_order_gift": GiftAgentService.pick_and_order_gift,
+}
+
+STATS_LOG_SECONDS = 60
+
+
+class JobWorker:
+    """Polls the jobs table and runs up to `concurrency` jobs at a time"""
+
+    def __init__(self, concurrency: Optional[int] = None, worker_id: Optional[str] = None):
+        self.concurrency = concurrency or settings.JOB_WORKER_CONCURRENCY
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._running: Dict[int, asyncio.Task] = {}
+        self._stopping = asyncio.Event()
+        self._wakeup = asyncio.Event()
+
+    def stop(self):
+        """Stop claiming new jobs; run() returns once in-flight jobs finish"""
+        self._stopping.set()
+        self._wakeup.set()
+
+    async def run(self):
+        logger.info(f"Job worker {self.worker_id} started (concurrency {self.concurrency})")
+        maintenance = asyncio.create_task(self._maintain())
+        try:
+            while not self._stopping.is_set():
+                claimed = 0
+                free = self.concurrency - len(self._running)
+                if free > 0:
+                    claimed = await self._claim(free)
+
+                # Poll again straight away if the batch was full, otherwise
+                # wait for a slot to free up or the poll interval
+                if claimed and claimed == free:
+                    continue
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=settings.JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if self._running:
+                await asyncio.gather(*self._running.values(), return_exceptions=True)
+            maintenance.cancel()
+            logger.info(f"Job worker {self.worker_id} stopped")
+
+    async def _claim(self, limit: int) -> int:
+        try:
+            async with AsyncSessionLocal() as db:
+                jobs = await job_queue.claim(db, self.worker_id, limit)
+        except Exception as e:
+            logger.error(f"Error claiming jobs: {e}")
+            return 0
+        for job in jobs:
+            self._running[job.id] = asyncio.create_task(self._execute(job))
+        return len(jobs)
+
+    async def _execute(self, job):
+        metrics = get_job_metrics(job.job_type)
+        run_at = job.run_at.replace(tzinfo=None) if isinstance(job.run_at, datetime) else None
+        metrics.record_start((datetime.utcnow() - run_at).total_seconds() if run_at else 0.0)
+        start = time.perf_counter()
+        try:
+            handler = JOB_HANDLERS.get(job.job_type)
+            if handler is None:
+                raise LookupError(f"No handler for job type {job.job_type!r}")
+            await handler(**job.payload)
+        except Exception as e:
+            permanent = isinstance(e, job_queue.PermanentJobError)
+            log = logger.error if permanent else logger.warning
+            log(f"Job {job.id} ({job.job_type}) attempt {job.attempts} failed: {e}")
+            async with AsyncSessionLocal() as db:
+                will_retry = await job_queue.fail(
+                    db, self.worker_id, job.id, job.attempts,
+                    job.attempts if permanent else job.max_attempts, traceback.format_exc()
+                )
+            metrics.record_finish(time.perf_counter() - start, "retried" if will_retry else "failed")
+        else:
+            async with AsyncSessionLocal() as db:
+                await job_queue.complete(db, self.worker_id, job.id)
+            metrics.record_finish(time.perf_counter() - start, "succeeded")
+        finally:
+            self._running.pop(job.id, None)
+            self._wakeup.set()
+
+    async def _maintain(self):
+        """Renew leases on running jobs, fail abandoned ones and log counters"""
+        interval = max(settings.JOB_VISIBILITY_TIMEOUT_SECONDS / 3, 1)
+        last_stats = time.monotonic()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with AsyncSessionLocal() as db:
+                    await job_queue.renew(db, self.worker_id, list(self._running))
+                    reaped = await job_queue.reap_expired(db)
+                if reaped:
+                    logger.warning(f"Failed {reaped} jobs whose lease expired on their final attempt")
+            except Exception as e:
+                logger.error(f"Error renewing job leases: {e}")
+            if time.monotonic() - last_stats >= STATS_LOG_SECONDS:
+                last_stats = time.monotonic()
+                logger.info(f"Job stats: {job_stats()}")
@@ -6,10 +6,14 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
+from app.core.config import settings
 from app.core.database import SessionLocal
 from app.models.gift import Gift, GiftSubscription, GiftStatus
+from app.models.gift_event import GiftEventRecord
+from app.models.idempotency import IdempotencyKey
+from app.models.job import Job, JobStatus
 from app.models.persona import Persona
-from app.services.gift_agent import GiftAgentService
+from app.services.job_queue import enqueue
 import logging
 
 logger = logging.getLogger(__name__)
@@ -40,6 +44,30 @@ class GiftScheduler:
             replace_existing=True
         )
 
+        # Drop expired Idempotency-Key responses
+        scheduler.add_job(
+            cls.purge_idempotency_keys,
+            CronTrigger(minute=30),
+            id="purge_idempotency_keys",
+            replace_existing=True
+        )
+
+        # Drop finished jobs past their retention
+        scheduler.add_job(
+            cls.purge_finished_jobs,
+            CronTrigger(minute=45),
+            id="purge_finished_jobs",
+            replace_existing=True
+        )
+
+        # Drop gift events past the SSE replay window
+        scheduler.add_job(
+            cls.purge_gift_events,
+            CronTrigger(minute=15),
+            id="purge_gift_events",
+            replace_existing=True
+        )
+
         # Also run immediately on startup
         scheduler.add_job(
             cls.process_subscriptions,
@@ -80,6 +108,57 @@ class GiftScheduler:
         finally:
             db.close()
 
+    @classmethod
+    async def purge_idempotency_keys(cls):
+        """Delete idempotency keys past their TTL"""
+        db = SessionLocal()
+        try:
+            deleted = db.query(IdempotencyKey).filter(
+                IdempotencyKey.expires_at < datetime.utcnow()
+            ).delete(synchronize_session=False)
+            db.commit()
+            logger.info(f"Purged {deleted} expired idempotency keys")
+        except Exception as e:
+            logger.error(f"Error purging idempotency keys: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    @classmethod
+    async def purge_gift_events(cls):
+        """Delete gift_events outbox rows older than GIFT_EVENTS_RETENTION_HOURS"""
+        db = SessionLocal()
+        try:
+            cutoff = datetime.utcnow() - timedelta(hours=settings.GIFT_EVENTS_RETENTION_HOURS)
+            deleted = db.query(GiftEventRecord).filter(
+                GiftEventRecord.created_at < cutoff
+            ).delete(synchronize_session=False)
+            db.commit()
+            logger.info(f"Purged {deleted} gift events")
+        except Exception as e:
+            logger.error(f"Error purging gift events: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    @classmethod
+    async def purge_finished_jobs(cls):
+        """Delete succeeded/failed jobs older than JOB_RETENTION_DAYS"""
+        db = SessionLocal()
+        try:
+            cutoff = datetime.utcnow() - timedelta(days=settings.JOB_RETENTION_DAYS)
+            deleted = db.query(Job).filter(
+                Job.status.in_([JobStatus.SUCCEEDED, JobStatus.FAILED]),
+                Job.finished_at < cutoff
+            ).delete(synchronize_session=False)
+            db.commit()
+            logger.info(f"Purged {deleted} finished jobs")
+        except Exception as e:
+            logger.error(f"Error purging finished jobs: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
     @classmethod
     def _is_due(cls, subscription: GiftSubscription, now: datetime) -> bool:
         """Check if subscription is due for sending"""
@@ -155,8 +234,10 @@ class GiftScheduler:
                 sender_message=f"Automated gift from your subscription!"
             )
             db.add(gift)
-            db.commit()
-            db.refresh(gift)
+            db.flush()
+
+            # Queue the agent to pick and order the gift
+            enqueue(db, "pick_and_order_gift", gift_id=gift.id)
 
             # Update subscription
             subscription.last_sent_at = datetime.utcnow()
@@ -172,12 +253,6 @@ class GiftScheduler:
 
             db.commit()
 
-            # Trigger agent to pick and order gift
-            await GiftAgentService.pick_and_order_gift(
-                gift_id=gift.id,
-                db_url=str(db.get_bind().url)
-            )
-
             logger.info(f"Subscription gift {gift.id} created successfully")
 
         except Exception as e:
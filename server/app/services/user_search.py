@@ -0,0 +1,168 @@
+"""
+User Search
+Ranked username/email search that stays off sequential scans.
+
+On Postgres the query is served by pg_trgm GIN indexes (substring matches)
+and a lower(username) text_pattern_ops index (short prefix queries), see
+migration 0003. SQLite has neither, so dev setups fall back to an in-process
+trigram/prefix index built from the users table.
+"""
+import bisect
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.user import User
+from app.models.friend import Friendship
+
+# Queries shorter than this have no trigrams - they only match as prefixes
+MIN_TRIGRAM_QUERY = 3
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _trigrams(value: str) -> Set[str]:
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def _rank(query: str, username: str, email: str) -> Optional[int]:
+    """0 = exact, 1 = prefix, 2 = substring, None = no match (inputs lowercased)"""
+    if query in (username, email):
+        return 0
+    if username.startswith(query) or email.startswith(query):
+        return 1
+    if query in username or query in email:
+        return 2
+    return None
+
+
+def _friend_ids_query(user_id: int):
+    return select(Friendship.friend_id).where(Friendship.user_id == user_id)
+
+
+async def _search_indexed(db: AsyncSession, query: str, user_id: int, limit: int) -> List[User]:
+    """Single ranked query - trigram GIN index for substrings, btree for short prefixes"""
+    prefix = f"{_escape_like(query)}%"
+    if len(query) < MIN_TRIGRAM_QUERY:
+        match = func.lower(User.username).like(prefix, escape="\\")
+    else:
+        pattern = f"%{_escape_like(query)}%"
+        match = User.username.ilike(pattern, escape="\\") | User.email.ilike(pattern, escape="\\")
+
+    rank = case(
+        ((func.lower(User.username) == query) | (func.lower(User.email) == query), 0),
+        (User.username.ilike(prefix, escape="\\") | User.email.ilike(prefix, escape="\\"), 1),
+        else_=2,
+    )
+    users = await db.scalars(
+        select(User)
+        .where(
+            match,
+            User.id != user_id,
+            User.id.not_in(_friend_ids_query(user_id)),
+        )
+        .order_by(rank, func.length(User.username), User.username)
+        .limit(limit)
+    )
+    return users.all()
+
+
+class UserSearchIndex:
+    """
+    In-process trigram index over (username, email) plus a sorted username
+    list for short prefix queries, mirroring the Postgres indexes.
+    Built lazily from the database and rebuilt every `refresh_seconds` so
+    users created by other workers eventually show up.
+    """
+
+    def __init__(self, refresh_seconds: float = 300):
+        self.refresh_seconds = refresh_seconds
+        self._entries: Dict[int, Tuple[str, str]] = {}
+        self._trigrams: Dict[str, Set[int]] = defaultdict(set)
+        self._prefixes: List[Tuple[str, int]] = []
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh_seconds
+
+    def rebuild(self, rows: Iterable[Tuple[int, str, str]]):
+        entries = {user_id: (username.lower(), email.lower()) for user_id, username, email in rows}
+        trigrams: Dict[str, Set[int]] = defaultdict(set)
+        prefixes = []
+        for user_id, (username, email) in entries.items():
+            for gram in _trigrams(username) | _trigrams(email):
+                trigrams[gram].add(user_id)
+            prefixes.append((username, user_id))
+        prefixes.sort()
+        with self._lock:
+            self._entries, self._trigrams, self._prefixes = entries, trigrams, prefixes
+            self._loaded_at = time.monotonic()
+
+    def add(self, user_id: int, username: str, email: str):
+        """Index a newly created user (no-op until the index has been built)"""
+        username, email = username.lower(), email.lower()
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            self._entries[user_id] = (username, email)
+            for gram in _trigrams(username) | _trigrams(email):
+                self._trigrams[gram].add(user_id)
+            bisect.insort(self._prefixes, (username, user_id))
+
+    def _candidates(self, query: str) -> Set[int]:
+        if len(query) < MIN_TRIGRAM_QUERY:
+            start = bisect.bisect_left(self._prefixes, (query,))
+            ids = set()
+            for value, user_id in self._prefixes[start:]:
+                if not value.startswith(query):
+                    break
+                ids.add(user_id)
+            return ids
+        postings = sorted((self._trigrams.get(gram, set()) for gram in _trigrams(query)), key=len)
+        return set.intersection(*postings) if postings else set()
+
+    def search(self, query: str, exclude: Set[int], limit: int) -> List[int]:
+        """Ranked user ids matching `query` (already lowercased)"""
+        with self._lock:
+            ranked = []
+            for user_id in self._candidates(query) - exclude:
+                username, email = self._entries[user_id]
+                rank = _rank(query, username, email)
+                if rank is not None:
+                    ranked.append((rank, len(username), username, user_id))
+        ranked.sort()
+        return [user_id for *_, user_id in ranked[:limit]]
+
+
+user_search_index = UserSearchIndex()
+
+
+async def _search_in_process(db: AsyncSession, query: str, user_id: int, limit: int) -> List[User]:
+    if user_search_index.is_stale:
+        rows = await db.execute(select(User.id, User.username, User.email))
+        user_search_index.rebuild(rows.all())
+
+    exclude = set((await db.scalars(_friend_ids_query(user_id))).all())
+    exclude.add(user_id)
+    ids = user_search_index.search(query, exclude, limit)
+    if not ids:
+        return []
+
+    users = {user.id: user for user in (await db.scalars(select(User).where(User.id.in_(ids)))).all()}
+    return [users[i] for i in ids if i in users]
+
+
+async def search_users(db: AsyncSession, query: str, user_id: int, limit: int = 20) -> List[User]:
+    """Users matching `query`, best match first, excluding `user_id` and their friends"""
+    query = query.strip().lower()
+    if not query:
+        return []
+    if db.get_bind().dialect.name == "postgresql":
+        return await _search_indexed(db, query, user_id, limit)
+    return await _search_in_process(db, query, user_id, limit)
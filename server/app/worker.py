@@ -0,0 +1,39 @@
+"""
+Giffy job worker
+Runs gift picking / ordering jobs outside the API process:
+
+    python -m app.worker --concurrency 8
+
+Start as many processes as throughput needs - they share the jobs table.
+"""
+import argparse
+import asyncio
+import logging
+import signal
+from app.core.database import dispose_async_engines, dispose_engines, verify_schema_revision
+from app.services.job_worker import JobWorker
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+
+async def main(concurrency: int = None):
+    await verify_schema_revision()
+    worker = JobWorker(concurrency=concurrency)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    try:
+        await worker.run()
+    finally:
+        await dispose_async_engines()
+        dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the Giffy background job worker")
+    parser.add_argument("--concurrency", type=int, default=None, help="jobs run at a time (default JOB_WORKER_CONCURRENCY)")
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency))
@@ -2,13 +2,24 @@
 Giftify Backend API
 A social gifting platform for sending surprise gifts to friends
 """
+import asyncio
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm.exc import StaleDataError
 from app.api.routes import api_router
-from app.core.database import Base, engine
+from app.core.config import settings
+from app.core.database import dispose_async_engines, dispose_engines, verify_schema_revision
+from app.core.metrics import instrument_queries
+from app.core.middleware import QueryStatsMiddleware
+from app.core.security import shutdown_password_executor
+from app.models.gift import InvalidGiftTransition
 from app.services.scheduler import start_scheduler, stop_scheduler
 from app.services.blinkit_chaos_agent import BlinkitChaosAgentService
+from app.services.friend_suggestions import schedule_index_rebuild
+from app.services.gift_events import gift_event_hub
+from app.services.job_worker import JobWorker
 import logging
 
 # Configure logging
@@ -25,21 +36,43 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting Giffy API...")
 
-    # Create database tables
-    Base.metadata.create_all(bind=engine)
-    logger.info("Database tables created")
+    # Schema is managed by Alembic - just make sure it's up to date
+    await verify_schema_revision()
+    logger.info("Database schema is up to date")
 
     # Start gift scheduler
     await start_scheduler()
     logger.info("Gift scheduler started")
 
+    # Relay gift status changes from the outbox table (written by every
+    # process, including job workers) to this process's SSE streams
+    gift_event_hub.start()
+
+    # Build the friend suggestions index in the background (requests fall
+    # back to SQL until it's ready)
+    schedule_index_rebuild()
+
+    # Gift jobs normally run in `python -m app.worker`; single-process setups
+    # can run a worker here instead
+    worker = worker_task = None
+    if settings.JOB_WORKER_EMBEDDED:
+        worker = JobWorker()
+        worker_task = asyncio.create_task(worker.run())
+
     yield
 
     # Shutdown
     logger.info("Shutting down Giffy API...")
     stop_scheduler()
+    await gift_event_hub.stop()
+    if worker is not None:
+        worker.stop()
+        await worker_task
     await BlinkitChaosAgentService.cleanup_all()
     logger.info("Chaos agent sessions cleaned up")
+    await dispose_async_engines()
+    dispose_engines()
+    shutdown_password_executor()
 
 
 # Create FastAPI app
@@ -77,12 +110,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Link", "ETag", "Last-Modified", "Idempotent-Replayed"],
 )
 
+# Per-request SQL statement counting / N+1 detection
+instrument_queries()
+app.add_middleware(QueryStatsMiddleware)
+
 # Include API routes
 app.include_router(api_router, prefix="/api")
 
 
+@app.exception_handler(StaleDataError)
+async def concurrent_update_handler(request: Request, exc: StaleDataError):
+    """A versioned row (gift, persona) changed under this request's write"""
+    return JSONResponse(
+        status_code=status.HTTP_409_CONFLICT,
+        content={"detail": "This was changed by another request - reload and try again"},
+    )
+
+
+@app.exception_handler(InvalidGiftTransition)
+async def invalid_gift_transition_handler(request: Request, exc: InvalidGiftTransition):
+    return JSONResponse(status_code=status.HTTP_409_CONFLICT, content={"detail": str(exc)})
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -0,0 +1,209 @@
+"""initial schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-17 04:14:25.650214
+
+Schema as previously created by Base.metadata.create_all at startup.
+Databases created that way should be stamped with `alembic stamp 0001`
+before running `alembic upgrade head`.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('username', sa.String(length=50), nullable=False),
+    sa.Column('hashed_password', sa.String(length=255), nullable=False),
+    sa.Column('full_name', sa.String(length=100), nullable=True),
+    sa.Column('phone', sa.String(length=20), nullable=True),
+    sa.Column('avatar_url', sa.Text(), nullable=True),
+    sa.Column('bio', sa.Text(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('is_verified', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_index(op.f('ix_users_username'), 'users', ['username'], unique=True)
+
+    op.create_table('vibe_tags',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('category', sa.String(length=50), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_index(op.f('ix_vibe_tags_id'), 'vibe_tags', ['id'], unique=False)
+
+    op.create_table('friend_requests',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sender_id', sa.Integer(), nullable=False),
+    sa.Column('receiver_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'ACCEPTED', 'REJECTED', name='friendrequeststatus'), nullable=True),
+    sa.Column('message', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['receiver_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['sender_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_friend_requests_id'), 'friend_requests', ['id'], unique=False)
+
+    op.create_table('friendships',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('friend_id', sa.Integer(), nullable=False),
+    sa.Column('nickname', sa.String(length=50), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['friend_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_friendships_id'), 'friendships', ['id'], unique=False)
+
+    op.create_table('gift_subscriptions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sender_id', sa.Integer(), nullable=False),
+    sa.Column('recipient_id', sa.Integer(), nullable=False),
+    sa.Column('frequency', sa.String(length=20), nullable=True),
+    sa.Column('day_of_week', sa.Integer(), nullable=True),
+    sa.Column('day_of_month', sa.Integer(), nullable=True),
+    sa.Column('time_of_day', sa.String(length=5), nullable=True),
+    sa.Column('vibe_prompt', sa.Text(), nullable=True),
+    sa.Column('budget_min', sa.Float(), nullable=True),
+    sa.Column('budget_max', sa.Float(), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('last_sent_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('next_send_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('total_gifts_sent', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['recipient_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['sender_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_gift_subscriptions_id'), 'gift_subscriptions', ['id'], unique=False)
+
+    op.create_table('gifts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sender_id', sa.Integer(), nullable=False),
+    sa.Column('recipient_id', sa.Integer(), nullable=False),
+    sa.Column('vibe_prompt', sa.Text(), nullable=True),
+    sa.Column('budget_min', sa.Float(), nullable=True),
+    sa.Column('budget_max', sa.Float(), nullable=False),
+    sa.Column('gift_name', sa.String(length=255), nullable=True),
+    sa.Column('gift_description', sa.Text(), nullable=True),
+    sa.Column('gift_image_url', sa.Text(), nullable=True),
+    sa.Column('gift_price', sa.Float(), nullable=True),
+    sa.Column('gift_url', sa.Text(), nullable=True),
+    sa.Column('agent_reasoning', sa.Text(), nullable=True),
+    sa.Column('platform', sa.Enum('BLINKIT', 'ZEPTO', 'SWIGGY_INSTAMART', 'AMAZON', 'MANUAL', name='deliveryplatform'), nullable=True),
+    sa.Column('order_id', sa.String(length=100), nullable=True),
+    sa.Column('tracking_url', sa.Text(), nullable=True),
+    sa.Column('delivery_address', sa.Text(), nullable=True),
+    sa.Column('status', sa.Enum('PENDING', 'AGENT_PICKING', 'AWAITING_APPROVAL', 'ORDERED', 'SHIPPED', 'DELIVERED', 'CANCELLED', name='giftstatus'), nullable=True),
+    sa.Column('is_surprise', sa.Boolean(), nullable=True),
+    sa.Column('sender_message', sa.Text(), nullable=True),
+    sa.Column('recipient_reaction', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('ordered_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('delivered_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['recipient_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['sender_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_gifts_id'), 'gifts', ['id'], unique=False)
+
+    op.create_table('personas',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('budget_preference', sa.String(length=20), nullable=True),
+    sa.Column('gift_style', sa.String(length=50), nullable=True),
+    sa.Column('vibe_tags', sa.JSON(), nullable=True),
+    sa.Column('interests', sa.JSON(), nullable=True),
+    sa.Column('dislikes', sa.JSON(), nullable=True),
+    sa.Column('shirt_size', sa.String(length=10), nullable=True),
+    sa.Column('shoe_size', sa.String(length=10), nullable=True),
+    sa.Column('default_address', sa.Text(), nullable=True),
+    sa.Column('city', sa.String(length=100), nullable=True),
+    sa.Column('pincode', sa.String(length=10), nullable=True),
+    sa.Column('ai_summary', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id')
+    )
+    op.create_index(op.f('ix_personas_id'), 'personas', ['id'], unique=False)
+
+    op.create_table('social_connections',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('platform', sa.Enum('INSTAGRAM', 'TWITTER', 'SPOTIFY', 'LINKEDIN', name='socialplatform'), nullable=False),
+    sa.Column('platform_user_id', sa.String(length=255), nullable=True),
+    sa.Column('platform_username', sa.String(length=255), nullable=True),
+    sa.Column('access_token', sa.Text(), nullable=True),
+    sa.Column('refresh_token', sa.Text(), nullable=True),
+    sa.Column('profile_data', sa.JSON(), nullable=True),
+    sa.Column('follower_count', sa.Integer(), nullable=True),
+    sa.Column('following_count', sa.Integer(), nullable=True),
+    sa.Column('post_count', sa.Integer(), nullable=True),
+    sa.Column('bio', sa.Text(), nullable=True),
+    sa.Column('last_synced_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_social_connections_id'), 'social_connections', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_social_connections_id'), table_name='social_connections')
+    op.drop_table('social_connections')
+
+    op.drop_index(op.f('ix_personas_id'), table_name='personas')
+    op.drop_table('personas')
+
+    op.drop_index(op.f('ix_gifts_id'), table_name='gifts')
+    op.drop_table('gifts')
+
+    op.drop_index(op.f('ix_gift_subscriptions_id'), table_name='gift_subscriptions')
+    op.drop_table('gift_subscriptions')
+
+    op.drop_index(op.f('ix_friendships_id'), table_name='friendships')
+    op.drop_table('friendships')
+
+    op.drop_index(op.f('ix_friend_requests_id'), table_name='friend_requests')
+    op.drop_table('friend_requests')
+
+    op.drop_index(op.f('ix_vibe_tags_id'), table_name='vibe_tags')
+    op.drop_table('vibe_tags')
+
+    op.drop_index(op.f('ix_users_username'), table_name='users')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_table('users')
+
+    # Postgres keeps enum types around after their tables are dropped
+    if op.get_bind().dialect.name == "postgresql":
+        for enum_name in ("socialplatform", "giftstatus", "deliveryplatform", "friendrequeststatus"):
+            sa.Enum(name=enum_name).drop(op.get_bind(), checkfirst=True)
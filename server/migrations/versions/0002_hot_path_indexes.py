@@ -0,0 +1,53 @@
+"""hot path indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 04:30:00.000000
+
+Composite/partial indexes for the list and friendship-check queries.
+On Postgres they are built CONCURRENTLY (outside a transaction) so
+existing tables stay writable while the indexes build.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns, partial-index predicate)
+INDEXES = [
+    ('ix_gifts_sender_id_created_at', 'gifts', ['sender_id', 'created_at'], None),
+    ('ix_gifts_recipient_id_created_at', 'gifts', ['recipient_id', 'created_at'], None),
+    ('ix_friendships_user_id_friend_id', 'friendships', ['user_id', 'friend_id'], None),
+    ('ix_friend_requests_receiver_id_status', 'friend_requests', ['receiver_id', 'status'], None),
+    ('ix_gift_subscriptions_is_active', 'gift_subscriptions', ['is_active'], 'is_active'),
+    ('ix_social_connections_user_id_platform', 'social_connections', ['user_id', 'platform'], None),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,48 @@
+"""user search indexes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 06:10:00.000000
+
+pg_trgm GIN indexes so `GET /users/search` substring matches (ILIKE
+'%q%') use an index instead of scanning users, plus a lower(username)
+text_pattern_ops index for queries too short to have trigrams.
+Postgres only - SQLite uses the in-process index in
+app/services/user_search.py.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_users_username_trgm', 'USING gin (username gin_trgm_ops)'),
+    ('ix_users_email_trgm', 'USING gin (email gin_trgm_ops)'),
+    ('ix_users_username_lower_pattern', '(lower(username) text_pattern_ops)'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    with op.get_context().autocommit_block():
+        for name, definition in INDEXES:
+            op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON users {definition}')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
@@ -0,0 +1,101 @@
+"""user contact hashes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 07:20:00.000000
+
+users.email_hash / users.phone_hash (sha256 of the normalized value) so
+POST /friends/import-contacts can match an address book in one indexed
+query. Existing rows are backfilled in batches.
+"""
+import hashlib
+import re
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BATCH_SIZE = 5000
+
+# Normalization as app.core.contacts had it at this revision - copied, not
+# imported, so the migration keeps meaning the same thing as the app changes
+PHONE_MATCH_DIGITS = 10  # CONTACT_PHONE_MATCH_DIGITS default
+_NON_DIGITS = re.compile(r"\D")
+
+users = sa.table(
+    'users',
+    sa.column('id', sa.Integer),
+    sa.column('email', sa.String),
+    sa.column('phone', sa.String),
+    sa.column('email_hash', sa.String),
+    sa.column('phone_hash', sa.String),
+)
+
+
+def _hash(normalized: Optional[str]) -> Optional[str]:
+    if normalized is None:
+        return None
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def email_hash(email: Optional[str]) -> Optional[str]:
+    if not email:
+        return None
+    email = email.strip().lower()
+    return _hash(email if "@" in email else None)
+
+
+def phone_hash(phone: Optional[str]) -> Optional[str]:
+    if not phone:
+        return None
+    digits = _NON_DIGITS.sub("", phone)
+    if len(digits) < PHONE_MATCH_DIGITS:
+        return None
+    return _hash(digits[-PHONE_MATCH_DIGITS:])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('email_hash', sa.String(length=64), nullable=True))
+    op.add_column('users', sa.Column('phone_hash', sa.String(length=64), nullable=True))
+
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(users.c.id, users.c.email, users.c.phone)
+            .where(users.c.id > last_id)
+            .order_by(users.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        conn.execute(
+            users.update().where(users.c.id == sa.bindparam('user_id')),
+            [
+                {'user_id': row.id, 'email_hash': email_hash(row.email), 'phone_hash': phone_hash(row.phone)}
+                for row in rows
+            ],
+        )
+        last_id = rows[-1].id
+
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_users_email_hash'), 'users', ['email_hash'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_users_phone_hash'), 'users', ['phone_hash'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_users_phone_hash'), table_name='users', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_users_email_hash'), table_name='users', postgresql_concurrently=True)
+    op.drop_column('users', 'phone_hash')
+    op.drop_column('users', 'email_hash')
@@ -0,0 +1,61 @@
+"""friend unique constraints
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 08:05:00.000000
+
+Unique (user_id, friend_id) on friendships and a partial unique index
+allowing one PENDING friend request per (sender_id, receiver_id), so the
+friend request flow can rely on INSERT ... ON CONFLICT instead of
+check-then-insert. Duplicates left behind by the old flow are removed
+first (the oldest row of each group is kept).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+PENDING = "status = 'PENDING'"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        'DELETE FROM friendships WHERE id NOT IN '
+        '(SELECT MIN(id) FROM friendships GROUP BY user_id, friend_id)'
+    )
+    op.execute(
+        f'DELETE FROM friend_requests WHERE {PENDING} AND id NOT IN '
+        f'(SELECT MIN(id) FROM friend_requests WHERE {PENDING} GROUP BY sender_id, receiver_id)'
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'uq_friendships_user_id_friend_id', 'friendships', ['user_id', 'friend_id'],
+            unique=True, postgresql_concurrently=True,
+        )
+        op.drop_index('ix_friendships_user_id_friend_id', table_name='friendships', postgresql_concurrently=True)
+        op.create_index(
+            'uq_friend_requests_pending_pair', 'friend_requests', ['sender_id', 'receiver_id'],
+            unique=True, postgresql_concurrently=True,
+            postgresql_where=sa.text(PENDING), sqlite_where=sa.text(PENDING),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('uq_friend_requests_pending_pair', table_name='friend_requests', postgresql_concurrently=True)
+        op.create_index(
+            'ix_friendships_user_id_friend_id', 'friendships', ['user_id', 'friend_id'],
+            unique=False, postgresql_concurrently=True,
+        )
+        op.drop_index('uq_friendships_user_id_friend_id', table_name='friendships', postgresql_concurrently=True)
@@ -0,0 +1,40 @@
+"""keyset pagination indexes
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 08:50:00.000000
+
+Indexes matching the newest-first (created_at, id) keyset pages on list
+endpoints that weren't already covered by 0002.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_friendships_user_id_created_at', 'friendships', ['user_id', 'created_at']),
+    ('ix_friend_requests_sender_id_status', 'friend_requests', ['sender_id', 'status']),
+    ('ix_gift_subscriptions_sender_id_created_at', 'gift_subscriptions', ['sender_id', 'created_at']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
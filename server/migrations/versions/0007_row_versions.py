@@ -0,0 +1,32 @@
+"""row versions
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 09:30:00.000000
+
+gifts.version / personas.version - mapped as SQLAlchemy version_id_col so
+every ORM update bumps them; GET endpoints derive ETags from them.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('gifts', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+    op.add_column('personas', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('personas', 'version')
+    op.drop_column('gifts', 'version')
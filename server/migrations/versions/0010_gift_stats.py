@@ -0,0 +1,121 @@
+"""gift stats
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17 11:30:00.000000
+
+gift_stats (counts / value per user, direction, other party and status) and
+gift_monthly_spend, kept current by a flush listener so GET /gifts/stats
+doesn't scan gifts. Backfilled from existing gifts with INSERT ... SELECT
+... GROUP BY (python -m scripts.rebuild_gift_stats recomputes them later).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, Sequence[str], None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Gift statuses whose gift_price counts as spend (enum member names)
+SPENT_STATUSES = ('ORDERED', 'SHIPPED', 'DELIVERED')
+
+gifts = sa.table(
+    'gifts',
+    sa.column('sender_id', sa.Integer),
+    sa.column('recipient_id', sa.Integer),
+    sa.column('status', sa.String),
+    sa.column('gift_price', sa.Float),
+    sa.column('ordered_at', sa.DateTime),
+    sa.column('created_at', sa.DateTime),
+)
+
+gift_stats = sa.table(
+    'gift_stats',
+    sa.column('user_id', sa.Integer),
+    sa.column('direction', sa.String),
+    sa.column('friend_id', sa.Integer),
+    sa.column('status', sa.String),
+    sa.column('gift_count', sa.Integer),
+    sa.column('spend', sa.Float),
+)
+
+gift_monthly_spend = sa.table(
+    'gift_monthly_spend',
+    sa.column('user_id', sa.Integer),
+    sa.column('month', sa.String),
+    sa.column('gift_count', sa.Integer),
+    sa.column('spend', sa.Float),
+)
+
+
+def _month(dialect: str, value):
+    """YYYY-MM of a timestamp"""
+    if dialect == 'postgresql':
+        return sa.func.to_char(value, 'YYYY-MM')
+    return sa.func.strftime('%Y-%m', value)
+
+
+def _backfill(dialect: str):
+    # gift_stats.status holds GiftStatus values - the lowercased member names gifts stores
+    status = sa.func.lower(sa.cast(gifts.c.status, sa.String))
+    spend = sa.func.coalesce(sa.func.sum(gifts.c.gift_price), 0)
+
+    def per_direction(direction, user_id, friend_id):
+        return (
+            sa.select(user_id, sa.literal(direction, sa.String), friend_id, status, sa.func.count(), spend)
+            .where(gifts.c.status.is_not(None))
+            .group_by(user_id, friend_id, gifts.c.status)
+        )
+
+    op.execute(gift_stats.insert().from_select(
+        ['user_id', 'direction', 'friend_id', 'status', 'gift_count', 'spend'],
+        sa.union_all(
+            per_direction('sent', gifts.c.sender_id, gifts.c.recipient_id),
+            per_direction('received', gifts.c.recipient_id, gifts.c.sender_id),
+        ),
+    ))
+
+    month = _month(dialect, sa.func.coalesce(gifts.c.ordered_at, gifts.c.created_at))
+    op.execute(gift_monthly_spend.insert().from_select(
+        ['user_id', 'month', 'gift_count', 'spend'],
+        sa.select(gifts.c.sender_id, month, sa.func.count(), spend)
+        .where(gifts.c.status.in_(SPENT_STATUSES))
+        .group_by(gifts.c.sender_id, month),
+    ))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('gift_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('direction', sa.String(length=8), nullable=False),
+    sa.Column('friend_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('gift_count', sa.Integer(), nullable=False),
+    sa.Column('spend', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['friend_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'direction', 'friend_id', 'status')
+    )
+    op.create_table('gift_monthly_spend',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.String(length=7), nullable=False),
+    sa.Column('gift_count', sa.Integer(), nullable=False),
+    sa.Column('spend', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'month')
+    )
+
+    _backfill(op.get_context().dialect.name)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('gift_monthly_spend')
+    op.drop_table('gift_stats')
@@ -0,0 +1,48 @@
+"""gift events
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-17 12:00:00.000000
+
+gift_events outbox: one row per gift creation / status change, written in
+the same transaction by whichever process made it (API, job worker,
+scheduler) and tailed by every API process for GET /gifts/events. The id is
+the SSE event id, so it must never be reused (AUTOINCREMENT on SQLite).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0011'
+down_revision: Union[str, Sequence[str], None] = '0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('gift_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('gift_id', sa.Integer(), nullable=False),
+    sa.Column('sender_id', sa.Integer(), nullable=False),
+    sa.Column('recipient_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('version', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sqlite_autoincrement=True
+    )
+    op.create_index('ix_gift_events_sender_id_id', 'gift_events', ['sender_id', 'id'], unique=False)
+    op.create_index('ix_gift_events_recipient_id_id', 'gift_events', ['recipient_id', 'id'], unique=False)
+    op.create_index('ix_gift_events_created_at', 'gift_events', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_gift_events_created_at', table_name='gift_events')
+    op.drop_index('ix_gift_events_recipient_id_id', table_name='gift_events')
+    op.drop_index('ix_gift_events_sender_id_id', table_name='gift_events')
+    op.drop_table('gift_events')
@@ -0,0 +1,92 @@
+"""
+Contact import benchmark
+Seeds a scratch database with users that have phone numbers and times a
+10k-contact POST /friends/import-contacts through app.services.contact_import.
+
+    cd server
+    alembic upgrade head                      # against the scratch DATABASE_URL
+    python -m scripts.bench_contact_import --users 200000 --contacts 10000
+
+Point DATABASE_URL at a throwaway database - rows are inserted, not cleaned up.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from sqlalchemy import func, insert, select
+from app.core.contacts import email_hash, phone_hash
+from app.core.database import AsyncSessionLocal, get_engine
+from app.models.user import User
+from app.schemas.friend import ContactImportRequest
+from app.services.contact_import import import_contacts
+
+
+def _phone(i: int) -> str:
+    return f"+91 9{i:09d}"
+
+
+def seed(count: int, batch_size: int = 10_000):
+    engine = get_engine()
+    with engine.begin() as conn:
+        existing = conn.scalar(select(func.count()).select_from(User))
+    for start in range(existing, count, batch_size):
+        rows = []
+        for i in range(start, min(start + batch_size, count)):
+            email = f"contact_{i}@example.com"
+            rows.append({
+                "email": email,
+                "username": f"contact_{i}",
+                "hashed_password": "x",
+                "phone": _phone(i),
+                "email_hash": email_hash(email),
+                "phone_hash": phone_hash(_phone(i)),
+                "is_active": True,
+                "is_verified": False,
+            })
+        with engine.begin() as conn:
+            conn.execute(insert(User), rows)
+        print(f"seeded {min(start + batch_size, count)}/{count}", end="\r")
+    print()
+
+
+def address_book(users: int, contacts: int, hit_rate: float) -> ContactImportRequest:
+    """Half emails, half phones; `hit_rate` of them belong to seeded users"""
+    emails, phones = [], []
+    for n in range(contacts):
+        if random.random() < hit_rate:
+            i = random.randrange(users)
+            (emails.append(f"Contact_{i}@Example.com") if n % 2 else phones.append(f"09{i:09d}"))
+        else:
+            (emails.append(f"stranger_{n}@nowhere.org") if n % 2 else phones.append(f"+1 555 {n:07d}"))
+    return ContactImportRequest(emails=emails, phones=phones)
+
+
+async def bench(users: int, contacts: int, runs: int, hit_rate: float):
+    timings = []
+    for _ in range(runs):
+        book = address_book(users, contacts, hit_rate)
+        async with AsyncSessionLocal() as db:
+            started = time.perf_counter()
+            result = await import_contacts(db, user_id=0, contacts=book)
+            timings.append(1000 * (time.perf_counter() - started))
+    timings.sort()
+    print(f"{contacts} contacts, {len(result.matches)} matches in last run")
+    print(f"p50 {statistics.median(timings):.1f} ms   max {timings[-1]:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200_000, help="total users to have in the table")
+    parser.add_argument("--contacts", type=int, default=10_000, help="contacts per upload")
+    parser.add_argument("--hit-rate", type=float, default=0.2, help="share of contacts that are users")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    random.seed(42)
+    seed(args.users)
+    asyncio.run(bench(args.users, args.contacts, args.runs, args.hit_rate))
+
+
+if __name__ == "__main__":
+    main()
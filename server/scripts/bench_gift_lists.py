@@ -0,0 +1,101 @@
+"""
+Gift list benchmark
+Seeds one account with many sent gifts and times the gift list/detail
+endpoints through the ASGI app (no network, no lifespan).
+
+    cd server
+    alembic upgrade head                      # against the scratch DATABASE_URL
+    python -m scripts.bench_gift_lists --gifts 10000
+
+Point DATABASE_URL at a throwaway database - rows are inserted, not cleaned up.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import httpx
+from sqlalchemy import insert, select
+from app.core.database import get_engine
+from app.core.security import create_access_token
+from app.models.gift import Gift, GiftStatus
+from app.models.user import User
+
+LONG_TEXT = "The recipient keeps posting about cold brew at 2am, so... " * 40
+
+
+def seed(gifts: int) -> int:
+    """Create a sender with `gifts` gifts spread over 50 recipients; return the sender id"""
+    engine = get_engine()
+    with engine.begin() as conn:
+        sender_id = conn.scalar(select(User.id).where(User.username == "bench_gifter"))
+        if sender_id is not None:
+            return sender_id
+        sender_id = conn.execute(insert(User).returning(User.id), {
+            "email": "bench_gifter@example.com", "username": "bench_gifter", "hashed_password": "x",
+        }).scalar_one()
+        recipients = conn.execute(insert(User).returning(User.id), [
+            {"email": f"bench_friend_{i}@example.com", "username": f"bench_friend_{i}", "hashed_password": "x"}
+            for i in range(50)
+        ]).scalars().all()
+        conn.execute(insert(Gift), [
+            {
+                "sender_id": sender_id,
+                "recipient_id": random.choice(recipients),
+                "vibe_prompt": "send something chaotic",
+                "budget_min": 0,
+                "budget_max": 1500,
+                "gift_name": f"Gift #{i}",
+                "gift_description": LONG_TEXT,
+                "agent_reasoning": LONG_TEXT,
+                "status": random.choice(list(GiftStatus)),
+                "is_surprise": False,
+            }
+            for i in range(gifts)
+        ])
+    return sender_id
+
+
+async def timed(client: httpx.AsyncClient, url: str, headers: dict, runs: int):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        response = await client.get(url, headers=headers)
+        timings.append(1000 * (time.perf_counter() - started))
+        response.raise_for_status()
+    return statistics.median(timings), len(response.content)
+
+
+async def bench(sender_id: int, runs: int):
+    from main import app
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(sender_id)})}"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        first = (await client.get("/api/gifts/sent?limit=1", headers=headers)).json()[0]["id"]
+        print(f"{'endpoint':<34} {'p50 ms':>9} {'bytes':>9}")
+        for url in ["/api/gifts/sent?limit=200", "/api/gifts/sent?limit=50", f"/api/gifts/{first}"]:
+            p50, size = await timed(client, url, headers, runs)
+            print(f"{url:<34} {p50:9.2f} {size:9d}")
+
+        # Walk the whole history page by page
+        started, url, pages = time.perf_counter(), "/api/gifts/sent?limit=200", 0
+        while url:
+            response = await client.get(url, headers=headers)
+            cursor, pages = response.headers.get("X-Next-Cursor"), pages + 1
+            url = f"/api/gifts/sent?limit=200&cursor={cursor}" if cursor else None
+        print(f"{'full history (' + str(pages) + ' pages)':<34} {1000 * (time.perf_counter() - started):9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--gifts", type=int, default=10_000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(42)
+    sender_id = seed(args.gifts)
+    asyncio.run(bench(sender_id, args.runs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Password hash benchmark
+Times scrypt verification at several cost factors the way login runs it -
+concurrent verifies on a bounded executor off the event loop - and reports
+login throughput, per-login latency and the worst event-loop stall seen by
+a 10 ms ticker while the storm runs.
+
+    cd server
+    python -m scripts.bench_password_hash --logins 200 --workers 4
+
+Pick PASSWORD_SCRYPT_N from the table: the largest cost whose throughput
+still covers peak logins per worker process.
+"""
+import argparse
+import asyncio
+import base64
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.core.security import SCRYPT_TAG, _scrypt, verify_password
+
+COSTS = [2 ** 12, 2 ** 13, 2 ** 14, 2 ** 15, 2 ** 16]
+PASSWORD = "correct horse battery staple"
+TICK_SECONDS = 0.01
+
+
+def make_hash(n: int, r: int, p: int) -> str:
+    salt = os.urandom(16)
+    digest = _scrypt(PASSWORD, salt, n, r, p)
+    return "$".join([SCRYPT_TAG, str(n), str(r), str(p), base64.b64encode(salt).decode(), base64.b64encode(digest).decode()])
+
+
+async def ticker(stop: asyncio.Event) -> float:
+    """Worst lateness of a TICK_SECONDS sleep - how long the loop was blocked"""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        worst = max(worst, time.perf_counter() - started - TICK_SECONDS)
+    return worst
+
+
+async def storm(hashed: str, logins: int, executor: ThreadPoolExecutor):
+    loop = asyncio.get_running_loop()
+    latencies = []
+
+    async def login():
+        started = time.perf_counter()
+        assert await loop.run_in_executor(executor, verify_password, PASSWORD, hashed)
+        latencies.append(time.perf_counter() - started)
+
+    stop = asyncio.Event()
+    lag = asyncio.create_task(ticker(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    return logins / elapsed, latencies, await lag
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200, help="concurrent logins per cost factor")
+    parser.add_argument("--workers", type=int, default=4, help="password-hash executor size (PASSWORD_HASH_WORKERS)")
+    parser.add_argument("--r", type=int, default=8)
+    parser.add_argument("--p", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'N':>7} {'hash ms':>8} {'logins/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'loop lag ms':>12}")
+    with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="password-hash") as executor:
+        for n in COSTS:
+            started = time.perf_counter()
+            hashed = make_hash(n, args.r, args.p)
+            hash_ms = 1000 * (time.perf_counter() - started)
+            throughput, latencies, lag = asyncio.run(storm(hashed, args.logins, executor))
+            latencies.sort()
+            p95 = latencies[int(len(latencies) * 0.95) - 1]
+            print(
+                f"{n:>7} {hash_ms:8.1f} {throughput:9.1f} {1000 * statistics.median(latencies):9.1f}"
+                f" {1000 * p95:9.1f} {1000 * lag:12.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+User search benchmark
+Seeds a scratch database with synthetic users and times GET /users/search
+queries through app.services.user_search.
+
+    cd server
+    alembic upgrade head                      # against the scratch DATABASE_URL
+    python -m scripts.bench_user_search --users 1000000
+
+Point DATABASE_URL at a throwaway database - rows are inserted, not cleaned up.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import string
+import time
+from sqlalchemy import func, insert, select, text
+from app.core.database import AsyncSessionLocal, get_engine
+from app.models.user import User
+from app.services.user_search import search_users
+
+QUERIES = ["a", "jo", "john", "smith", "gmail", "x9q", "user_0000040", "zzzz"]
+NAMES = ["john", "jane", "alex", "sam", "priya", "rahul", "maria", "smith", "kumar", "lee"]
+
+
+def _username(i: int) -> str:
+    suffix = "".join(random.choices(string.ascii_lowercase + string.digits, k=4))
+    return f"{random.choice(NAMES)}_{suffix}_{i}" if i % 10 else f"user_{i:07d}"
+
+
+def seed(count: int, batch_size: int = 10_000):
+    engine = get_engine()
+    with engine.begin() as conn:
+        existing = conn.scalar(select(func.count()).select_from(User))
+    for start in range(existing, count, batch_size):
+        rows = []
+        for i in range(start, min(start + batch_size, count)):
+            username = _username(i)
+            rows.append({
+                "email": f"{username}@{random.choice(['gmail.com', 'example.com', 'mail.in'])}",
+                "username": username,
+                "hashed_password": "x",
+                "is_active": True,
+                "is_verified": False,
+            })
+        with engine.begin() as conn:
+            conn.execute(insert(User), rows)
+        print(f"seeded {min(start + batch_size, count)}/{count}", end="\r")
+    print()
+
+
+async def bench(runs: int):
+    async with AsyncSessionLocal() as db:
+        if db.get_bind().dialect.name == "postgresql":
+            await db.execute(text("ANALYZE users"))
+
+        # First call pays for building the in-process index on SQLite
+        started = time.perf_counter()
+        await search_users(db, "warmup", user_id=0)
+        print(f"{'warmup':<14} {1000 * (time.perf_counter() - started):9.1f} ms")
+
+        print(f"{'query':<14} {'p50 ms':>9} {'p95 ms':>9} {'hits':>5}")
+        for query in QUERIES:
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                users = await search_users(db, query, user_id=0)
+                timings.append(1000 * (time.perf_counter() - started))
+            timings.sort()
+            p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+            print(f"{query:<14} {statistics.median(timings):9.2f} {p95:9.2f} {len(users):5d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000, help="total users to have in the table")
+    parser.add_argument("--runs", type=int, default=50, help="timed runs per query")
+    args = parser.parse_args()
+
+    random.seed(42)
+    seed(args.users)
+    asyncio.run(bench(args.runs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""
+Gift stats rebuild
+Recomputes gift_stats / gift_monthly_spend from the gifts table in one
+streaming pass and swaps them in a single transaction. Run it after bulk
+loads or manual SQL that bypassed the ORM (e.g. the bench seeders).
+
+    cd server
+    python -m scripts.rebuild_gift_stats
+
+On Postgres gift writes wait on a SHARE lock for the duration.
+"""
+import argparse
+import time
+from app.core.database import get_engine
+from app.services.gift_stats import rebuild
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+    started = time.perf_counter()
+    with get_engine().begin() as conn:
+        scanned, written = rebuild(conn)
+    print(f"scanned {scanned} gifts, wrote {written} stats rows in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
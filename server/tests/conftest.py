@@ -0,0 +1,17 @@
+import os
+import tempfile
+import pytest
+
+# Settings are read at import time - point the app at a throwaway SQLite
+# database before anything under app/ is imported
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/giffy_test.db")
+
+
+@pytest.fixture(scope="session")
+def migrated_db():
+    """The test database upgraded to the latest migration"""
+    from alembic import command
+    from alembic.config import Config
+    from app.core.database import ALEMBIC_INI
+
+    command.upgrade(Config(ALEMBIC_INI), "head")
@@ -0,0 +1,44 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from app.core.database import get_engine, get_session_factory
+
+WORKERS = 16
+
+
+def test_same_engine_across_threads(tmp_path):
+    url = f"sqlite:///{tmp_path}/threads.db"
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        engines = list(pool.map(lambda _: get_engine(url), range(WORKERS * 4)))
+
+    assert len({id(engine) for engine in engines}) == 1
+    assert len({id(engine.pool) for engine in engines}) == 1
+
+
+def test_same_engine_across_tasks(tmp_path):
+    url = f"sqlite:///{tmp_path}/tasks.db"
+
+    async def lookup(in_thread: bool):
+        if in_thread:
+            return await asyncio.to_thread(get_engine, url)
+        return get_engine(url)
+
+    async def run():
+        return await asyncio.gather(*(lookup(i % 2 == 0) for i in range(WORKERS * 4)))
+
+    engines = asyncio.run(run())
+    assert len({id(engine) for engine in engines}) == 1
+    assert len({id(engine.pool) for engine in engines}) == 1
+
+
+def test_session_factories_share_the_engine(tmp_path):
+    url = f"sqlite:///{tmp_path}/sessions.db"
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        factories = list(pool.map(lambda _: get_session_factory(url), range(WORKERS)))
+
+    assert len({id(factory) for factory in factories}) == 1
+    with factories[0]() as session:
+        assert session.get_bind() is get_engine(url)
+
+
+def test_default_url_is_the_primary():
+    assert get_engine() is get_engine(get_engine().url.render_as_string(hide_password=False))
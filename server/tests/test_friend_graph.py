@@ -0,0 +1,35 @@
+import asyncio
+import itertools
+from sqlalchemy import delete, insert
+from app.core.database import AsyncSessionLocal, get_engine
+from app.models.friend import Friendship
+from app.models.user import User
+from app.services.friend_graph import friend_graph
+
+_ids = itertools.count()
+
+
+def test_confirmed_check_sees_an_unfriend_from_another_worker(migrated_db):
+    with get_engine().begin() as conn:
+        user_id, friend_id = conn.execute(insert(User).returning(User.id), [
+            {"email": f"graph_{i}@example.com", "username": f"graph_{i}", "hashed_password": "x"}
+            for i in (next(_ids), next(_ids))
+        ]).scalars().all()
+        conn.execute(insert(Friendship), [{"user_id": user_id, "friend_id": friend_id}])
+
+    async def check(**kwargs):
+        async with AsyncSessionLocal() as db:
+            return (
+                await friend_graph.are_friends(db, user_id, friend_id, **kwargs),
+                await friend_graph.friends_among(db, user_id, [friend_id], **kwargs),
+            )
+
+    assert asyncio.run(check()) == (True, {friend_id})
+
+    # Removed elsewhere - this process's cache isn't invalidated
+    with get_engine().begin() as conn:
+        conn.execute(delete(Friendship).where(Friendship.user_id == user_id))
+
+    assert asyncio.run(check()) == (True, {friend_id})
+    assert asyncio.run(check(confirm=True)) == (False, set())
+    assert asyncio.run(check()) == (False, set())
@@ -0,0 +1,85 @@
+import asyncio
+import itertools
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from app.agents.blinkit import BlinkitAgent
+from app.core.database import get_engine, get_session_factory
+from app.models.gift import Gift, GiftStatus
+from app.models.user import User
+from app.services.gift_agent import GiftAgentService
+from app.services.job_queue import PermanentJobError
+
+_ids = itertools.count()
+
+
+def _ordered_gift() -> int:
+    rows = []
+    for _ in range(2):
+        i = next(_ids)
+        rows.append({"email": f"order_{i}@example.com", "username": f"order_{i}", "hashed_password": "x"})
+    with get_engine().begin() as conn:
+        sender_id, recipient_id = conn.execute(insert(User).returning(User.id), rows).scalars().all()
+    with get_session_factory()() as db:
+        gift = Gift(sender_id=sender_id, recipient_id=recipient_id, budget_max=500, status=GiftStatus.AGENT_PICKING)
+        db.add(gift)
+        db.commit()
+        gift.gift_name, gift.gift_price, gift.status = "Mug", 349, GiftStatus.ORDERED
+        db.commit()
+        return gift.id
+
+
+def _place_order_while(monkeypatch, change):
+    """Make the (external) order succeed after `change` is committed by another session"""
+    async def place_order(**kwargs):
+        with get_session_factory()() as other:
+            change(other.get(Gift, gift_id))
+            other.commit()
+        return {"success": True, "order_id": "BLK-1", "tracking_url": "https://track/1"}
+
+    gift_id = _ordered_gift()
+    monkeypatch.setattr(BlinkitAgent, "place_order", place_order)
+    return gift_id
+
+
+def test_order_survives_a_concurrent_write(migrated_db, monkeypatch):
+    def react(gift):
+        gift.recipient_reaction = "lol"
+
+    gift_id = _place_order_while(monkeypatch, react)
+    asyncio.run(GiftAgentService.place_order(gift_id))
+
+    with get_session_factory()() as db:
+        gift = db.get(Gift, gift_id)
+        assert (gift.status, gift.order_id, gift.recipient_reaction) == (GiftStatus.SHIPPED, "BLK-1", "lol")
+
+
+def test_order_for_a_gift_that_moved_on_fails_without_retry(migrated_db, monkeypatch):
+    def cancel(gift):
+        gift.status = GiftStatus.CANCELLED
+
+    gift_id = _place_order_while(monkeypatch, cancel)
+    with pytest.raises(PermanentJobError, match="BLK-1"):
+        asyncio.run(GiftAgentService.place_order(gift_id))
+
+
+def test_order_recorded_on_a_lost_connection_fails_without_retry(migrated_db, monkeypatch):
+    def keep(gift):
+        pass
+
+    gift_id = _place_order_while(monkeypatch, keep)
+
+    def lost_connection(self):
+        raise OperationalError("COMMIT", {}, Exception("server closed the connection unexpectedly"))
+
+    original = BlinkitAgent.place_order
+
+    async def place_order(**kwargs):
+        result = await original(**kwargs)
+        monkeypatch.setattr(Session, "commit", lost_connection)
+        return result
+
+    monkeypatch.setattr(BlinkitAgent, "place_order", place_order)
+    with pytest.raises(PermanentJobError, match="BLK-1"):
+        asyncio.run(GiftAgentService.place_order(gift_id))
@@ -0,0 +1,88 @@
+import asyncio
+import itertools
+from sqlalchemy import insert
+from app.core.database import AsyncSessionLocal, get_engine, get_session_factory
+from app.models.gift import Gift, GiftStatus
+from app.models.user import User
+from app.services import gift_events
+from app.services.gift_events import GiftEventHub
+
+
+_ids = itertools.count()
+
+
+def _users(count: int):
+    rows = []
+    for _ in range(count):
+        i = next(_ids)
+        rows.append({"email": f"ev_{i}@example.com", "username": f"ev_{i}", "hashed_password": "x"})
+    with get_engine().begin() as conn:
+        return conn.execute(insert(User).returning(User.id), rows).scalars().all()
+
+
+async def _poll(hub: GiftEventHub):
+    async with AsyncSessionLocal() as db:
+        await hub.poll(db)
+
+
+def _drain(subscription):
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+
+def test_changes_committed_elsewhere_reach_subscribers(migrated_db):
+    """A status change made by another process (e.g. a job worker) is relayed from the outbox"""
+    sender_id, recipient_id = _users(2)
+
+    async def run():
+        hub = GiftEventHub(replay_limit=100, poll_seconds=0.1)
+        await _poll(hub)  # start at the current tail
+        subscription, replay = await hub.subscribe(recipient_id)
+        assert replay == []
+
+        # Plain sync session, as the worker uses - no in-process hub involved
+        with get_session_factory()() as db:
+            gift = Gift(sender_id=sender_id, recipient_id=recipient_id, budget_max=100, status=GiftStatus.AGENT_PICKING)
+            db.add(gift)
+            db.commit()
+            gift.status = GiftStatus.AWAITING_APPROVAL
+            db.commit()
+            gift_id = gift.id
+
+        await _poll(hub)
+        events = _drain(subscription)
+        assert [(e.data["gift_id"], e.data["status"]) for e in events] == [
+            (gift_id, "agent_picking"),
+            (gift_id, "awaiting_approval"),
+        ]
+
+        # Reconnecting after the first event replays the second from the table
+        resumed, replay = await hub.subscribe(recipient_id, last_event_id=events[0].id)
+        assert [e.id for e in replay] == [events[1].id]
+        hub.unsubscribe(resumed)
+
+        # An id the table hasn't handed out means resync
+        _, replay = await hub.subscribe(recipient_id, last_event_id=events[-1].id + 1000)
+        assert replay is None
+
+    asyncio.run(run())
+
+
+def test_cursor_waits_for_gaps_then_skips():
+    hub = GiftEventHub(replay_limit=100, poll_seconds=0.1)
+    hub._cursor = 10
+    hub._ahead = {12, 13}
+
+    hub._advance(now=100.0)
+    assert hub._cursor == 10  # 11 may still commit
+
+    hub._ahead.add(11)
+    hub._advance(now=101.0)
+    assert hub._cursor == 13 and not hub._ahead
+
+    hub._ahead = {15}
+    hub._advance(now=200.0)
+    hub._advance(now=200.0 + gift_events.GAP_TIMEOUT_SECONDS)
+    assert hub._cursor == 15  # 14 never showed up - treated as rolled back
@@ -0,0 +1,99 @@
+import asyncio
+import itertools
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from sqlalchemy import func, insert, select, update
+from app.core.config import settings
+from app.core.database import get_engine
+from app.core.idempotency import IDEMPOTENCY_KEY_HEADER, IdempotentRequest
+from app.core.security import create_access_token
+from app.models.friend import Friendship
+from app.models.gift import Gift
+from app.models.idempotency import IdempotencyKey
+from app.models.user import User
+
+_ids = itertools.count()
+
+
+def seed_friends() -> tuple:
+    with get_engine().begin() as conn:
+        sender_id, recipient_id = conn.execute(insert(User).returning(User.id), [
+            {"email": f"idem_{i}@example.com", "username": f"idem_{i}", "hashed_password": "x"}
+            for i in (next(_ids), next(_ids))
+        ]).scalars().all()
+        conn.execute(insert(Friendship), [
+            {"user_id": sender_id, "friend_id": recipient_id},
+            {"user_id": recipient_id, "friend_id": sender_id},
+        ])
+    return sender_id, recipient_id
+
+
+def gift_count(sender_id: int) -> int:
+    with get_engine().connect() as conn:
+        return conn.scalar(select(func.count()).select_from(Gift).where(Gift.sender_id == sender_id))
+
+
+async def post_gift(sender_id: int, recipient_id: int, key: str) -> httpx.Response:
+    from main import app
+
+    headers = {
+        "Authorization": f"Bearer {create_access_token({'sub': str(sender_id)})}",
+        IDEMPOTENCY_KEY_HEADER: key,
+    }
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post("/api/gifts/", headers=headers, json={
+            "recipient_id": recipient_id, "vibe_prompt": "cozy", "budget_max": 500,
+        })
+
+
+@pytest.fixture
+def failing_save(monkeypatch):
+    """save() stages the response, then the request dies before its commit"""
+    original = IdempotentRequest.save
+
+    async def save(self, db, content, status_code=200):
+        await original(self, db, content, status_code)
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(IdempotentRequest, "save", save)
+    return monkeypatch
+
+
+def test_failed_request_releases_key_and_retry_creates_once(migrated_db, failing_save):
+    sender_id, recipient_id = seed_friends()
+
+    assert asyncio.run(post_gift(sender_id, recipient_id, "retry-1")).status_code == 500
+    assert gift_count(sender_id) == 0
+
+    failing_save.undo()
+    assert asyncio.run(post_gift(sender_id, recipient_id, "retry-1")).status_code == 201
+    replay = asyncio.run(post_gift(sender_id, recipient_id, "retry-1"))
+    assert replay.status_code == 201
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert gift_count(sender_id) == 1
+
+
+def test_claim_of_crashed_request_is_taken_over(migrated_db, failing_save):
+    sender_id, recipient_id = seed_friends()
+
+    async def crashed(self):
+        pass  # the process died - nothing released the claim
+
+    failing_save.setattr(IdempotentRequest, "release", crashed)
+    assert asyncio.run(post_gift(sender_id, recipient_id, "crash-1")).status_code == 500
+    failing_save.undo()
+
+    # Still looks in progress
+    failing_save.setattr(settings, "IDEMPOTENCY_WAIT_SECONDS", 0)
+    assert asyncio.run(post_gift(sender_id, recipient_id, "crash-1")).status_code == 409
+
+    with get_engine().begin() as conn:
+        conn.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.user_id == sender_id)
+            .values(created_at=datetime.utcnow() - timedelta(seconds=settings.IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS + 1))
+        )
+    assert asyncio.run(post_gift(sender_id, recipient_id, "crash-1")).status_code == 201
+    assert gift_count(sender_id) == 1
@@ -0,0 +1,87 @@
+import asyncio
+import itertools
+import httpx
+import pytest
+from sqlalchemy import insert
+from app.core.config import settings
+from app.core.database import get_engine
+from app.core.security import create_access_token
+from app.models.friend import FriendRequest, FriendRequestStatus, Friendship
+from app.models.gift import Gift, GiftStatus
+from app.models.user import User
+
+MANY = 25
+
+LIST_URLS = [
+    "/api/friends/",
+    "/api/friends/requests/incoming",
+    "/api/friends/requests/outgoing",
+    "/api/gifts/sent",
+    "/api/gifts/received",
+]
+
+_ids = itertools.count()
+
+
+def _users(conn, count: int):
+    rows = []
+    for _ in range(count):
+        i = next(_ids)
+        rows.append({"email": f"qc_{i}@example.com", "username": f"qc_{i}", "hashed_password": "x"})
+    return conn.execute(insert(User).returning(User.id), rows).scalars().all()
+
+
+def seed_owner(rows: int) -> int:
+    """A user with `rows` friends, requests each way and gifts each way"""
+    with get_engine().begin() as conn:
+        owner_id = _users(conn, 1)[0]
+        friends = _users(conn, rows)
+        senders = _users(conn, rows)
+        receivers = _users(conn, rows)
+        conn.execute(insert(Friendship), [
+            pair for friend_id in friends
+            for pair in ({"user_id": owner_id, "friend_id": friend_id}, {"user_id": friend_id, "friend_id": owner_id})
+        ])
+        conn.execute(insert(FriendRequest), [
+            {"sender_id": sender_id, "receiver_id": owner_id, "status": FriendRequestStatus.PENDING}
+            for sender_id in senders
+        ] + [
+            {"sender_id": owner_id, "receiver_id": receiver_id, "status": FriendRequestStatus.PENDING}
+            for receiver_id in receivers
+        ])
+        conn.execute(insert(Gift), [
+            {"sender_id": a, "recipient_id": b, "budget_max": 500, "status": GiftStatus.DELIVERED}
+            for friend_id in friends
+            for a, b in ((owner_id, friend_id), (friend_id, owner_id))
+        ])
+    return owner_id
+
+
+async def query_counts(owner_id: int) -> dict:
+    from main import app
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(owner_id)})}"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        # Resolve (and cache) the principal so it isn't counted against the first list
+        (await client.get("/api/users/me", headers=headers)).raise_for_status()
+        counts = {}
+        for url in LIST_URLS:
+            response = await client.get(url, headers=headers)
+            response.raise_for_status()
+            counts[url] = int(response.headers["X-DB-Queries"])
+        return counts
+
+
+@pytest.fixture
+def debug_headers(monkeypatch):
+    monkeypatch.setattr(settings, "DEBUG", True)
+
+
+def test_list_query_count_is_constant(migrated_db, debug_headers):
+    one, many = seed_owner(1), seed_owner(MANY)
+
+    counts_one = asyncio.run(query_counts(one))
+    counts_many = asyncio.run(query_counts(many))
+
+    assert all(counts_one.values())
+    assert counts_one == counts_many